@@ -0,0 +1,6 @@
+import logging
+
+from smart.auto import AutoLoad
+
+logger = logging.getLogger('auto_tasks')
+auto_load = AutoLoad()
\ No newline at end of file
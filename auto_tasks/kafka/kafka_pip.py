@@ -0,0 +1,141 @@
+from smart.utils.kafka.KafkaQueue import KafkaQueue
+from smart.auto.tree import TreeMultiTask
+
+from .__utils import auto_load, logger
+
+
+@auto_load.task('kafka__pip')
+class KafkaPipTask(TreeMultiTask):
+
+    def conn(self, servers=None, host='localhost', port:int=9092, group_id:str=None, auto_commit:bool=True,
+            consumer_opts:dict=None, producer_opts:dict=None):
+        """初始化kafka连接
+
+        Args:
+            servers (str|list, optional): 服务端列表. Defaults to None.
+            host (str, optional): 服务端域名, servers参数非空时本参数无效. Defaults to 'localhost'.
+            port (int, optional): 服务端端口, servers参数非空时本参数无效. Defaults to 9092.
+            group_id (str, optional): 消费者组. Defaults to None.
+            auto_commit (bool, optional): 是否自动提交偏移量; False时由recv在每批数据处理后提交. Defaults to True.
+            consumer_opts (dict, optional): Consumer类初始化的配置. Defaults to None.
+            producer_opts (dict, optional): Producer类初始化的配置. Defaults to None.
+
+        Returns:
+            dict: {kafka_queue:KafkaQueue}
+        """
+        logger.debug('kafka__pip.conn %s, group_id=%s', servers or (host, port), group_id)
+        kafka_queue = KafkaQueue(
+            servers=servers, host=host, port=port,
+            consumer_opts=dict(consumer_opts or {}), producer_opts=dict(producer_opts or {})
+        )
+        if group_id:
+            kafka_queue.consumer_opts['group.id'] = group_id
+        kafka_queue.update_consumer_opts(auto_commit=auto_commit)
+        return {
+            'kafka_queue': kafka_queue
+        }
+
+    def recv(self, kafka_queue:KafkaQueue, topic=None, timeout:float=None, pool_interval:float=10,
+            is_daemon:bool=False, with_msg_key:str=None, skip_err_item:bool=False,
+            batch_size:int=100, commit_interval:float=5):
+        """接收kafka管道数据
+
+        守护任务将忽略end命令, 只响应exit命令; 普通任务可被end/exit命令关闭.
+
+        Args:
+            kafka_queue (KafkaQueue): kafka队列实例, 一般由前置调用的conn函数传参过来.
+            topic (str|list, optional): topic名称或topic名称列表. Defaults to None.
+            timeout (float, optional): 接收超时时间, None表示一直等待. Defaults to None.
+            pool_interval (float, optional): 长轮询间隔. Defaults to 10.
+            is_daemon (bool, optional): 是否为守护任务. Defaults to False.
+            with_msg_key (str, optional): 将msg的key放入到指定item键. Defaults to None.
+            skip_err_item (bool, optional): 跳过decode错误的item. Defaults to False.
+            batch_size (int, optional): 每次consume读取的最大消息数. Defaults to 100.
+            commit_interval (float, optional): auto_commit=False时自动异步提交偏移量的间隔(秒). Defaults to 5.
+
+        Returns:
+            dict: {item_iter_fn}
+        """
+        assert topic
+
+        logger.info('KafkaPip start recv %s %s', topic, (timeout, batch_size))
+
+        def item_iter_fn():
+            batch_iter = kafka_queue.recv_batches(
+                topic, batch_size=batch_size, timeout=timeout, pool_interval=pool_interval,
+                is_daemon=is_daemon, with_msg_key=with_msg_key, skip_err_item=skip_err_item,
+                commit_interval=commit_interval
+            )
+            try:
+                for batch in batch_iter:
+                    yield from batch
+            finally:
+                batch_iter.close()
+                # 取消订阅前同步提交, 避免最后一批数据的偏移量丢失
+                kafka_queue.commit(asynchronous=False)
+                kafka_queue.unsubscribe()
+
+        return {
+            'item_iter_fn': item_iter_fn
+        }
+
+    def send(self, kafka_queue:KafkaQueue, topic=None, item_iter=None, item_iter_fn=None, recv_args={},
+            send_end_cmd=True, partition:int=None, item_topic_key='_send_topic', item_msg_key=None, auto_msg_key=False,
+            batch_size:int=100, frame_items:bool=False, max_in_flight:int=10000, flush_interval:float=None,
+            max_failed:int=None):
+        """向kafka管道发送数据, 缺省使用投递驱动模式(只在结束时flush)
+
+        Arguments:
+            kafka_queue {KafkaQueue} -- kafka队列实例, 一般由前置调用的conn函数传参过来.
+
+        Keyword Arguments:
+            topic {str} -- topic名称 (default: {None})
+            item_iter {iter} -- 数据生成器 (default: {None})
+            item_iter_fn {callable} -- 数据生成器函数 (default: {None})
+            recv_args {dict} -- 队列接收数据的参数 (default: {{}})
+            send_end_cmd {bool} -- 是否向管道发送结束命令 (default: {True})
+            partition {int} -- 分区号 (default: {None})
+            item_topic_key {str} -- item的键, 用于动态指定topic (default: {'_send_topic'})
+            item_msg_key {str} -- item的键, 用于指定msg的key (default: {None})
+            auto_msg_key {bool} -- 是否自动生成msg的key (default: {False})
+            batch_size {int} -- 每批序列化的数据条数 (default: {100})
+            frame_items {bool} -- 是否将一批中相同topic和key的数据合并为一条多条数据帧消息 (default: {False})
+            max_in_flight {int} -- 未确认投递的最大消息数; 0或None表示使用每条flush的兼容模式 (default: {10000})
+            flush_interval {float} -- 定时flush的间隔(秒) (default: {None})
+            max_failed {int} -- 投递失败的消息数超过该值时抛出异常, None表示只记录日志 (default: {None})
+
+        Returns:
+            dict: {send_stats}
+        """
+        item_iter = item_iter or (item_iter_fn or self.recv_data)(**recv_args)
+
+        logger.info('KafkaPip start send %s, arg=%s', topic, (batch_size, max_in_flight, flush_interval))
+
+        send_stats = kafka_queue.send_all(
+            item_iter, topic=topic, partition=partition, send_end_cmd=send_end_cmd,
+            item_topic_key=item_topic_key, item_msg_key=item_msg_key, auto_msg_key=auto_msg_key,
+            batch_size=batch_size, frame_items=frame_items, max_in_flight=max_in_flight, flush_interval=flush_interval
+        )
+
+        logger.info('kafka__pip.send %s', send_stats)
+
+        if max_failed is not None and send_stats['failed'] > max_failed:
+            raise Exception('kafka__pip.send failed {} messages: {}'.format(send_stats['failed'], send_stats['errors']))
+
+        return {
+            'send_stats': send_stats
+        }
+
+    def send_exit_cmd(self, kafka_queue:KafkaQueue, topic=None, partition:int=None):
+        """向kafka管道发送离开命令, 用于daemon类型的接收任务.
+
+        Args:
+            kafka_queue (KafkaQueue): kafka队列实例
+            topic (str, optional): 目标topic. Defaults to None.
+            partition (int, optional): 分区号. Defaults to None.
+        """
+        assert topic
+
+        kafka_queue.send_end_cmd(topic, partition=partition, cmd_type='exit')
+
+        logger.info('kafka__pip.send_exit_cmd to topic %s', topic)
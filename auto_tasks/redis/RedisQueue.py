@@ -1,10 +1,11 @@
 from redis import Redis
 import functools
+from collections import deque
 
 from smart.utils.serialize import TypeObjSerializer
 from smart.utils.number import safe_parse_int
 from .__utils import logger
-from .redis_utils import RedisFullUtil, RedisLongPoll
+from .redis_utils import RedisFullUtil, RedisLongPoll, RedisBatchPush, RedisBatchPop
 
 
 class RedisQueue:
@@ -13,6 +14,8 @@ class RedisQueue:
         other_args = redis_kwargs or {}
         redis = Redis(host=host, port=port, db=db, password=password, **other_args)
         self._redis = redis
+        # 多条数据帧中未读取的数据: {key: deque[(type, item)]}
+        self.__recv_pending = {}
 
     def __parse_key_item(self, key_item, key_item_redis=None, raw_item=False):
         if key_item is None:
@@ -20,22 +23,25 @@ class RedisQueue:
         
         key, item_data = key_item
 
-        type, item = TypeObjSerializer.decode(item_data)
+        # 兼容多条数据帧, 返回 [(type, item)]
+        type_item_list = TypeObjSerializer.decode_many([item_data])
 
         if raw_item:
-            return type, item
+            return type_item_list
 
         key = key.decode('utf8')
-        # 将 redis key 加入item
-        if isinstance(item, dict):
-            if key_item_redis:
-                item[key_item_redis] = key
+        rst = []
+        for type, item in type_item_list:
+            # 将 redis key 加入item
+            if isinstance(item, dict):
+                if key_item_redis:
+                    item[key_item_redis] = key
+                else:
+                    item = (item, key)
             else:
                 item = (item, key)
-
-            return type, item
-        else:
-            return type, (item, key)
+            rst.append((type, item))
+        return rst
     
     def recv_one(self, key, timeout=0, key_item_redis='_redis_key', redis_poll_interval:int=None):
         """从redis队列接收一条数据
@@ -49,6 +55,11 @@ class RedisQueue:
         Returns:
             tuple: type, item
         """
+        is_multi_queue = isinstance(key, (list, tuple))
+        pending = self.__recv_pending.get(tuple(key) if is_multi_queue else key)
+        if pending:
+            return pending.popleft()
+
         redis = self._redis
         if redis_poll_interval:
             # 启用长轮询机制获取数据
@@ -58,18 +69,19 @@ class RedisQueue:
             key_item = redis.blpop(key, timeout)
 
         if key_item:
-            is_multi_queue = isinstance(key, (list, tuple))
             if is_multi_queue:
-                type, item = self.__parse_key_item(key_item, key_item_redis=key_item_redis)
+                type_item_list = self.__parse_key_item(key_item, key_item_redis=key_item_redis)
             else:
-                type, item = self.__parse_key_item(key_item, raw_item=True)
+                type_item_list = self.__parse_key_item(key_item, raw_item=True)
 
-            return type, item
+            if len(type_item_list) > 1:
+                self.__recv_pending.setdefault(tuple(key) if is_multi_queue else key, deque()).extend(type_item_list[1:])
+            return type_item_list[0] if type_item_list else (None, None)
         else:
             return None, None
 
     def recv_all(self, key, block=True, timeout=0, key_item_redis='_redis_key'
-            , is_daemon:bool=False, redis_poll_interval:int=None):
+            , is_daemon:bool=False, redis_poll_interval:int=None, batch_size:int=1):
         """接收redis管道数据
 
         key为数组时, 将优先取第一个元素的队列; 如第一个队列无数据, 取第二个队列, 依次类推.
@@ -83,6 +95,7 @@ class RedisQueue:
             key_item_redis (str, optional): 多队列接收任务时, 将具体到数据的队列的键写入item. Defaults to '_redis_key'.
             is_daemon (bool, optional): 是否为守护任务. Defaults to False.
             redis_poll_interval (int, optional): 缺省None，>0时启用redis长轮询机制获取数据. 本参数仅在block=True时有效, 建议设置redis长轮询间隔时间为10(秒). 
+            batch_size (int, optional): 每次读取的最大数据条数; >1时在BLPOP/LPOP返回后用LPOP key count(redis<6.2使用LRANGE+LTRIM)读取同一队列的后续数据, 多队列的优先级按批次生效. Defaults to 1.
 
         Yields:
             dict: Item
@@ -117,13 +130,22 @@ class RedisQueue:
         elif tuple_rst:
             loads_fn = functools.partial(self.__parse_key_item, raw_item=True)
         else:
-            loads_fn = TypeObjSerializer.decode
-
-        while True:
-            item_str = recv_fn(key)
+            loads_fn = lambda item_str: TypeObjSerializer.decode_many([item_str])
+
+        batch_pop = RedisBatchPop(redis, recv_fn, batch_size=batch_size)
+        pending = deque()
+        pending_frame = None
+        try:
+            while True:
+                if not pending:
+                    item_str = batch_pop.pop(key)
+                    if not item_str:
+                        break
+                    pending.extend(loads_fn(item_str))
+                    pending_frame = item_str if len(pending) > 1 else None
+                    continue
 
-            if item_str:
-                type, item = loads_fn(item_str)
+                type, item = pending.popleft()
 
                 if type == 'cmd':
                     item = item or {}
@@ -134,14 +156,14 @@ class RedisQueue:
                             item, qu_key = item
                         else:
                             qu_key = item.get(key_item_redis)
-                    
+                
                     cmd_type = item.get('type')
 
                     if is_daemon:
                         end_types = ('exit',)
                     else:
                         end_types = ('end', 'exit')
-                    
+                
                     if cmd_type in end_types:
                         logger.debug('RedisQueue.recv %s cmd: %s', cmd_type, item)
 
@@ -152,27 +174,31 @@ class RedisQueue:
                             redis.rpush(key, cmd_str)
                             redis.expire(key, end_ttl)
                             logger.debug('RedisQueue.recv forward end cmd: %s', item)
-                        
+                    
                         if cmd_type in ('exit',):
                             break
                         else:
                             if is_multi_queue:
                                 if qu_key in key:
                                     key.remove(qu_key)
-                                
+                                    batch_pop.push_back(key, qu_key)
+                            
                                 if len(key):
                                     continue
                                 else:
                                     break
                             else:
                                 break
-                    
+                
                     logger.debug('RedisQueue.recv cmd: %s', item)
                     continue
 
                 yield item
-            else:
-                break
+        finally:
+            # 结束接收时将已读取但未处理的数据放回队列, 未处理完的多条数据帧剩余数据位于最前
+            batch_pop.push_back(key)
+            if pending and pending_frame is not None:
+                batch_pop.push_back_frame(key, pending_frame, len(pending))
     
     def send_one(self, item, key=None, item_queue_key=None, queue_ttl:int=None):
         queue_key = item.pop(item_queue_key, key) if item_queue_key else key
@@ -184,7 +210,8 @@ class RedisQueue:
 
     def send_all(self, item_iter, key=None, item_queue_key=None, send_end_cmd=True, 
             end_ttl:int=None, empty_old:bool=False, max_queue_size:int=None, check_queue_step:int=None, 
-            client_timeout:int=None, queue_ttl:int=None, item_resp_ttl_key=None):
+            client_timeout:int=None, queue_ttl:int=None, item_resp_ttl_key=None,
+            batch_size:int=1, frame_items:bool=False, linger:float=None):
         """向redis管道发送数据
 
         当目标队列存在多个接收任务时, 需设置 end_ttl
@@ -203,8 +230,10 @@ class RedisQueue:
             client_timeout {int} -- 接收数据方读取数据timeout, 超时未拉取数据将回收资源
             queue_ttl {int} -- 设置队列的ttl (default: {None})
             item_resp_ttl_key {str} -- Item设置响应数据的TTL (default: {None})
+            batch_size {int} -- 每批写入的数据条数; 缓冲满一批或超过linger秒后, 在一个redis pipeline中对每个队列执行一次RPUSH和EXPIRE (default: {1})
+            frame_items {bool} -- 是否将一批中同一队列的数据合并为一个多条数据帧, 接收方需使用本版本的recv函数 (default: {False})
+            linger {float} -- 缓冲数据最长停留时间(秒), 0表示仅在缓冲满时写入; 缺省None表示batch_size>1时为0.1秒 (default: {None})
         """
-        count = 0
         end_msg = None
         stop_early = False
         redis = self._redis
@@ -224,43 +253,46 @@ class RedisQueue:
             if not check_queue_step:
                 check_queue_step = int(max_queue_size/10) or 1
 
-        for i, item in enumerate(item_iter):
-            if isinstance(item, dict):
-                queue_key = item.pop(item_queue_key, key) if item_queue_key else key
-                if item_resp_ttl_key: 
-                    item_resp_ttl = item.pop(item_resp_ttl_key, None)
-                    if item_resp_ttl is None:
+        batch_push = RedisBatchPush(redis, frame_items=frame_items, batch_size=batch_size, linger=linger)
+
+        try:
+            for i, item in enumerate(item_iter):
+                if isinstance(item, dict):
+                    queue_key = item.pop(item_queue_key, key) if item_queue_key else key
+                    if item_resp_ttl_key: 
+                        item_resp_ttl = item.pop(item_resp_ttl_key, None)
+                        if item_resp_ttl is None:
+                            item_resp_ttl = queue_ttl
+                        item_resp_ttl = safe_parse_int(item_resp_ttl)
+                    else:
                         item_resp_ttl = queue_ttl
-                    item_resp_ttl = safe_parse_int(item_resp_ttl)
                 else:
+                    queue_key = key
                     item_resp_ttl = queue_ttl
-            else:
-                queue_key = key
-                item_resp_ttl = queue_ttl
 
-            if not queue_key:
-                logger.warning('RedisQueue can not send item: %s', item)
-                continue
+                if not queue_key:
+                    logger.warning('RedisQueue can not send item: %s', item)
+                    continue
 
-            if max_queue_size:
-                if (i+1) % check_queue_step == 0:
+                if max_queue_size:
+                    # 根据最近一次 RPUSH 返回的队列长度判断, 可能积压时再轮询队列长度
+                    if (i+1) % check_queue_step == 0 and batch_push.is_full(queue_key, max_queue_size):
 
-                    fullUtil = RedisFullUtil(redis, queue_key=queue_key)
+                        fullUtil = RedisFullUtil(redis, queue_key=queue_key)
 
-                    continue_task = fullUtil.wait_no_full(max_queue_size=max_queue_size, client_timeout=client_timeout)
+                        continue_task = fullUtil.wait_no_full(max_queue_size=batch_push.max_entries(max_queue_size), client_timeout=client_timeout)
 
-                    if not continue_task:
-                        end_msg = fullUtil.end_msg
-                        stop_early = fullUtil.stop_early
+                        if not continue_task:
+                            end_msg = fullUtil.end_msg
+                            stop_early = fullUtil.stop_early
             
-            if stop_early:
-                break
-
-            item_str = TypeObjSerializer.encode(item)
-            redis.rpush(queue_key, item_str)
-            if item_resp_ttl:
-                redis.expire(queue_key, item_resp_ttl)
-            count += 1
+                if stop_early:
+                    break
+
+                batch_push.add(queue_key, item_resp_ttl, item)
+        finally:
+            batch_push.close()
+        count = batch_push.count
         
         if send_end_cmd:
             cmd_data = {'type':'end'}
@@ -1,6 +1,7 @@
 from redis import Redis
 import redis as _redis
 import functools
+from collections import deque
 
 from smart.utils.serialize import TypeObjSerializer
 from smart.utils.common.cluster import parse_nodes_host
@@ -8,7 +9,7 @@ from smart.utils.number import safe_parse_int
 from smart.auto.tree import TreeMultiTask
 
 from .__utils import auto_load, logger
-from .redis_utils import RedisFullUtil, RedisLongPoll
+from .redis_utils import RedisFullUtil, RedisLongPoll, RedisBatchPush, RedisBatchPop
 
 
 @auto_load.task('redis__pip')
@@ -56,25 +57,28 @@ class RedisPipTask(TreeMultiTask):
         
         key, item_data = key_item
 
-        type, item = TypeObjSerializer.decode(item_data)
+        # 兼容多条数据帧, 返回 [(type, item)]
+        type_item_list = TypeObjSerializer.decode_many([item_data])
 
         if raw_item:
-            return type, item
+            return type_item_list
 
         key = key.decode('utf8')
-        # 将 redis key 加入item
-        if isinstance(item, dict):
-            if key_item_redis:
-                item[key_item_redis] = key
+        rst = []
+        for type, item in type_item_list:
+            # 将 redis key 加入item
+            if isinstance(item, dict):
+                if key_item_redis:
+                    item[key_item_redis] = key
+                else:
+                    item = (item, key)
             else:
                 item = (item, key)
-
-            return type, item
-        else:
-            return type, (item, key)
+            rst.append((type, item))
+        return rst
     
     def recv(self, redis:Redis, key=None, block=True, timeout=0, key_item_redis='_redis_key'
-            , is_daemon:bool=False, redis_poll_interval:int=None):
+            , is_daemon:bool=False, redis_poll_interval:int=None, batch_size:int=1):
         """接收redis管道数据
 
         key为数组时, 将优先取第一个元素的队列; 如第一个队列无数据, 取第二个队列, 依次类推.
@@ -89,6 +93,7 @@ class RedisPipTask(TreeMultiTask):
             key_item_redis (str, optional): 多队列接收任务时, 将具体到数据的队列的键写入item. Defaults to '_redis_key'.
             is_daemon (bool, optional): 是否为守护任务. Defaults to False.
             redis_poll_interval (int, optional): 缺省None，>0时启用redis长轮询机制获取数据. 本参数仅在block=True时有效, 建议设置redis长轮询间隔时间为10(秒). 
+            batch_size (int, optional): 每次读取的最大数据条数; >1时在BLPOP/LPOP返回后用LPOP key count(redis<6.2使用LRANGE+LTRIM)读取同一队列的后续数据, 多队列的优先级按批次生效. Defaults to 1.
 
         Returns:
             dict: {item_iter_fn}
@@ -122,14 +127,23 @@ class RedisPipTask(TreeMultiTask):
         elif tuple_rst:
             loads_fn = functools.partial(self.__parse_key_item, raw_item=True)
         else:
-            loads_fn = TypeObjSerializer.decode
+            loads_fn = lambda item_str: TypeObjSerializer.decode_many([item_str])
 
         def item_iter_fn():
-            while True:
-                item_str = recv_fn(key)
+            batch_pop = RedisBatchPop(redis, recv_fn, batch_size=batch_size)
+            pending = deque()
+            pending_frame = None
+            try:
+                while True:
+                    if not pending:
+                        item_str = batch_pop.pop(key)
+                        if not item_str:
+                            break
+                        pending.extend(loads_fn(item_str))
+                        pending_frame = item_str if len(pending) > 1 else None
+                        continue
 
-                if item_str:
-                    type, item = loads_fn(item_str)
+                    type, item = pending.popleft()
 
                     if type == 'cmd':
                         item = item or {}
@@ -140,14 +154,14 @@ class RedisPipTask(TreeMultiTask):
                                 item, qu_key = item
                             else:
                                 qu_key = item.get(key_item_redis)
-                        
+                    
                         cmd_type = item.get('type')
 
                         if is_daemon:
                             end_types = ('exit',)
                         else:
                             end_types = ('end', 'exit')
-                        
+                    
                         if cmd_type in end_types:
                             logger.debug('RedisPip.recv %s cmd: %s', cmd_type, item)
 
@@ -158,27 +172,31 @@ class RedisPipTask(TreeMultiTask):
                                 redis.rpush(key, cmd_str)
                                 redis.expire(key, end_ttl)
                                 logger.debug('RedisPip.recv forward end cmd: %s', item)
-                            
+                        
                             if cmd_type in ('exit',):
                                 break
                             else:
                                 if is_multi_queue:
                                     if qu_key in key:
                                         key.remove(qu_key)
-                                    
+                                        batch_pop.push_back(key, qu_key)
+                                
                                     if len(key):
                                         continue
                                     else:
                                         break
                                 else:
                                     break
-                        
+                    
                         logger.debug('RedisPip.recv cmd: %s', item)
                         continue
 
                     yield item
-                else:
-                    break
+            finally:
+                # 结束接收时将已读取但未处理的数据放回队列, 未处理完的多条数据帧剩余数据位于最前
+                batch_pop.push_back(key)
+                if pending and pending_frame is not None:
+                    batch_pop.push_back_frame(key, pending_frame, len(pending))
         
         return {
             'item_iter_fn': item_iter_fn
@@ -186,7 +204,8 @@ class RedisPipTask(TreeMultiTask):
 
     def send(self, redis:Redis, key=None, item_queue_key=None, item_iter=None, item_iter_fn=None, recv_args={}, 
             send_end_cmd=True, end_ttl:int=None, empty_old:bool=False, max_queue_size:int=None, check_queue_step:int=None, 
-            client_timeout:int=None, queue_ttl:int=None, item_resp_ttl_key=None):
+            client_timeout:int=None, queue_ttl:int=None, item_resp_ttl_key=None,
+            batch_size:int=1, frame_items:bool=False, linger:float=None):
         """向redis管道发送数据
 
         当目标队列存在多个接收任务时, 需设置 end_ttl
@@ -208,9 +227,11 @@ class RedisPipTask(TreeMultiTask):
             check_queue_step {int} -- 每隔多少数据检查一次队列积压, 缺省 max_queue_size/10 (default: {None})
             client_timeout {int} -- 接收数据方读取数据timeout, 超时未拉取数据将回收资源
             queue_ttl {int} -- 设置队列的ttl (default: {None})
+            batch_size {int} -- 每批写入的数据条数; 缓冲满一批或超过linger秒后, 在一个redis pipeline中对每个队列执行一次RPUSH和EXPIRE (default: {1})
+            frame_items {bool} -- 是否将一批中同一队列的数据合并为一个多条数据帧, 接收方需使用本版本的recv函数 (default: {False})
+            linger {float} -- 缓冲数据最长停留时间(秒), 0表示仅在缓冲满时写入; 缺省None表示batch_size>1时为0.1秒 (default: {None})
         """
         item_iter = item_iter or (item_iter_fn or self.recv_data)(**recv_args)
-        count = 0
         end_msg = None
         stop_early = False
 
@@ -230,44 +251,46 @@ class RedisPipTask(TreeMultiTask):
             if not check_queue_step:
                 check_queue_step = int(max_queue_size/10) or 1
 
-        for i, item in enumerate(item_iter):
-            if isinstance(item, dict):
-                queue_key = item.pop(item_queue_key, key) if item_queue_key else key
-                if item_resp_ttl_key: 
-                    item_resp_ttl = item.pop(item_resp_ttl_key, None)
-                    if item_resp_ttl is None:
+        batch_push = RedisBatchPush(redis, frame_items=frame_items, batch_size=batch_size, linger=linger)
+
+        try:
+            for i, item in enumerate(item_iter):
+                if isinstance(item, dict):
+                    queue_key = item.pop(item_queue_key, key) if item_queue_key else key
+                    if item_resp_ttl_key: 
+                        item_resp_ttl = item.pop(item_resp_ttl_key, None)
+                        if item_resp_ttl is None:
+                            item_resp_ttl = queue_ttl
+                        item_resp_ttl = safe_parse_int(item_resp_ttl)
+                    else:
                         item_resp_ttl = queue_ttl
-                    item_resp_ttl = safe_parse_int(item_resp_ttl)
                 else:
+                    queue_key = key
                     item_resp_ttl = queue_ttl
-            else:
-                queue_key = key
-                item_resp_ttl = queue_ttl
 
-            if not queue_key:
-                logger.warning('RedisPip can not send item: %s', item)
-                continue
+                if not queue_key:
+                    logger.warning('RedisPip can not send item: %s', item)
+                    continue
 
-            if max_queue_size:
-                if (i+1) % check_queue_step == 0:
+                if max_queue_size:
+                    # 根据最近一次 RPUSH 返回的队列长度判断, 可能积压时再轮询队列长度
+                    if (i+1) % check_queue_step == 0 and batch_push.is_full(queue_key, max_queue_size):
 
-                    fullUtil = RedisFullUtil(redis, queue_key=queue_key)
+                        fullUtil = RedisFullUtil(redis, queue_key=queue_key)
 
-                    continue_task = fullUtil.wait_no_full(max_queue_size=max_queue_size, client_timeout=client_timeout)
+                        continue_task = fullUtil.wait_no_full(max_queue_size=batch_push.max_entries(max_queue_size), client_timeout=client_timeout)
 
-                    if not continue_task:
-                        end_msg = fullUtil.end_msg
-                        stop_early = fullUtil.stop_early
+                        if not continue_task:
+                            end_msg = fullUtil.end_msg
+                            stop_early = fullUtil.stop_early
             
-            if stop_early:
-                break
-
-            item_str = TypeObjSerializer.encode(item)
-            redis.rpush(queue_key, item_str)
+                if stop_early:
+                    break
 
-            if item_resp_ttl:
-                redis.expire(queue_key, item_resp_ttl)
-            count += 1
+                batch_push.add(queue_key, item_resp_ttl, item)
+        finally:
+            batch_push.close()
+        count = batch_push.count
         
         if send_end_cmd:
             cmd_data = {'type':'end'}
@@ -1,8 +1,11 @@
 from redis import Redis
-import time
+from redis.exceptions import ResponseError
+from collections import deque
+import time, threading
 
 from .__utils import logger
 from smart.auto.__logger import logger_trace
+from smart.utils.serialize import TypeObjSerializer
 
 
 class RedisFullUtil:
@@ -63,6 +66,264 @@ class RedisFullUtil:
             return True
     
 
+class RedisBatchPush:
+    """按队列分组批量写入数据
+
+    add 将数据写入缓冲区, 缓冲区满 batch_size 条或超过 linger 秒后, 在一个redis pipeline中对每个队列执行一次 RPUSH (及 EXPIRE);
+    RPUSH 返回的队列长度记录在 queue_len 中, 用于判断队列积压而无需额外的 LLEN 请求
+    """
+    DEFAULT_LINGER = 0.1
+
+    def __init__(self, redis:Redis, frame_items:bool=False, batch_size:int=1, linger:float=None):
+        """构造函数
+
+        Args:
+            redis (Redis): redis客户端
+            frame_items (bool, optional): 是否将同一队列的数据合并为一个多条数据帧; 接收方需使用本版本的 recv 函数. Defaults to False.
+            batch_size (int, optional): 每批次最大数据条数. Defaults to 1.
+            linger (float, optional): 缓冲数据最长停留时间(秒), 0表示仅在缓冲满或close时写入; None表示batch_size>1时为DEFAULT_LINGER. Defaults to None.
+        """
+        self._redis = redis
+        self.frame_items = frame_items
+        self.batch_size = max(int(batch_size or 1), 1)
+        if linger is None:
+            linger = self.DEFAULT_LINGER if self.batch_size > 1 else 0
+        self.linger = float(linger)
+        self.count = 0
+        self.queue_len = {}
+        self._buffer = []
+        self._buffer_ts = None
+        self._error = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._linger_thread = None
+
+    def push(self, key_ttl_item_list:list) -> int:
+        """在一个pipeline中写入一批数据
+
+        Args:
+            key_ttl_item_list (list): [(queue_key, ttl, item)]; 同一队列的数据保持原有顺序, ttl取该队列最后一个非空值
+
+        Returns:
+            int: 写入的数据条数
+        """
+        groups = {}
+        for queue_key, ttl, item in key_ttl_item_list:
+            group = groups.get(queue_key)
+            if group is None:
+                group = groups[queue_key] = [None, []]
+            if ttl:
+                group[0] = ttl
+            group[1].append(item)
+
+        if not groups:
+            return 0
+
+        pipe = self._redis.pipeline(transaction=False)
+        rpush_idx_list, idx = [], 0
+        for queue_key, (ttl, items) in groups.items():
+            if self.frame_items:
+                pipe.rpush(queue_key, TypeObjSerializer.encode_many(items, frame=True))
+            else:
+                pipe.rpush(queue_key, *TypeObjSerializer.encode_many(items))
+            rpush_idx_list.append(idx)
+            idx += 1
+            if ttl:
+                pipe.expire(queue_key, ttl)
+                idx += 1
+        rst = pipe.execute()
+
+        for queue_key, rpush_idx in zip(groups, rpush_idx_list):
+            self.queue_len[queue_key] = rst[rpush_idx]
+        self.count += len(key_ttl_item_list)
+        return len(key_ttl_item_list)
+
+    def _push_buffer(self):
+        """写入缓冲区数据, 调用方需持有 self._cond; 写入失败时数据保留在缓冲区, 下次写入时重试
+        """
+        if not self._buffer:
+            return
+        self.push(self._buffer)
+        self._buffer = []
+        self._buffer_ts = None
+        # 之前失败的数据已写入
+        self._error = None
+
+    def _linger_loop(self):
+        cond = self._cond
+        with cond:
+            while not self._closed:
+                if not self._buffer:
+                    cond.wait()
+                    continue
+                rest_time = self._buffer_ts + self.linger - time.monotonic()
+                if rest_time > 0:
+                    cond.wait(rest_time)
+                else:
+                    try:
+                        self._push_buffer()
+                    except Exception as e:
+                        # 由发送方线程在下次 add/close 时抛出; 间隔 linger 秒后重试
+                        logger.warning('RedisBatchPush linger flush error: %s', e)
+                        self._error = e
+                        self._buffer_ts = time.monotonic()
+
+    def __start_linger_thread(self):
+        if self.linger <= 0 or self._linger_thread is not None:
+            return
+        self._linger_thread = threading.Thread(
+            target=self._linger_loop,
+            name='RedisBatchPush-linger',
+            daemon=True)
+        self._linger_thread.start()
+
+    def __raise_error(self):
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
+    def add(self, queue_key, ttl, item):
+        """写入一条数据到缓冲区
+
+        Args:
+            queue_key (str): 队列的键
+            ttl (int): 队列的ttl
+            item (any): 数据
+        """
+        with self._cond:
+            self.__raise_error()
+            self._buffer.append((queue_key, ttl, item))
+            if len(self._buffer) >= self.batch_size:
+                self._push_buffer()
+            elif self._buffer_ts is None:
+                self._buffer_ts = time.monotonic()
+                self.__start_linger_thread()
+                self._cond.notify()
+
+    def close(self):
+        """写入缓冲区数据并结束linger线程
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            self._push_buffer()
+            self.__raise_error()
+
+    def max_entries(self, max_queue_size:int) -> int:
+        """队列最大长度; 多条数据帧模式下按批次折算
+        """
+        if self.frame_items:
+            return max(int(max_queue_size / self.batch_size), 1)
+        return max_queue_size
+
+    def is_full(self, queue_key, max_queue_size:int) -> bool:
+        """根据最近一次 RPUSH 返回的队列长度判断队列是否可能积压; 未写入过的队列返回True, 需调用方检查
+        """
+        queue_len = self.queue_len.get(queue_key)
+        return queue_len is None or queue_len > self.max_entries(max_queue_size)
+
+
+class RedisBatchPop:
+    """批量读取队列数据
+
+    recv_fn (BLPOP/LPOP) 返回数据后, 使用 LPOP key count (redis<6.2 使用 MULTI+LRANGE+LTRIM) 读取同一队列的后续数据并缓存在本地;
+    多队列接收时, 缓存的数据会先于其它队列的新数据返回, 即优先级按批次生效
+    """
+    def __init__(self, redis:Redis, recv_fn:callable, batch_size:int=1):
+        """构造函数
+
+        Args:
+            redis (Redis): redis客户端
+            recv_fn (callable): 读取一条数据的函数, 参数为队列的键; 返回 (key, data) 表示BLPOP的结果, 返回 data 表示LPOP的结果
+            batch_size (int, optional): 每次读取的最大数据条数. Defaults to 1.
+        """
+        self._redis = redis
+        self._recv_fn = recv_fn
+        self.batch_size = max(int(batch_size or 1), 1)
+        self._buffer = deque()
+        self._lpop_count = True
+
+    def lpop(self, key, count:int) -> list:
+        """从队列头部读取最多 count 条数据
+        """
+        if count <= 0:
+            return []
+        if self._lpop_count:
+            try:
+                return self._redis.lpop(key, count) or []
+            except ResponseError as e:
+                # redis 6.2 以下版本不支持 LPOP key count
+                logger.info('RedisBatchPop lpop count not supported, use lrange+ltrim: %s', e)
+                self._lpop_count = False
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.lrange(key, 0, count - 1)
+        pipe.ltrim(key, count, -1)
+        return pipe.execute()[0] or []
+
+    def pop(self, key):
+        """读取一条数据, 返回值格式与 recv_fn 一致; 无数据时返回 None
+        """
+        if self._buffer:
+            return self._buffer.popleft()
+
+        key_item = self._recv_fn(key)
+        if key_item and self.batch_size > 1:
+            if isinstance(key_item, (list, tuple)):
+                qu_key = key_item[0]
+                self._buffer.extend((qu_key, data) for data in self.lpop(qu_key, self.batch_size - 1))
+            else:
+                self._buffer.extend(self.lpop(key, self.batch_size - 1))
+        return key_item
+
+    def push_back(self, key, qu_key:str=None):
+        """将缓存中未读取的数据按原顺序放回队列头部
+
+        Args:
+            key (str|list): 接收数据的队列的键
+            qu_key (str, optional): 仅放回该队列的数据; None表示全部. Defaults to None.
+        """
+        if not self._buffer:
+            return
+        groups, rest = {}, deque()
+        for key_item in self._buffer:
+            if isinstance(key_item, (list, tuple)):
+                item_key, data = key_item
+                item_key = item_key.decode('utf8') if isinstance(item_key, bytes) else item_key
+            else:
+                item_key, data = key, key_item
+            if qu_key is not None and item_key != qu_key:
+                rest.append(key_item)
+                continue
+            groups.setdefault(item_key, []).append(data)
+        self._buffer = rest
+
+        for item_key, data_list in groups.items():
+            self._redis.lpush(item_key, *reversed(data_list))
+            logger.debug('RedisBatchPop push back %s items to %s', len(data_list), item_key)
+
+    def push_back_frame(self, key, key_item, num_rest:int):
+        """将多条数据帧中未处理的最后 num_rest 条数据重新编码为一个数据帧, 放回队列头部;
+        在 push_back 之后调用, 使其位于缓存数据之前
+
+        Args:
+            key (str|list): 接收数据的队列的键
+            key_item (bytes|tuple): pop 返回的多条数据帧, 格式与 recv_fn 一致
+            num_rest (int): 未处理的数据条数
+        """
+        if not key_item or num_rest <= 0:
+            return
+        if isinstance(key_item, (list, tuple)):
+            item_key, data = key_item
+            item_key = item_key.decode('utf8') if isinstance(item_key, bytes) else item_key
+        else:
+            item_key, data = key, key_item
+
+        type_item_list = TypeObjSerializer.decode_many([data])[-num_rest:]
+        frame = TypeObjSerializer.encode_many([item for _, item in type_item_list], obj_type=type_item_list[0][0], frame=True)
+        self._redis.lpush(item_key, frame)
+        logger.debug('RedisBatchPop push back %s frame items to %s', len(type_item_list), item_key)
+
+
 class RedisLongPoll:
     def __init__(self, redis:Redis, poll_interval:int=10):
         self.__redis = redis
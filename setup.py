@@ -23,7 +23,10 @@ REQUIRED = [
 EXTRAS_REQUIRE = {
     'kafka': [
         'confluent-kafka',
-    ]
+    ],
+    'msgpack': [
+        'msgpack',
+    ],
 }
 
 auto_tasks_package_data = {
@@ -48,6 +51,7 @@ setup(
         'console_scripts': [
             'smart_auto = smart.auto.run:cmd_ep',
             'smart_auto_debug = smart.auto.run_debug:cmd_ep',
+            'smart_auto_bench = smart.auto.bench.run:cmd_ep',
             'smart_aaas = smart.aaas.run:cmd_ep',
             'smart_aaas_debug = smart.aaas.run_debug:cmd_ep'
         ]
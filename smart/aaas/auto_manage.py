@@ -1,4 +1,4 @@
-import uuid, time, functools, os, signal
+import uuid, time, functools, os, signal, sys, gc, threading
 import multiprocessing as mp
 from multiprocessing.context import TimeoutError
 from queue import Empty
@@ -7,8 +7,11 @@ import traceback
 from smart.utils import AppEnv
 from smart.utils.store.mp_store import MpContextStore
 from smart.utils.process import on_process_init
-from smart.utils.number import safe_parse_int
-from smart.utils.dict import dict_get_or_set
+from smart.utils.number import safe_parse_int, safe_parse_float
+from smart.utils.cast import cast_bool
+from smart.utils.startup_profile import StartupProfile
+from smart.utils.dict import dict_get_or_set, dict_find
+from smart.utils.file.watch import FileWatcher
 # from smart.utils.log import auto_load_logging_config, set_default_logging_config
 
 from smart.rest import cron_timing
@@ -16,23 +19,95 @@ from smart.rest import cron_timing
 from smart.auto.run import auto_run
 
 from smart.aaas.base import AutoTaskDoneFlag
-from smart.aaas.process_pool import Pool
+from smart.aaas.process_pool import Pool, ReusePool, recycle_current_worker
+from smart.aaas.scheduler import TaskScheduler
+from smart.aaas.task_registry import TaskRegistry, NsTaskDict, TaskState
+from smart.aaas.utils.task_info import TaskStageNotifier
+from smart.aaas.config import smart_env
 from smart.aaas.state.state_hook import get_hook, report_state
 from smart.aaas.__logger import logger
 from smart.aaas.task_log import TaskFileLog
+from smart.aaas.task_log.file_log import update_logger_stream
+
+
+# 复用的工作进程内: 正在运行的任务 (task_ns, task_id); 每个任务使用反序列化的 AutoManage 副本, 因此记录在模块中
+_worker_running_task = [None]
+
+
+class WorkerSnapshot:
+    """复用工作进程的初始状态, 每个任务结束后恢复, 避免任务之间互相影响
+    """
+    current:'WorkerSnapshot' = None
+
+    def __init__(self):
+        self.app_env = dict(AppEnv.all(False))
+        self.environ = dict(os.environ)
+        self.stdout = sys.stdout
+        self.stderr = sys.stderr
+        self.start_method = mp.get_start_method(allow_none=True)
+
+    @classmethod
+    def capture(cls):
+        cls.current = cls()
+
+    @classmethod
+    def restore(cls):
+        snapshot = cls.current
+        if snapshot is None:
+            return
+
+        # auto_run 结束时会清空 AppEnv, 恢复工作进程启动时的配置
+        AppEnv.clean()
+        AppEnv.update(snapshot.app_env)
+
+        if os.environ != snapshot.environ:
+            os.environ.clear()
+            os.environ.update(snapshot.environ)
+
+        # TaskFileLog 替换的标准输出及日志流
+        for name, stream in (('stdout', snapshot.stdout), ('stderr', snapshot.stderr)):
+            cur_stream = getattr(sys, name)
+            if cur_stream is not stream:
+                update_logger_stream(cur_stream, stream)
+                setattr(sys, name, stream)
+
+        if mp.get_start_method(allow_none=True) != snapshot.start_method:
+            mp.set_start_method(snapshot.start_method, True)
+
+        StartupProfile.stop()
+        # 回收任务遗留的已结束子进程
+        mp.active_children()
+        gc.collect()
 
 
 class AutoManage:
     DEBUG_CLEAN = False
     all_instances = set()
+    # 是否复用工作进程执行多个任务, None表示读取环境变量 AAAS_REUSE_WORKER, 缺省每个任务新建进程
+    Opt_Reuse_Worker = None
+    # 复用工作进程时, 每个工作进程执行的最大任务数, None表示读取环境变量 AAAS_WORKER_MAX_TASKS
+    Opt_Worker_Max_Tasks = None
+    # 复用工作进程时, 工作进程常驻内存上限(MB), None表示读取环境变量 AAAS_WORKER_MAX_RSS
+    Opt_Worker_Max_Rss = None
 
     def __init__(self):
         self.__inited = False
         self.store = None
+        self.tasks = None
         self._jobs = None
+        # 工作进程/调度进程上报任务阶段变化, 服务进程接收后通知等待的线程
+        self._stage_queue = None
+        self.stage_notifier = None
         self.main_process = None
         self.mp_pool = None
         self.worker_num = None
+        self.reuse_worker = False
+        self.worker_max_tasks = None
+        self.worker_max_rss = None
+        self.scheduler = None
+        self.scheduler_config = None
+        self._scheduler_metrics_ts = 0
+        self._pool_closed = False
     
     def task_uuid(self):
         """Generate Task UUID
@@ -56,7 +131,9 @@ class AutoManage:
             task_id {str} -- Task UUID
             task_ns {str} -- Task Namespace
         """
-        on_process_init()
+        if not self.reuse_worker:
+            # 复用的工作进程在启动时已初始化
+            on_process_init()
         
         task_log, resp = None, {}
 
@@ -65,9 +142,8 @@ class AutoManage:
                 delay = safe_parse_int((run_opts or {}).pop('delay', 0), 0)
 
                 task_dict = self.get_task_dict(task_ns)
-                task_info = task_dict.get(task_id)
 
-                with self.store.lock('task_info'):
+                with task_dict.lock(task_id):
                     task_info = task_dict.get(task_id)
 
                     if task_info is not None:
@@ -86,6 +162,9 @@ class AutoManage:
                             logger.warning('duplicate call_auto_run: %s', task_info)
                             return resp
                         
+                        if self.reuse_worker:
+                            # 在写入pid前记录, 获得pid的 end_task 发送的SIGINT不会被忽略
+                            _worker_running_task[0] = (task_ns, task_id)
                         process_info.update({
                             'pid': os.getpid(),
                             'ppid': os.getppid()
@@ -96,6 +175,9 @@ class AutoManage:
                         stage_list.append('start')
                         task_dict[task_id] = task_info
                 
+                if task_info is not None:
+                    self._notify_stage(task_ns, task_id, 'start')
+
                 if delay > 0:
                     logger.debug('delay task %s %d seconds', (task_id, task_ns), delay)
                     time.sleep(delay)
@@ -131,12 +213,48 @@ class AutoManage:
 
             resp['done_flag'] = AutoTaskDoneFlag.interrupt.flag_value
             logger.info('task %s end (KeyboardInterrupt)', task_id)
+
+            if self.reuse_worker:
+                # 被中断的任务可能遗留不一致的状态, 回收工作进程
+                recycle_current_worker()
         
         finally:
             if task_log:
                 task_log.close(reset_logger=True)
 
+            if self.reuse_worker:
+                _worker_running_task[0] = None
+                WorkerSnapshot.restore()
+
         return resp
+
+    def _init_reuse_worker(self):
+        """复用工作进程的初始化函数
+        """
+        on_process_init()
+        WorkerSnapshot.capture()
+        signal.signal(signal.SIGINT, self._on_worker_sigint)
+
+    def _on_worker_sigint(self, signum, frame):
+        """复用工作进程的SIGINT处理: 仅当正在运行的任务被标记 end_flag 时中断任务,
+        工作进程已开始执行下一个任务时, 前一个任务的结束信号被忽略
+        """
+        running_task = _worker_running_task[0]
+        if running_task is None:
+            logger.info('worker %s ignore SIGINT, no running task', os.getpid())
+            return
+
+        task_ns, task_id = running_task
+        try:
+            task_info = self.tasks.get(task_ns, task_id)
+        except Exception as e:
+            logger.warning('worker %s read task %s error: %s', os.getpid(), running_task, e)
+            task_info = None
+
+        if task_info is not None and not task_info.get('end_flag'):
+            logger.info('worker %s ignore SIGINT, task %s is not ended', os.getpid(), running_task)
+            return
+        raise KeyboardInterrupt()
     
     def __end_flag(self):
         return self.store.value('end_flag').get(False)
@@ -151,12 +269,23 @@ class AutoManage:
         # 这两个个变量无法被pickle.dumps, 后台进程也用不到它们，所以设置为None
         self._jobs, self.main_process = None, None
             
-        pool_kwargs = {
-            'processes': self.worker_num,
-            'maxtasksperchild': 1
-        }
-        self.mp_pool = Pool(**pool_kwargs)
+        if self.reuse_worker:
+            pool_kwargs = {
+                'processes': self.worker_num,
+                'max_tasks': self.worker_max_tasks,
+                'max_rss_mb': self.worker_max_rss
+            }
+            self.mp_pool = ReusePool(initializer=self._init_reuse_worker, **pool_kwargs)
+        else:
+            pool_kwargs = {
+                'processes': self.worker_num,
+                'maxtasksperchild': 1
+            }
+            self.mp_pool = Pool(**pool_kwargs)
         logger.debug('Auto Task Pool Options: %s', pool_kwargs)
+
+        self.scheduler = TaskScheduler(self.worker_num, config=self.scheduler_config)
+        logger.debug('Auto Task Scheduler Options: %s', self.scheduler_config)
         
         try:
             while not self.__end_flag():
@@ -173,7 +302,10 @@ class AutoManage:
                     continue
                 except KeyboardInterrupt:
                     break
+                finally:
+                    self.__update_scheduler_metrics()
         finally:
+            self._pool_closed = True
             self.mp_pool.close()
             self.mp_pool.join()
             logger.debug('auto manage backend_job exit')
@@ -184,19 +316,45 @@ class AutoManage:
         if not self.__inited:
             self.__inited = True
             self.store = MpContextStore()
+            self.tasks = TaskRegistry(
+                dir_path = smart_env.get(('task_registry', 'dir_path')),
+                lock_stripes = safe_parse_int(smart_env.get(('task_registry', 'lock_stripes')), 64)
+            )
             # self._jobs = mp.Queue()
             self._jobs = self.store.manager.Queue()
+            self._stage_queue = self.store.manager.Queue()
+            self.stage_notifier = TaskStageNotifier()
             self.main_process = mp.Process(
                 target=self._backend_job, 
                 args=(self._jobs, )
             )
             self.worker_num = int(AppEnv.get('AUTO_WORKER_NUM', 2))
+            self.scheduler_config = smart_env.get('scheduler', {})
+            self.__init_reuse_opts()
             self.all_instances.add(self)
-
-            # spawn进程模式下, call_auto_run进程新建的store再次使用时报错
-            # 临时修复方案: 预创建 call_auto_run 需要用的store
-            self.store.lock('task_info')
     
+    def __init_reuse_opts(self):
+        cls = type(self)
+
+        if cls.Opt_Reuse_Worker is not None:
+            self.reuse_worker = bool(cls.Opt_Reuse_Worker)
+        else:
+            self.reuse_worker = cast_bool(AppEnv.get('AAAS_REUSE_WORKER'))
+        
+        if not self.reuse_worker:
+            return
+
+        max_tasks = cls.Opt_Worker_Max_Tasks
+        if max_tasks is None:
+            max_tasks = safe_parse_int(AppEnv.get('AAAS_WORKER_MAX_TASKS', 100))
+        max_rss = cls.Opt_Worker_Max_Rss
+        if max_rss is None:
+            max_rss = safe_parse_float(AppEnv.get('AAAS_WORKER_MAX_RSS'))
+
+        self.worker_max_tasks = max_tasks or None
+        self.worker_max_rss = max_rss or None
+        logger.info('AutoManage reuse worker: max_tasks=%s, max_rss=%sMB', self.worker_max_tasks, self.worker_max_rss)
+
     def start(self):
         """call in main process
         """
@@ -204,9 +362,40 @@ class AutoManage:
         
         self.main_process.start()
         logger.info('AutoManage started pid=%s', self.main_process.pid)
+
+        threading.Thread(target=self.__stage_listen, args=(self._stage_queue, ), name='AutoManage-stage', daemon=True).start()
         
         return self.main_process
     
+    def _notify_stage(self, task_ns, task_id, stage, log_file_path=None):
+        """call in any process: 上报任务阶段变化
+        """
+        if self._stage_queue is None:
+            return
+        try:
+            self._stage_queue.put_nowait((task_ns or '', task_id, stage, log_file_path))
+        except Exception as e:
+            logger.debug('notify task stage %s error: %s', (task_ns, task_id, stage), e)
+
+    def __stage_listen(self, stage_queue):
+        """main process thread: 接收任务阶段变化, 唤醒等待任务阶段及跟踪任务日志的线程
+        """
+        while True:
+            try:
+                msg = stage_queue.get()
+            except Exception:
+                # manager 已关闭
+                break
+            if msg is None:
+                break
+
+            task_ns, task_id, stage, log_file_path = msg
+            self.stage_notifier.notify(task_ns, task_id)
+
+            if log_file_path:
+                # 任务结束后日志不再变化, 唤醒跟踪日志的线程检查任务状态
+                FileWatcher.default().notify(log_file_path)
+
     def _create_task_cb(self, event, task_ns_id, task_result):
         logger.info("task callback-%s %s %s", event, task_ns_id, task_result)
 
@@ -226,28 +415,32 @@ class AutoManage:
             err_traceback = task_result.get('error_traceback')
         
         task_dict = self.get_task_dict(task_ns)
-        task_info = task_dict.get(task_id)
 
-        if not task_info:
-            logger.warning("task %s missing task_info", task_ns_id)
-            return
+        with task_dict.lock(task_id):
+            task_info = task_dict.get(task_id)
 
-        task_info['done_time'] = time.time()
-        task_info['done_flag'] = task_result.get('done_flag', AutoTaskDoneFlag.done.flag_value)
-        
-        if rst_err:
-            task_info['exception'] = {
-                'type': type(rst_err).__name__,
-                'info': rst_err.args,
-                'traceback': err_traceback
-            }
-        
-        if rst is not None:
-            task_info['task_resp'] = rst
-        
-        stage_list = dict_get_or_set(task_info, ('stage'), [])
-        stage_list.append('end')
-        task_dict[task_id] = task_info
+            if not task_info:
+                logger.warning("task %s missing task_info", task_ns_id)
+                return
+
+            task_info['done_time'] = time.time()
+            task_info['done_flag'] = task_result.get('done_flag', AutoTaskDoneFlag.done.flag_value)
+            
+            if rst_err:
+                task_info['exception'] = {
+                    'type': type(rst_err).__name__,
+                    'info': rst_err.args,
+                    'traceback': err_traceback
+                }
+            
+            if rst is not None:
+                task_info['task_resp'] = rst
+            
+            stage_list = dict_get_or_set(task_info, ('stage'), [])
+            stage_list.append('end')
+            task_dict[task_id] = task_info
+
+        self._notify_stage(task_ns, task_id, 'end', dict_find(task_info, ('task_log', 'file_path')))
         # 任务状态上报
         try:
             state_hook = task_info.get('state_hook')
@@ -256,16 +449,84 @@ class AutoManage:
             logger.warning("state_hook error: %s", e)
     
     def _create_task(self, task_id, task_ns, module, name, run_opts, **kwargs):
-        """backend job
+        """backend job: 任务提交到调度器, 再按调度顺序分派到进程池
+        """
+        task_info = {
+            'task_id': task_id,
+            'task_ns': task_ns,
+            'module': module,
+            'name': name,
+            'run_opts': run_opts,
+            'priority': kwargs.get('priority')
+        }
+
+        if not self.scheduler.submit(task_info):
+            logger.warning('task %s rejected, queue of namespace %s is full', task_id, task_ns)
+            self._create_task_cb('done', (task_ns, task_id), {
+                'done_flag': AutoTaskDoneFlag.rejected.flag_value,
+                'error': Exception('task queue of namespace {} is full'.format(task_ns))
+            })
+            return
+
+        self._dispatch_tasks()
+
+    def _dispatch_tasks(self):
+        """backend job: 在运行名额内分派调度器中排队的任务
         """
+        while not self._pool_closed:
+            task_info = self.scheduler.next_task()
+            if task_info is None:
+                break
+            self._apply_task(**task_info)
+
+    def _on_task_done(self, event, task_ns_id, task_result):
+        # 在进程池的结果处理线程中调用, 异常会导致该线程退出, 需捕获
+        try:
+            try:
+                self._create_task_cb(event, task_ns_id, task_result)
+            finally:
+                self.scheduler.on_done(task_ns_id[0] or '')
+                self._dispatch_tasks()
+                self.__update_scheduler_metrics()
+        except Exception as e:
+            logger.exception(e)
+
+    def __update_scheduler_metrics(self, interval:float=1):
+        # 调度器指标写入 store, 供其他进程查询; 限制写入频率
+        if self.scheduler is None or time.time() - self._scheduler_metrics_ts < interval:
+            return
+        self._scheduler_metrics_ts = time.time()
+        try:
+            self.store.value('scheduler_metrics').set(self.scheduler.metrics())
+        except Exception as e:
+            logger.warning('update scheduler metrics error: %s', e)
+
+    def scheduler_metrics(self) -> dict:
+        """call in any process
+
+        Returns:
+            dict -- 调度器指标 {running, max_running, queued, namespaces: {task_ns: {queued, running, ...}}, update_time}
+        """
+        return self.store.value('scheduler_metrics').get({})
+
+    def _apply_task(self, task_id, task_ns, module, name, run_opts, **kwargs):
         pool = self.mp_pool
 
-        pool_result = pool.apply_async(
-            self.call_auto_run, 
-            args = (module, name, run_opts, task_id, task_ns), 
-            callback = functools.partial(self._create_task_cb, 'done', (task_ns, task_id)), 
-            error_callback = functools.partial(self._create_task_cb, 'error', (task_ns, task_id))
-        )
+        try:
+            pool_result = pool.apply_async(
+                self.call_auto_run, 
+                args = (module, name, run_opts, task_id, task_ns), 
+                callback = functools.partial(self._on_task_done, 'done', (task_ns, task_id)), 
+                error_callback = functools.partial(self._on_task_done, 'error', (task_ns, task_id))
+            )
+        except ValueError as e:
+            # 进程池已关闭(服务退出时, 结果处理线程仍在分派任务), 任务按中断结束
+            logger.warning('aaas.auto_run %s skip, %s', (task_ns, task_id), e)
+            try:
+                self._create_task_cb('done', (task_ns, task_id), {'done_flag': AutoTaskDoneFlag.interrupt.flag_value})
+            finally:
+                self.scheduler.on_done(task_ns or '')
+            return
 
         try:
             run_result = pool_result.get(timeout=0)
@@ -278,7 +539,7 @@ class AutoManage:
         except Exception as run_err:
             logger.error("_create_task error: %s", run_err)
 
-    def create_task(self, task_id, task_ns, module, name, run_opts, state_hook=None):
+    def create_task(self, task_id, task_ns, module, name, run_opts, state_hook=None, priority=None):
         """call in any process
         
         Arguments:
@@ -287,6 +548,10 @@ class AutoManage:
             module {str} -- dotted module path
             name {str} -- tree name or task expression(with namspace prefix 'task:')
             run_opts {dict} -- auto_run fn kwargs
+
+        Keyword Arguments:
+            state_hook {dict} -- 任务状态上报配置 (default: {None})
+            priority {float} -- 命名空间内的任务优先级, 数值大的先执行 (default: {None})
         
         Returns:
             dict -- task info {task_id, task_ns, module, name, run_opts, create_time, end_flag, process, done_flag, done_time}
@@ -294,68 +559,46 @@ class AutoManage:
         if not task_id:
             task_id = self.task_uuid()
 
-        task_dict = self.get_task_dict(task_ns)
-        task_info = task_dict.get(task_id)
+        task_info = self.tasks.get(task_ns, task_id)
 
         if task_info is not None:
             return task_info
         
-        with self.store.lock((task_ns or '', 'task_dict')):
-            task_info = task_dict.get(task_id)
+        task_info = {
+            'task_id': task_id,
+            'task_ns': task_ns,
+            'module': module,
+            'name': name,
+            'run_opts': run_opts,
+            'create_time': time.time(),
+        }
+        if state_hook:
+            task_info['state_hook'] = state_hook
+        if priority is not None:
+            task_info['priority'] = priority
 
-            if task_info is not None:
-                return task_info
-            
-            task_info = {
-                'task_id': task_id,
-                'task_ns': task_ns,
-                'module': module,
-                'name': name,
-                'run_opts': run_opts,
-                'create_time': time.time(),
-            }
-            if state_hook:
-                task_info['state_hook'] = state_hook
-            task_dict[task_id] = task_info
+        exist_task_info = self.tasks.create(task_ns, task_info)
+
+        if exist_task_info is not None:
+            return exist_task_info
 
         self._jobs.put(('_create_task', task_info))
 
         return task_info
 
-    def get_task_dict(self, namespace):
-        return self.store.dict(('task_dict', namespace or ''))
+    def get_task_dict(self, namespace) -> NsTaskDict:
+        return NsTaskDict(self.tasks, namespace)
     
     def all_task_ns(self):
-        for store_key in self.store.get_names('dict'):
-            if isinstance(store_key, tuple) and len(store_key) == 2 and store_key[0] == 'task_dict':
-                yield store_key[1]
+        for task_ns in self.tasks.namespaces():
+            yield task_ns
     
     def clean_task_dict(self, task_ns, task_info_ttl:int):
-        task_dict = self.get_task_dict(task_ns)
-        clean_task_ids = []
-
         expire_ts = time.time() - task_info_ttl
 
-        for task_id, task_info in task_dict.items():
-            if not task_info:
-                clean_task_ids.append(task_id)
-
-            if task_info.get('done_flag'):
-                done_time = task_info.get('done_time')
-                if done_time and done_time > expire_ts:
-                    # in ttl
-                    continue
-                clean_task_ids.append(task_id)
+        clean_task_ids = self.tasks.clean_expired(task_ns, expire_ts)
         
         if len(clean_task_ids):
-            with self.store.lock((task_ns or '', 'task_dict')):
-                task_dict = self.get_task_dict(task_ns)
-                for task_id in clean_task_ids:
-                    try:
-                        del task_dict[task_id]
-                    except KeyError:
-                        pass
-            
             logger.info('AutoManage.clean_task_dict ns=%s, ids=%s', task_ns, clean_task_ids)
         
         return clean_task_ids
@@ -372,21 +615,19 @@ class AutoManage:
         Returns:
             dict -- task info {task_id, task_ns, module, name, run_opts, create_time, end_flag, process, done_flag, done_time}
         """
-        tasks = self.get_task_dict(namespace)
-
-        return tasks.get(task_id, {})
+        return self.tasks.get(namespace, task_id) or {}
     
     def flag_end_if_no_start(self, task_dict, task_id):
         """Mark end_flag in the task_info dict if the task is not started
         
         Arguments:
-            task_dict {dict} -- {task_id : task_info}
+            task_dict {NsTaskDict} -- {task_id : task_info}
             task_id {str} -- task_id
         
         Returns:
             bool -- Whether to mark end_flag in the task_info
         """
-        with self.store.lock('task_info'):
+        with task_dict.lock(task_id):
             task_info = task_dict.get(task_id)
 
             if task_info is None:
@@ -405,14 +646,14 @@ class AutoManage:
     def end_all_ns_task(self, task_ns):
         task_dict = self.get_task_dict(task_ns)
         
-        if task_dict:
-            for task_id in list(task_dict.keys()):
+        for state in (TaskState.queued, TaskState.running):
+            for task_id in self.tasks.task_ids(task_ns, state=state):
                 self.end_task(task_dict, task_id)
         
         logger.debug('end all task in namespace %s', task_ns)
     
     def end_task(self, task_dict, task_id):
-        if not task_dict:
+        if task_dict is None:
             return 0
 
         task_info = task_dict.get(task_id)
@@ -426,8 +667,21 @@ class AutoManage:
         process_info = task_info.get('process')
 
         if process_info is None:
-            if self.auto_manage.flag_end_if_no_start(task_dict, task_id):
+            if self.flag_end_if_no_start(task_dict, task_id):
                 return 1
+            process_info = task_dict.get(task_id, {}).get('process') or {}
+
+        if self.reuse_worker:
+            # 工作进程会执行多个任务, 先按任务标记 end_flag, 工作进程只在当前任务有 end_flag 时响应SIGINT
+            with task_dict.lock(task_id):
+                task_info = task_dict.get(task_id)
+                if not task_info:
+                    return 0
+                if task_info.get('done_flag'):
+                    return 1
+                task_info['end_flag'] = 1
+                task_dict[task_id] = task_info
+                process_info = task_info.get('process') or {}
 
         pid = process_info.get('pid')
 
@@ -447,6 +701,8 @@ class AutoManage:
         _dict = self.__dict__.copy()
         _dict.update(
             mp_pool=None,
+            scheduler=None,
+            stage_notifier=None,
             # main_process=None,
             _jobs=None
         )
@@ -469,6 +725,7 @@ class AutoManage:
         if self.__inited:
             self.store.value('end_flag').set(True)
             self._jobs.put(('break', None))
+            self._stage_queue.put(None)
 
             all_namespace = list(self.all_task_ns())
 
@@ -485,6 +742,9 @@ class AutoManage:
                 
             if self.store:
                 self.store.close()
+            
+            if self.tasks:
+                self.tasks.close()
 
             logger.debug('auto manage closed')
 
@@ -15,6 +15,9 @@ class AutoTaskDoneFlag(Enum):
     # 任务执行时被终止 (/auto/end_task)
     interrupt = 3
 
+    # 命名空间排队任务达到上限, 任务被拒绝
+    rejected = 4
+
     @property
     def flag_value(self):
         return self.value
\ No newline at end of file
@@ -1,12 +1,49 @@
 import re, requests, json, time
 import uuid
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 
 from smart.utils.base import ApiException
 from smart.utils.dict import dict_safe_set, dict_safe_get
 from smart.utils.number import safe_parse_int
+from .base import AaasErrorCode
 from .__logger import logger
 
 
+def iter_sse_events(chunk_iter):
+    """解析 Server-Sent Events 数据流
+
+    Arguments:
+        chunk_iter {iterable} -- 响应数据块(bytes)
+
+    Yields:
+        tuple -- (event, data, id), data 为 json 解析后的数据; 注释行(心跳)被忽略
+    """
+    buf = b''
+    for chunk in chunk_iter:
+        if not chunk:
+            continue
+        buf += chunk.replace(b'\r\n', b'\n')
+        while True:
+            pos = buf.find(b'\n\n')
+            if pos < 0:
+                break
+            block, buf = buf[:pos], buf[pos+2:]
+            event, data_lines, event_id = 'message', [], None
+            for line in block.decode('utf8').split('\n'):
+                if not line or line.startswith(':'):
+                    continue
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'event':
+                    event = value
+                elif field == 'data':
+                    data_lines.append(value)
+                elif field == 'id':
+                    event_id = value
+            if data_lines:
+                yield event, json.loads('\n'.join(data_lines)), event_id
+
+
 class AaasClient:
     Default_Retry_Num = 2
     Default_Retry_Interval = 3.0
@@ -118,7 +155,7 @@ class AaasClient:
         return self.__call_api('/auto/run', query, post_data)
 
     def create_task(self, task_name, task_id = None, module=None, 
-            configs=None, bind_arg=None, run_opts=None, state_hook=None):
+            configs=None, bind_arg=None, run_opts=None, state_hook=None, priority=None):
         module = module or self.module
         assert module is not None
 
@@ -143,6 +180,8 @@ class AaasClient:
             'module': module,
             'task_id': task_id,
         }
+        if priority is not None:
+            query['priority'] = priority
         
         return self.__call_api('/auto/run', query, post_data=post_data)
     
@@ -153,8 +192,40 @@ class AaasClient:
         })
     
     @staticmethod
-    def _parse_log_stream(resp:requests.Response):
+    def _parse_resp_headers(resp:requests.Response):
         headers = dict(resp.headers)
+        info = {}
+        for _name, _val in headers.items():
+            _key_path = _name.lower().replace('-', '_').split('_', 1)
+            if _key_path[0] in ('aaas', 'app'):
+                dict_safe_set(info, _key_path, _val)
+
+        err_code = safe_parse_int(dict_safe_get(info, ('app', 'error_code'), 0))
+        err_msg = dict_safe_get(info, ('app', 'error_msg'))
+        if err_code:
+            raise ApiException(err_msg, err_code)
+        return headers, info
+
+    @staticmethod
+    def _parse_event_stream(resp:requests.Response):
+        headers, info = AaasClient._parse_resp_headers(resp)
+
+        raw_read1 = getattr(resp.raw, 'read1', None)
+        if raw_read1 is not None:
+            # 读取已到达的数据, 不等待填满缓冲区
+            chunk_iter = iter(lambda: raw_read1(8192), b'')
+        else:
+            chunk_iter = resp.iter_content(chunk_size=1, decode_unicode=False)
+
+        return {
+            'headers': headers,
+            'info': info,
+            'event_iter': iter_sse_events(chunk_iter)
+        }
+
+    @staticmethod
+    def _parse_log_stream(resp:requests.Response):
+        headers, info = AaasClient._parse_resp_headers(resp)
         stream = resp.iter_content(chunk_size=1, decode_unicode=False)
         def _line_iter_fn():
             prev = None
@@ -167,22 +238,11 @@ class AaasClient:
             if prev:
                 yield prev
 
-        resp_dict = {
+        return {
             'headers': headers,
-            'info': {},
+            'info': info,
             'line_iter': _line_iter_fn()
         }
-        for _name, _val in headers.items():
-            _key_path = _name.lower().replace('-', '_').split('_', 1)
-            if _key_path[0] in ('aaas', 'app'):
-                dict_safe_set(resp_dict['info'], _key_path, _val)
-
-        err_code = safe_parse_int(dict_safe_get(resp_dict, ('info', 'app', 'error_code'), 0))
-        err_msg = dict_safe_get(resp_dict, ('info', 'app', 'error_msg'))
-        if err_code:
-            raise ApiException(err_msg, err_code)
-        
-        return resp_dict
 
     def task_log(self, task_id, pool_interval:int=10, pool_line:int=10, log_offset:int=0, 
                 tail_mode:bool=False, tail_line:int=0, tail_follow:bool=False):
@@ -196,6 +256,69 @@ class AaasClient:
             'tail_follow': tail_follow
         }, parse_fn=self._parse_log_stream, req_kwargs={'stream': True})
     
+    def task_log_stream(self, task_id, log_offset:int=0, tail_line:int=0, max_time:float=0, heartbeat:float=0):
+        """以 Server-Sent Events 方式获取任务日志, 一个连接内持续接收新增的日志行, 直至任务结束;
+        连接中断或单个连接达到 max_time 时, 从最后收到的位置重新连接(连续失败次数受 retry_num 限制)
+
+        Args:
+            task_id (str): 任务ID
+            log_offset (int, optional): 日志文件的偏移量(单位byte). Defaults to 0.
+            tail_line (int, optional): 非0时从末尾向前tail_line行开始读取, log_offset无效. Defaults to 0.
+            max_time (float, optional): 单个连接的最长时间(秒), 0表示不限制. Defaults to 0.
+            heartbeat (float, optional): 服务端心跳间隔(秒), 0表示服务端缺省值. Defaults to 0.
+
+        Raises:
+            ApiException: 任务不存在等服务端错误
+
+        Yields:
+            tuple: ('log', 一行日志bytes, 该行结束处的偏移量) 或 ('end', 任务状态dict, 偏移量)
+        """
+        retry_num = self._opt.get('retry_num') or 1
+        retry_interval = max(self._opt.get('retry_interval'), 0.5)
+        # 超过3倍心跳间隔仍无数据则认为连接已断开
+        read_timeout = 3 * (heartbeat if heartbeat and heartbeat > 0 else 15) + 1
+        fail_num = 0
+
+        while True:
+            query = {
+                'task_id': task_id,
+                'log_offset': log_offset,
+                'tail_line': tail_line,
+                'max_time': max_time,
+                'heartbeat': heartbeat
+            }
+            err = None
+            try:
+                resp = self.__call_api('/auto/task_log_stream', query, parse_fn=self._parse_event_stream, req_kwargs={
+                    'stream': True, 'timeout': (10, read_timeout), 'headers': {'Accept': 'text/event-stream'}
+                })
+                for event, data, event_id in resp['event_iter']:
+                    fail_num = 0
+                    if event == 'log':
+                        log_offset, tail_line = int(event_id), 0
+                        yield 'log', data.encode('utf8'), log_offset
+                    elif event == 'end':
+                        yield 'end', data, data.get('log_offset', log_offset)
+                        return
+                    elif event == 'timeout':
+                        log_offset, tail_line = data.get('log_offset', log_offset), 0
+                        break
+                    elif event == 'error':
+                        raise ApiException(data.get('msg'), AaasErrorCode.default)
+                else:
+                    err = ApiException('task_log_stream closed before task end', AaasErrorCode.default)
+            except (requests.RequestException, Urllib3HTTPError) as e:
+                # 直接读取 resp.raw 时, 连接断开/读取超时抛出 urllib3 的异常
+                err = e
+
+            if err is None:
+                continue
+            fail_num += 1
+            logger.warning("AaasClient task_log_stream failed %s/%s: %s", fail_num, retry_num, err)
+            if fail_num >= retry_num:
+                raise err
+            time.sleep(retry_interval)
+
     def all_task(self):
 
         return self.__call_api('/auto/all_task')
@@ -206,6 +329,12 @@ class AaasClient:
             'task_id': task_id,
         })
     
+    def scheduler_metrics(self):
+        """任务调度器指标: 各命名空间的排队/运行任务数, 排队等待时间等
+        """
+
+        return self.__call_api('/auto/scheduler_metrics')
+    
     def shut_down(self):
         """关闭aaas服务, 需要运行smart_aaas时加--shuttable启用远程关闭命令
         """
@@ -379,4 +508,29 @@ class AaasLogCat:
             if self._not_ready:
                 time.sleep(self._retry_interval_not_ready)
                 continue
-            tail_mode = False
\ No newline at end of file
+            tail_mode = False
+
+    def stream_all(self, line:int=0):
+        """使用 Server-Sent Events 连接读取所有数据, 新数据由服务端推送直至任务结束;
+        line=0时从当前文件位置读取, 否则从倒数第line行读取
+
+        Args:
+            line (int, optional): 从倒数第line行开始读取. Defaults to 0.
+
+        Yields:
+            byte: 一行日志, 从前往后读取
+        """
+        event_iter = self._client.task_log_stream(self._task_id,
+            log_offset=self.tell(),
+            tail_line=line,
+            max_time=self._pool_interval * 30
+        )
+        for event, data, log_offset in event_iter:
+            if event == 'end':
+                self._last_resp = data
+                self._task_is_end = True
+                if self._debug:
+                    logger.debug("AaasLogCat.stream_all end=%s", data)
+                break
+            yield data
+            self.seek(log_offset)
@@ -1,5 +1,10 @@
+import threading, queue
 import multiprocessing as mp
 from multiprocessing.pool import Pool as BasePool
+from multiprocessing.context import TimeoutError
+
+from smart.utils.process import process_rss_mb
+from smart.aaas.__logger import logger
 
 
 class NoDaemonProcess(mp.Process):
@@ -20,4 +25,214 @@ class NoDaemonContext(type(mp.get_context())):
 class Pool(BasePool):
     def __init__(self, *args, **kwargs):
         kwargs['context'] = NoDaemonContext()
-        super(Pool, self).__init__(*args, **kwargs)
\ No newline at end of file
+        super(Pool, self).__init__(*args, **kwargs)
+
+
+class WorkerLostError(Exception):
+    """工作进程在执行任务时异常退出"""
+    pass
+
+
+# 工作进程内: 当前任务结束后是否回收本进程
+_recycle_flag = [False]
+
+
+def recycle_current_worker():
+    """在 ReusePool 的工作进程中调用, 当前任务结束后回收本进程(如任务被中断, 进程状态不可信)
+    """
+    _recycle_flag[0] = True
+
+
+def _reuse_worker(conn, initializer, initargs, max_tasks, max_rss_mb):
+    if initializer is not None:
+        initializer(*initargs)
+
+    completed = 0
+
+    while True:
+        try:
+            task = conn.recv()
+        except KeyboardInterrupt:
+            # aaas 通过 SIGINT 结束任务, 空闲时收到的中断信号忽略
+            continue
+        except EOFError:
+            break
+
+        if task is None:
+            break
+
+        func, args = task
+        _recycle_flag[0] = False
+
+        try:
+            status, rst = 'done', func(*args)
+        except BaseException as e:
+            status, rst = 'error', e
+
+        completed += 1
+        recycle = _recycle_flag[0] \
+            or bool(max_tasks and completed >= max_tasks) \
+            or bool(max_rss_mb and (process_rss_mb() or 0) > max_rss_mb)
+
+        try:
+            conn.send((status, rst, recycle))
+        except Exception as e:
+            conn.send(('error', Exception('send result error: {}'.format(e)), recycle))
+
+        if recycle:
+            break
+
+
+class ReuseResult:
+    """ReusePool.apply_async 的返回值, 接口与 multiprocessing.pool.AsyncResult 一致
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._success = None
+        self._value = None
+
+    def _set(self, success, value):
+        self._success, self._value = success, value
+        self._event.set()
+
+    def ready(self):
+        return self._event.is_set()
+
+    def successful(self):
+        if not self.ready():
+            raise ValueError('{!r} not ready'.format(self))
+        return self._success
+
+    def wait(self, timeout=None):
+        self._event.wait(timeout)
+
+    def get(self, timeout=None):
+        self.wait(timeout)
+        if not self.ready():
+            raise TimeoutError
+        if self._success:
+            return self._value
+        raise self._value
+
+
+class ReusePool:
+    """可复用工作进程的进程池
+
+    工作进程连续执行多个任务, 在以下情况回收并替换为新进程: 执行任务数达到 max_tasks, 常驻内存超过 max_rss_mb,
+    任务中调用 recycle_current_worker, 或进程异常退出(此时任务以 WorkerLostError 结束).
+    每个工作进程由一个线程管理, 从共享队列获取任务; 回调函数在该线程中执行.
+    """
+    def __init__(self, processes:int=None, max_tasks:int=None, max_rss_mb:float=None,
+            initializer:callable=None, initargs:tuple=()):
+        """构造函数
+
+        Keyword Arguments:
+            processes {int} -- 工作进程数 (default: {cpu_count})
+            max_tasks {int} -- 每个工作进程执行的最大任务数, None表示不限制 (default: {None})
+            max_rss_mb {float} -- 工作进程常驻内存上限(MB), None表示不限制 (default: {None})
+            initializer {callable} -- 工作进程启动时执行的初始化函数 (default: {None})
+            initargs {tuple} -- 初始化函数的参数 (default: {()})
+        """
+        self._ctx = NoDaemonContext()
+        self._processes = processes or mp.cpu_count()
+        self._max_tasks = max_tasks
+        self._max_rss_mb = max_rss_mb
+        self._initializer = initializer
+        self._initargs = initargs
+        self._tasks = queue.Queue()
+        self._closed = False
+        self._threads = []
+
+        for i in range(self._processes):
+            thread = threading.Thread(target=self._worker_loop, args=(i, ), name='ReusePool-{}'.format(i), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _start_worker(self, idx):
+        parent_conn, child_conn = mp.Pipe()
+        process = self._ctx.Process(
+            target=_reuse_worker,
+            args=(child_conn, self._initializer, self._initargs, self._max_tasks, self._max_rss_mb),
+            name='ReusePoolWorker-{}'.format(idx)
+        )
+        process.start()
+        child_conn.close()
+        logger.debug('ReusePool start worker %s pid=%s', idx, process.pid)
+        return process, parent_conn
+
+    @staticmethod
+    def _stop_worker(process, conn, timeout=5):
+        try:
+            conn.send(None)
+        except Exception:
+            pass
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        conn.close()
+
+    def _worker_loop(self, idx):
+        # 预先启动工作进程, 提交任务时无需等待进程启动
+        process, conn = self._start_worker(idx)
+
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+
+            func, args, result, callback, error_callback = task
+
+            try:
+                conn.send((func, args))
+            except Exception as e:
+                # 任务参数序列化失败, 工作进程未收到任务
+                self._on_result(result, False, e, callback, error_callback)
+                continue
+
+            try:
+                status, rst, recycle = conn.recv()
+            except (EOFError, OSError) as e:
+                process.join()
+                status, rst, recycle = 'error', WorkerLostError(
+                    'worker pid={} exited with code {}: {!r}'.format(process.pid, process.exitcode, e)
+                ), True
+
+            self._on_result(result, status == 'done', rst, callback, error_callback)
+
+            if recycle:
+                logger.debug('ReusePool recycle worker %s pid=%s', idx, process.pid)
+                self._stop_worker(process, conn)
+                process, conn = self._start_worker(idx)
+
+        self._stop_worker(process, conn)
+
+    @staticmethod
+    def _on_result(result:ReuseResult, success, value, callback, error_callback):
+        result._set(success, value)
+        fn = callback if success else error_callback
+        if fn is None:
+            return
+        try:
+            fn(value)
+        except Exception as e:
+            logger.exception(e)
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None) -> ReuseResult:
+        if self._closed:
+            raise ValueError('ReusePool not running')
+        result = ReuseResult()
+        self._tasks.put((func, args, result, callback, error_callback))
+        return result
+
+    def close(self):
+        """不再接收新任务, 已提交的任务执行完成后工作进程退出"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._tasks.put(None)
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
@@ -5,6 +5,7 @@ import multiprocessing as mp
 from smart.utils.log import auto_load_logging_config, set_default_logging_config
 from smart.utils import AppEnv
 from smart.utils.signal import set_default_sig_handler
+from smart.utils.startup_profile import StartupProfile
 
 from smart.auto.parser import cmd_args
 
@@ -13,7 +14,7 @@ from smart.aaas.__logger import logger
 from .config import smart_env
 
 
-def run_aaas(port=80, worker_num=None, mp_mode=None, shuttable=False, task_log=None, **kwargs):
+def run_aaas(port=80, worker_num=None, mp_mode=None, shuttable=False, task_log=None, reuse_worker=None, profile_startup=None, **kwargs):
     """启动自动化服务
     
     Keyword Arguments:
@@ -22,9 +23,16 @@ def run_aaas(port=80, worker_num=None, mp_mode=None, shuttable=False, task_log=N
         mp_mode: 多进程模式, 可选: spawn, fork; windows仅支持spawn
         shuttable: 可通过客户端控制aaas服务关闭, 缺省 False; 生产环境不建议启用
         task_log: 任务日志输出, 缺省 None 表示关闭; 也可通过smart_env.yml配置aaas.task_log.dir_path启用
+        reuse_worker: 复用工作进程执行多个任务, 缺省 None 表示读取环境变量 AAAS_REUSE_WORKER(缺省每个任务新建进程);
+            env.AAAS_WORKER_MAX_TASKS: 每个工作进程执行的最大任务数, 缺省100; env.AAAS_WORKER_MAX_RSS: 工作进程内存上限(MB)
+        profile_startup: bool|str, 记录从进程启动到服务就绪的各阶段耗时(imports, service_init, ready)并输出日志;
+            字符串表示同时启用cProfile并输出到该文件(.prof后缀为二进制stats, 其他为文本)
         env.auto_m_clean_timing: 清理完成任务的定时任务间隔, 单位: second, 最小值: 5
         env.auto_m_task_info_ttl: 完成任务的存活时间, 单位: second, 最小值: 5
     """
+    if profile_startup:
+        StartupProfile.start('smart_aaas', cprofile_out=profile_startup if isinstance(profile_startup, str) else None)
+
     if set_default_sig_handler():
         logger.debug('set sig_interrupt_handler as default signal handler')
         
@@ -38,6 +46,9 @@ def run_aaas(port=80, worker_num=None, mp_mode=None, shuttable=False, task_log=N
     if task_log:
         smart_env.set(('task_log', 'dir_path'), task_log)
     
+    if reuse_worker is not None:
+        AppEnv.set('AAAS_REUSE_WORKER', int(bool(reuse_worker)))
+
     if shuttable:
         AppEnv.set('AAAS_REMOTE_SHUTTABLE', 1)
     
@@ -54,11 +65,16 @@ def run_aaas(port=80, worker_num=None, mp_mode=None, shuttable=False, task_log=N
         pid = os.getpid()
         logger.info('start aaas pid=%s, port=%s', pid, port)
         
-        runner = ServiceRunner(port=port)
+        with StartupProfile.phase('service_init'):
+            runner = ServiceRunner(port=port)
+
+            if shuttable:
+                runner.enable_remote_shuttable()
+
+        # daemon()阻塞运行服务, 启动耗时记录到服务就绪为止
+        StartupProfile.mark('ready')
+        StartupProfile.stop()
 
-        if shuttable:
-            runner.enable_remote_shuttable()
-        
         runner.daemon()
     except KeyboardInterrupt as e:
 
@@ -68,6 +84,8 @@ def run_aaas(port=80, worker_num=None, mp_mode=None, shuttable=False, task_log=N
         logger.info('End aaas')
     finally:
 
+        StartupProfile.stop()
+
         if runner:
             runner.auto_manage.close()
 
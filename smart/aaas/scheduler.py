@@ -0,0 +1,181 @@
+import heapq, itertools, threading, time
+
+from smart.utils.number import safe_parse_int, safe_parse_float
+
+from smart.aaas.__logger import logger
+
+
+class NsTaskQueue:
+    """命名空间的任务队列, 按优先级(数值大的优先)及提交顺序出队
+    """
+    def __init__(self, task_ns:str, weight:float=1, max_running:int=None, max_queued:int=None):
+        self.task_ns = task_ns
+        self.weight = weight if weight and weight > 0 else 1
+        self.max_running = max_running or None
+        self.max_queued = max_queued or None
+        self.heap = []
+        self.running = 0
+        # 虚拟时间: 每分派一个任务递增 1/weight, 优先分派虚拟时间小的队列, 分派次数按权重比例分配
+        self.vtime = 0.0
+        self.submitted = 0
+        self.dispatched = 0
+        self.done = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self.heap)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.heap) or self.running > 0
+
+    def runnable(self) -> bool:
+        return bool(self.heap) and (self.max_running is None or self.running < self.max_running)
+
+    def share(self) -> tuple:
+        # 虚拟时间小的队列优先, 其次运行份额(运行任务数/权重), 再次队首任务的提交顺序
+        return (self.vtime, self.running / self.weight, self.heap[0][1])
+
+    def metrics(self) -> dict:
+        return {
+            'queued': self.queued,
+            'running': self.running,
+            'submitted': self.submitted,
+            'dispatched': self.dispatched,
+            'done': self.done,
+            'rejected': self.rejected,
+            'weight': self.weight,
+            'max_running': self.max_running,
+            'max_queued': self.max_queued,
+            'wait_avg': round(self.wait_total / self.dispatched, 6) if self.dispatched else None,
+            'wait_max': round(self.wait_max, 6),
+        }
+
+
+class TaskScheduler:
+    """aaas 任务调度器
+
+    任务按 task_ns 分队列, 队列内按优先级及提交顺序排序; 各队列按权重公平分配运行名额(虚拟时间最小的队列优先,
+    同时排队的命名空间分派次数与权重成正比), 并受命名空间的并发上限及队列长度上限约束.
+
+    smart_env.yml 配置示例:
+
+        aaas:
+          scheduler:
+            max_running: 4          # 同时运行的任务总数, 缺省为工作进程数
+            default:                # 未单独配置的命名空间
+              weight: 1
+              max_running: 0        # 命名空间并发上限, 0表示不限制
+              max_queued: 0         # 命名空间排队任务上限, 超出时拒绝任务, 0表示不限制
+            namespaces:
+              batch:
+                weight: 1
+                max_running: 2
+              online:
+                weight: 4
+    """
+    def __init__(self, max_running:int, config:dict=None):
+        config = config or {}
+        self.max_running = safe_parse_int(config.get('max_running')) or max_running
+        self.default_config = config.get('default') or {}
+        self.ns_config = config.get('namespaces') or {}
+        self.queues = {}
+        self.running = 0
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    def _get_queue(self, task_ns) -> NsTaskQueue:
+        ns_queue = self.queues.get(task_ns)
+
+        if ns_queue is None:
+            ns_config = {**self.default_config, **(self.ns_config.get(task_ns) or {})}
+            ns_queue = self.queues[task_ns] = NsTaskQueue(
+                task_ns,
+                weight = safe_parse_float(ns_config.get('weight'), 1),
+                max_running = safe_parse_int(ns_config.get('max_running')),
+                max_queued = safe_parse_int(ns_config.get('max_queued'))
+            )
+
+        return ns_queue
+
+    def submit(self, task_info:dict) -> bool:
+        """提交任务
+
+        Arguments:
+            task_info {dict} -- 任务信息, 读取 task_ns, priority, create_time
+
+        Returns:
+            bool -- False 表示命名空间排队任务已达上限, 任务被拒绝
+        """
+        task_ns = task_info.get('task_ns') or ''
+        priority = safe_parse_float(task_info.get('priority'), 0)
+
+        with self._lock:
+            ns_queue = self._get_queue(task_ns)
+            ns_queue.submitted += 1
+
+            if ns_queue.max_queued is not None and ns_queue.queued >= ns_queue.max_queued:
+                ns_queue.rejected += 1
+                return False
+
+            if not ns_queue.active:
+                # 空闲队列重新激活时, 虚拟时间追赶到活跃队列的最小值, 避免累积空闲期的份额
+                active_vtimes = [q.vtime for q in self.queues.values() if q.active]
+                if active_vtimes:
+                    ns_queue.vtime = max(ns_queue.vtime, min(active_vtimes))
+
+            heapq.heappush(ns_queue.heap, (-priority, next(self._seq), time.time(), task_info))
+
+        return True
+
+    def next_task(self) -> dict:
+        """取出下一个可运行的任务并计入运行数, 无可运行任务时返回None
+        """
+        with self._lock:
+            if self.max_running and self.running >= self.max_running:
+                return None
+
+            candidates = [q for q in self.queues.values() if q.runnable()]
+            if not candidates:
+                return None
+
+            ns_queue = min(candidates, key=NsTaskQueue.share)
+            _, _, submit_ts, task_info = heapq.heappop(ns_queue.heap)
+
+            wait = time.time() - submit_ts
+            ns_queue.running += 1
+            ns_queue.dispatched += 1
+            ns_queue.vtime += 1 / ns_queue.weight
+            ns_queue.wait_total += wait
+            ns_queue.wait_max = max(ns_queue.wait_max, wait)
+            self.running += 1
+
+        return task_info
+
+    def on_done(self, task_ns):
+        """任务运行结束, 释放运行名额
+        """
+        with self._lock:
+            ns_queue = self._get_queue(task_ns or '')
+            if ns_queue.running > 0:
+                ns_queue.running -= 1
+                ns_queue.done += 1
+                self.running -= 1
+            else:
+                logger.warning('TaskScheduler.on_done without running task, task_ns=%s', task_ns)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'running': self.running,
+                'max_running': self.max_running,
+                'queued': sum(q.queued for q in self.queues.values()),
+                'namespaces': {
+                    task_ns: ns_queue.metrics()
+                    for task_ns, ns_queue in self.queues.items()
+                },
+                'update_time': time.time()
+            }
@@ -7,7 +7,9 @@ from smart.utils.dict import dict_find
 from smart.aaas.base import AaasErrorCode
 from smart.aaas.auto_manage import AutoManage
 from smart.aaas.utils.task_info import AaasTaskInfoTool
+from smart.aaas.task_log.stream import TaskLogStream
 from smart.utils.file.cat import FileCat
+from smart.utils.file.watch import FileWatcher
 
 from smart.aaas.__logger import logger
 
@@ -23,7 +25,7 @@ class AutoService(RestService):
         return getattr(self.app, 'auto_manage') if self.app else None
 
     @rest.request('run')
-    def create_task(self, name=None, module=None, only_parse=None, rst_format=None, task_id=None, task_ns=None, **kwargs):
+    def create_task(self, name=None, module=None, only_parse=None, rst_format=None, task_id=None, task_ns=None, priority=None, **kwargs):
         module = module or self.json_param('module')
         name = name or self.json_param('name')
         only_parse = bool(only_parse)
@@ -68,7 +70,8 @@ class AutoService(RestService):
             module = module, 
             name = name, 
             run_opts = run_opts,
-            state_hook = state_hook)
+            state_hook = state_hook,
+            priority = priority)
 
         return task_info
 
@@ -82,6 +85,12 @@ class AutoService(RestService):
 
         return list(task_dict.values())
 
+    @rest.request('scheduler_metrics')
+    def get_scheduler_metrics(self):
+        """任务调度器指标: 各命名空间的排队/运行任务数, 排队等待时间等
+        """
+        return self.auto_manage.scheduler_metrics()
+
     @rest.request('all_task_ns')
     def get_all_task_ns(self):
         all_ns = list(self.auto_manage.all_task_ns())
@@ -106,7 +115,7 @@ class AutoService(RestService):
         """获取任务日志(长轮询方式)
         tail_mode=False表示more模式, 从log_offset起读取pool_line行; 
         tail_mode=True表示tail模式, 先一次性向上读取tail_line行的数据(不受pool_line限制), 是否再向后读取由tail_follow参数控制; 
-        如果tail_follow=True且上述逻辑返回的数据不足pool_line行, 则每隔一定时间间隔(缺省0.5)再向后读取数据，按完整行返回。
+        如果tail_follow=True且上述逻辑返回的数据不足pool_line行, 则等待日志文件的变化通知(同一文件的所有请求共享一个监听)再向后读取数据，按完整行返回。
 
         Args:
             task_id (str): 任务ID
@@ -133,7 +142,7 @@ class AutoService(RestService):
         if not task_info:
             raise RequestException('no task')
 
-        info_tool = AaasTaskInfoTool(task_info_map)
+        info_tool = AaasTaskInfoTool(task_info_map, notifier=self.auto_manage.stage_notifier, task_ns=task_ns)
         stage_passed = info_tool.wait_stage(task_id, 'start', wait_end_ts=ts_begin+pool_interval)
         if not stage_passed:
             set_resp_header('AAAS-NOT-READY', '1')
@@ -185,23 +194,66 @@ class AutoService(RestService):
             if rest_time <= 0:
                 return
             follow_expire_at = ts_begin + pool_interval
-            follow_iter = cat.tail(
-                num_line=0, num_byte=None,
-                follow=True, follow_line_mode=True, follow_expire_at=follow_expire_at,
-                follow_is_end_fn=lambda :info_tool.check_stage_passed(task_id, 'end')
-            )
-            for line in follow_iter:
-                yield line
-                i += 1
-                # logger.debug("f-%s %s", i, line)
-                if i >= pool_line:
-                    break
+            with FileWatcher.default().watch(log_file_path) as watch:
+                follow_iter = cat.tail(
+                    num_line=0, num_byte=None,
+                    follow=True, follow_line_mode=True, follow_expire_at=follow_expire_at,
+                    follow_is_end_fn=lambda :info_tool.check_stage_passed(task_id, 'end'),
+                    follow_wait_fn=watch.wait
+                )
+                for line in follow_iter:
+                    yield line
+                    i += 1
+                    # logger.debug("f-%s %s", i, line)
+                    if i >= pool_line:
+                        break
             logger.debug("task_log end task=%s:%s, file: %s", task_ns or '', task_id, log_file_path)
         # wsgi模式, response_content不执行_line_iter_fn内的代码; 因此先结束本函数, 再执行_line_iter_fn内部的代码
         # daemon模式, response_content函数会执行_line_iter_fn
         # 所以, fp.close需要在after_complete调用
         self.request.response_content(_out_iter_fn(), headers=headers)
     
+    @rest.request('task_log_stream', rst_handler=RstHandlers.no_body, err_handler=err_handlers.header_mode)
+    def task_log_stream(self, task_id, task_ns=None, log_offset:int=0, tail_line:int=0, max_time:float=0, heartbeat:float=0):
+        """获取任务日志(Server-Sent Events 流式推送)
+        一个连接内持续推送新增的日志行(event: log, id为日志的字节位置), 任务结束后推送任务状态(event: end)并关闭连接;
+        断线重连时以 log_offset 或 Last-Event-ID 请求头指定的位置继续读取。
+
+        Args:
+            task_id (str): 任务ID
+            task_ns (str, optional): 任务命名空间. Defaults to None.
+            log_offset (int, optional): 日志文件的偏移量(单位byte). Defaults to 0.
+            tail_line (int, optional): 非0时从末尾向前tail_line行开始读取, log_offset无效. Defaults to 0.
+            max_time (float, optional): 连接的最长时间(秒), 到达后推送 event: timeout, 0表示不限制. Defaults to 0.
+            heartbeat (float, optional): 无新数据时发送心跳的间隔(秒), 0表示缺省15秒. Defaults to 0.
+
+        Raises:
+            RequestException: 任务ID不存在
+        """
+        task_info_map = self.auto_manage.get_task_dict(task_ns)
+
+        if not task_info_map.get(task_id):
+            raise RequestException('no task')
+
+        last_event_id = getattr(self.request, 'headers', None) and self.request.headers.get('Last-Event-ID')
+        if last_event_id:
+            log_offset, tail_line = int(last_event_id), 0
+
+        info_tool = AaasTaskInfoTool(task_info_map, notifier=self.auto_manage.stage_notifier, task_ns=task_ns)
+        log_stream = TaskLogStream(
+            task_id, task_ns, info_tool,
+            log_offset = int(log_offset or 0),
+            tail_line = int(tail_line or 0),
+            max_time = float(max_time or 0),
+            heartbeat = float(heartbeat or 0)
+        )
+        headers = {
+            HttpHeaderKey.content_type: 'text/event-stream; charset=utf-8',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+        self.request.response_content(log_stream.events(), headers=headers)
+    
     @rest.hook.after_complete()
     def after_complete(self):
         _cb = self.request.context.get('after_complete_cb')
@@ -25,6 +25,8 @@ def update_logger_stream(old_stream, new_stream, only_root=False):
 class TaskFileLog:
     DEFAULT_FILE_FORMAT = '{task_ns}_{task_id}.log'
     DEFAULT_AUTO_MKDIR = True
+    # 行缓冲: 每行写入后即可被 task_log 接口读取
+    DEFAULT_LINE_BUFFERING = True
 
     def __init__(self, task_id, task_ns):
         self.__log_path = smart_env.get(('task_log', 'dir_path'))
@@ -35,7 +37,8 @@ class TaskFileLog:
         self.__auto_mkdir = smart_env.get(('task_log', 'auto_mkdir'), self.DEFAULT_AUTO_MKDIR)
         self.__file_name = self.__file_format.format(task_id=task_id, task_ns=task_ns)
         self.__file_path = path_join(self.__log_path, self.__file_name, auto_mkdir=self.__auto_mkdir)
-        self.__fp = open(self.__file_path, mode='w', encoding='utf8')
+        line_buffering = smart_env.get(('task_log', 'line_buffering'), self.DEFAULT_LINE_BUFFERING)
+        self.__fp = open(self.__file_path, mode='w', encoding='utf8', buffering=1 if line_buffering else -1)
         self.__clean_fp = None
         self._old_stdout = sys.stdout
         self._old_stderr = sys.stderr
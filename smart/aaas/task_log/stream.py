@@ -0,0 +1,139 @@
+import json, time
+
+from smart.utils.dict import dict_find
+from smart.utils.file.cat import FileCat
+from smart.utils.file.watch import FileWatcher
+
+from smart.aaas.utils.task_info import AaasTaskInfoTool
+from smart.aaas.__logger import logger
+
+
+def sse_event(event:str, data, event_id=None) -> bytes:
+    """Server-Sent Events 格式的事件, data 以 json 序列化(日志行中的换行符不会截断事件)"""
+    lines = ['event: ' + event]
+    if event_id is not None:
+        lines.append('id: {}'.format(event_id))
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, default=str))
+    return ('\n'.join(lines) + '\n\n').encode('utf8')
+
+
+class TaskLogStream:
+    """任务日志的 SSE 事件流: 一个连接内持续推送新增的日志行, 任务结束后推送任务状态
+
+    事件:
+        log: data为一行日志(含换行符), id为该行结束处的字节位置, 断线后以 log_offset(或Last-Event-ID) 继续读取
+        end: 任务已结束且日志已读完, data为任务状态 {task_id, task_ns, done_flag, done_time, exception, log_offset}
+        timeout: 达到 max_time, data为 {log_offset}, 客户端可从该位置重新连接
+        error: data为 {msg}
+    空闲时每隔 heartbeat 秒发送注释行, 用于保持连接及检测客户端断开
+    """
+    DEFAULT_HEARTBEAT = 15.0
+    PING = b': ping\n\n'
+
+    def __init__(self, task_id:str, task_ns:str, info_tool:AaasTaskInfoTool, log_offset:int=0, tail_line:int=0,
+            max_time:float=None, heartbeat:float=None):
+        self.task_id = task_id
+        self.task_ns = task_ns
+        self.info_tool = info_tool
+        self.log_offset = log_offset or 0
+        self.tail_line = tail_line or 0
+        self.heartbeat = heartbeat if heartbeat and heartbeat > 0 else self.DEFAULT_HEARTBEAT
+        self.expire_at = time.time() + max_time if max_time and max_time > 0 else None
+
+    def __rest_time(self):
+        if self.expire_at is None:
+            return self.heartbeat
+        return min(self.heartbeat, self.expire_at - time.time())
+
+    def __task_end(self):
+        return self.info_tool.check_stage_passed(self.task_id, 'end')
+
+    def __end_event(self) -> bytes:
+        task_info = self.info_tool.task_info_map.get(self.task_id) or {}
+        exception = task_info.get('exception')
+        return sse_event('end', {
+            'task_id': self.task_id,
+            'task_ns': self.task_ns,
+            'done_flag': task_info.get('done_flag'),
+            'done_time': task_info.get('done_time'),
+            'exception': {
+                'type': exception.get('type'),
+                'info': exception.get('info'),
+            } if exception else None,
+            'log_offset': self.log_offset
+        })
+
+    def events(self):
+        """SSE事件生成器, 由 response_content 发送; 客户端断开时生成器被关闭
+        """
+        # 等待任务启动(未启动即结束的任务, 如被拒绝/终止, 没有日志文件)
+        while True:
+            stage_passed = self.info_tool.wait_stage(self.task_id, ('start', 'end'), wait_time=self.__rest_time())
+            if stage_passed is None:
+                yield sse_event('error', {'msg': 'no task'})
+                return
+            if stage_passed:
+                break
+            if self.__rest_time() <= 0:
+                yield sse_event('timeout', {'log_offset': self.log_offset})
+                return
+            yield self.PING
+
+        task_info = self.info_tool.task_info_map.get(self.task_id) or {}
+        log_file_path = dict_find(task_info, ('task_log', 'file_path'))
+
+        if not log_file_path:
+            if not self.__task_end():
+                yield sse_event('error', {'msg': 'miss task_log file'})
+                return
+            yield self.__end_event()
+            return
+
+        with open(log_file_path, mode='rb') as fp, FileWatcher.default().watch(log_file_path) as watch:
+            if self.tail_line:
+                cat = FileCat(fp, text_mode=False)
+                for _ in cat.tail(num_line=self.tail_line):
+                    pass
+                self.log_offset = fp.tell()
+            else:
+                fp.seek(self.log_offset)
+
+            yield from self.__follow(fp, watch)
+
+    def __follow(self, fp, watch):
+        rest_data, task_end = b'', False
+
+        while True:
+            data = fp.read()
+            if data:
+                lines = (rest_data + data).split(b'\n')
+                # 最后一个换行符之后的数据暂存, 等待拼接完整行
+                rest_data = lines.pop()
+                events = []
+                for line in lines:
+                    self.log_offset += len(line) + 1
+                    events.append(sse_event('log', (line + b'\n').decode('utf8', errors='replace'), self.log_offset))
+                if events:
+                    yield b''.join(events)
+                continue
+
+            if task_end:
+                # 任务结束后已再读取一次, 剩余的不完整行作为最后一行
+                if rest_data:
+                    self.log_offset += len(rest_data)
+                    yield sse_event('log', rest_data.decode('utf8', errors='replace'), self.log_offset)
+                yield self.__end_event()
+                logger.debug('task_log_stream end task=%s:%s, offset=%s', self.task_ns or '', self.task_id, self.log_offset)
+                return
+
+            if self.__task_end():
+                # 任务的最后写入发生在结束阶段之前, 再读取一次文件
+                task_end = True
+                continue
+
+            rest_time = self.__rest_time()
+            if rest_time <= 0:
+                yield sse_event('timeout', {'log_offset': self.log_offset})
+                return
+            if not watch.wait(rest_time):
+                yield self.PING
@@ -0,0 +1,330 @@
+import os, pickle, sqlite3, tempfile, threading, contextlib, uuid, zlib
+from collections.abc import MutableMapping
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from smart.aaas.__logger import logger
+
+
+class TaskState:
+    """task_info 的运行状态, 由 task_info 推导, 用于索引查询"""
+    queued = 0
+    running = 1
+    done = 2
+
+    @staticmethod
+    def of(task_info:dict) -> int:
+        if task_info.get('done_flag'):
+            return TaskState.done
+        if task_info.get('process') is not None:
+            return TaskState.running
+        return TaskState.queued
+
+
+class TaskRegistry:
+    """aaas 任务信息表(SQLite WAL), 可在多个进程(服务进程/调度进程/工作进程)中使用
+
+    task_info 序列化后存储, 并按 task_ns, state, done_time 建索引: 查询单个任务只需一次索引查找,
+    清理过期任务只扫描过期的记录. 修改任务信息时按 (task_ns, task_id) 哈希到分段锁(文件记录锁+线程锁),
+    不同任务的修改互不阻塞.
+
+    数据库文件由创建实例的进程(owner)新建, close时删除; 各进程/线程按需建立自己的数据库连接.
+
+    smart_env.yml 配置示例:
+
+        aaas:
+          task_registry:
+            dir_path: /dev/shm      # 数据库文件目录, 缺省为系统临时目录
+            lock_stripes: 64        # 分段锁数量
+    """
+    Schema = (
+        '''CREATE TABLE IF NOT EXISTS task (
+            task_ns TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            state INTEGER NOT NULL,
+            create_time REAL,
+            done_time REAL,
+            info BLOB NOT NULL,
+            UNIQUE (task_ns, task_id)
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_task_ns_state ON task (task_ns, state)',
+        'CREATE INDEX IF NOT EXISTS idx_task_ns_done ON task (task_ns, done_time)',
+        'CREATE TABLE IF NOT EXISTS task_ns (task_ns TEXT PRIMARY KEY)',
+    )
+
+    def __init__(self, dir_path:str=None, lock_stripes:int=64, timeout:float=30):
+        """构造函数
+
+        Keyword Arguments:
+            dir_path {str} -- 数据库文件目录 (default: {tempfile.gettempdir()})
+            lock_stripes {int} -- 分段锁数量 (default: {64})
+            timeout {float} -- 数据库写锁等待时长(秒) (default: {30})
+        """
+        dir_path = os.path.expanduser(dir_path or tempfile.gettempdir())
+        os.makedirs(dir_path, exist_ok=True)
+        self.db_path = os.path.join(dir_path, 'aaas_task_{}_{}.db'.format(os.getpid(), uuid.uuid4().hex[:8]))
+        self.lock_stripes = max(int(lock_stripes or 1), 1)
+        self.timeout = timeout
+        self._owner_pid = os.getpid()
+        self._closed = False
+        self.__reset_local()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        for sql in self.Schema:
+            conn.execute(sql)
+        logger.debug('TaskRegistry created: %s', self.db_path)
+
+    def __reset_local(self):
+        # 数据库连接, 锁文件及线程锁均不能跨进程共享, 进程(pid)变化时重新创建;
+        # fork继承的连接保留引用不关闭, 避免子进程关闭连接时影响父进程的数据库锁
+        self._inherited_local = getattr(self, '_local', None)
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._thread_locks = [threading.Lock() for _ in range(self.lock_stripes)]
+        self._lock_fd = None
+        self._lock_fd_lock = threading.Lock()
+        # 本进程已写入 task_ns 表的命名空间
+        self._known_ns = set()
+
+    def __check_pid(self):
+        if self._pid != os.getpid():
+            self.__reset_local()
+
+    def _conn(self) -> sqlite3.Connection:
+        self.__check_pid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def __getstate__(self):
+        return {
+            'db_path': self.db_path,
+            'lock_stripes': self.lock_stripes,
+            'timeout': self.timeout,
+            '_owner_pid': self._owner_pid,
+            '_closed': self._closed,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__reset_local()
+
+    @contextlib.contextmanager
+    def lock(self, task_ns:str, task_id:str):
+        """任务分段锁, 用于 读取-修改-写入 task_info, 跨进程有效
+        """
+        self.__check_pid()
+        stripe = zlib.crc32('{}\0{}'.format(task_ns or '', task_id).encode('utf8')) % self.lock_stripes
+
+        with self._thread_locks[stripe]:
+            if fcntl is None:
+                # 不支持文件记录锁的平台, 以数据库写事务代替
+                conn = self._conn()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    yield
+                finally:
+                    conn.execute('COMMIT')
+                return
+
+            fd = self.__lock_fd()
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, stripe)
+
+    def __lock_fd(self):
+        # 每个进程只打开一次锁文件: 关闭该文件的任意描述符会释放本进程持有的全部记录锁
+        if self._lock_fd is None:
+            with self._lock_fd_lock:
+                if self._lock_fd is None:
+                    self._lock_fd = os.open(self.db_path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        return self._lock_fd
+
+    @staticmethod
+    def _loads(info):
+        return pickle.loads(info) if info is not None else None
+
+    def get(self, task_ns:str, task_id:str) -> dict:
+        row = self._conn().execute(
+            'SELECT info FROM task WHERE task_ns=? AND task_id=?', (task_ns or '', task_id)
+        ).fetchone()
+        return self._loads(row[0]) if row else None
+
+    def put(self, task_ns:str, task_info:dict):
+        """写入(新增或覆盖) task_info"""
+        task_ns = task_ns or ''
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO task (task_ns, task_id, state, create_time, done_time, info) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (task_ns, task_id) DO UPDATE SET state=excluded.state, done_time=excluded.done_time, info=excluded.info',
+            self.__row(task_ns, task_info)
+        )
+        self.__add_ns(task_ns)
+
+    def create(self, task_ns:str, task_info:dict) -> dict:
+        """新增 task_info, 任务已存在时不覆盖
+
+        Returns:
+            dict -- 已存在的 task_info, 新增成功返回None
+        """
+        task_ns = task_ns or ''
+        conn = self._conn()
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO task (task_ns, task_id, state, create_time, done_time, info) VALUES (?, ?, ?, ?, ?, ?)',
+            self.__row(task_ns, task_info)
+        )
+        if cursor.rowcount == 0:
+            return self.get(task_ns, task_info['task_id'])
+        self.__add_ns(task_ns)
+        return None
+
+    def __add_ns(self, task_ns):
+        if task_ns not in self._known_ns:
+            self._conn().execute('INSERT OR IGNORE INTO task_ns (task_ns) VALUES (?)', (task_ns, ))
+            self._known_ns.add(task_ns)
+
+    @staticmethod
+    def __row(task_ns, task_info:dict) -> tuple:
+        return (
+            task_ns,
+            task_info['task_id'],
+            TaskState.of(task_info),
+            task_info.get('create_time'),
+            task_info.get('done_time'),
+            pickle.dumps(task_info, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+    def delete(self, task_ns:str, task_id:str) -> bool:
+        cursor = self._conn().execute(
+            'DELETE FROM task WHERE task_ns=? AND task_id=?', (task_ns or '', task_id)
+        )
+        return cursor.rowcount > 0
+
+    def task_ids(self, task_ns:str, state:int=None) -> list:
+        """命名空间的任务ID(按创建顺序)
+
+        Keyword Arguments:
+            state {int} -- TaskState, None表示全部 (default: {None})
+        """
+        if state is None:
+            rows = self._conn().execute('SELECT task_id FROM task WHERE task_ns=? ORDER BY rowid', (task_ns or '', ))
+        else:
+            rows = self._conn().execute(
+                'SELECT task_id FROM task WHERE task_ns=? AND state=? ORDER BY rowid', (task_ns or '', state)
+            )
+        return [row[0] for row in rows]
+
+    def all(self, task_ns:str) -> list:
+        """命名空间的全部 task_info(按创建顺序)"""
+        rows = self._conn().execute('SELECT info FROM task WHERE task_ns=? ORDER BY rowid', (task_ns or '', ))
+        return [self._loads(row[0]) for row in rows]
+
+    def items(self, task_ns:str) -> list:
+        rows = self._conn().execute('SELECT task_id, info FROM task WHERE task_ns=? ORDER BY rowid', (task_ns or '', ))
+        return [(row[0], self._loads(row[1])) for row in rows]
+
+    def count(self, task_ns:str) -> int:
+        return self._conn().execute('SELECT COUNT(*) FROM task WHERE task_ns=?', (task_ns or '', )).fetchone()[0]
+
+    def namespaces(self) -> list:
+        return [row[0] for row in self._conn().execute('SELECT task_ns FROM task_ns')]
+
+    def clean_expired(self, task_ns:str, expire_ts:float) -> list:
+        """删除命名空间内 done_time 早于 expire_ts 的已结束任务, 只扫描过期记录
+
+        Returns:
+            list -- 删除的任务ID
+        """
+        conn = self._conn()
+        params = (task_ns or '', expire_ts)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            task_ids = [
+                row[0] for row in
+                conn.execute('SELECT task_id FROM task WHERE task_ns=? AND done_time<=?', params)
+            ]
+            if task_ids:
+                conn.execute('DELETE FROM task WHERE task_ns=? AND done_time<=?', params)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return task_ids
+
+    def close(self):
+        """关闭本进程的数据库连接; owner进程删除数据库文件"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._pid == os.getpid():
+            conn.close()
+            self._local.conn = None
+        if self._lock_fd is not None and self._pid == os.getpid():
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+        if os.getpid() == self._owner_pid and not self._closed:
+            self._closed = True
+            for suffix in ('', '-wal', '-shm', '.lock'):
+                try:
+                    os.remove(self.db_path + suffix)
+                except FileNotFoundError:
+                    pass
+            logger.debug('TaskRegistry removed: %s', self.db_path)
+
+
+class NsTaskDict(MutableMapping):
+    """命名空间内 {task_id: task_info} 的字典视图, 读写直接访问 TaskRegistry
+
+    与 dict 不同, 读取的 task_info 是副本, 修改后需重新赋值 task_dict[task_id] = task_info
+    """
+    def __init__(self, registry:TaskRegistry, task_ns:str):
+        self.registry = registry
+        self.task_ns = task_ns or ''
+
+    def lock(self, task_id):
+        return self.registry.lock(self.task_ns, task_id)
+
+    def get(self, task_id, default=None):
+        task_info = self.registry.get(self.task_ns, task_id)
+        return default if task_info is None else task_info
+
+    def __getitem__(self, task_id):
+        task_info = self.registry.get(self.task_ns, task_id)
+        if task_info is None:
+            raise KeyError(task_id)
+        return task_info
+
+    def __setitem__(self, task_id, task_info):
+        if task_info.get('task_id') != task_id:
+            task_info = {**task_info, 'task_id': task_id}
+        self.registry.put(self.task_ns, task_info)
+
+    def __delitem__(self, task_id):
+        if not self.registry.delete(self.task_ns, task_id):
+            raise KeyError(task_id)
+
+    def __contains__(self, task_id):
+        return self.registry.get(self.task_ns, task_id) is not None
+
+    def __iter__(self):
+        return iter(self.registry.task_ids(self.task_ns))
+
+    def __len__(self):
+        return self.registry.count(self.task_ns)
+
+    def keys(self):
+        return self.registry.task_ids(self.task_ns)
+
+    def values(self):
+        return self.registry.all(self.task_ns)
+
+    def items(self):
+        return self.registry.items(self.task_ns)
@@ -1,19 +1,84 @@
-import time
+import time, threading
+
+
+class TaskStageNotifier:
+    """任务阶段变化通知(进程内)
+
+    AutoManage 在服务进程中接收工作进程/调度进程上报的阶段变化, 调用 notify 唤醒等待该任务的线程
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (task_ns, task_id) -> [version, 等待者数量, Condition]
+        self._waits = {}
+
+    def notify(self, task_ns, task_id):
+        with self._lock:
+            entry = self._waits.get((task_ns or '', task_id))
+            if entry is not None:
+                entry[0] += 1
+                entry[2].notify_all()
+
+    def wait_for(self, task_ns, task_id, predicate:callable, timeout:float, check_interval:float=None):
+        """等待直至 predicate 返回值不为False
+
+        Args:
+            predicate (callable): 检查任务状态的函数, 返回False表示继续等待
+            timeout (float): 最长等待时长(秒)
+            check_interval (float, optional): 未收到通知时, 重新检查的间隔(防止通知丢失). Defaults to None.
+
+        Returns:
+            any: predicate 最后一次的返回值
+        """
+        key = (task_ns or '', task_id)
+        end_ts = time.time() + timeout
+
+        with self._lock:
+            entry = self._waits.get(key)
+            if entry is None:
+                entry = self._waits[key] = [0, 0, threading.Condition(self._lock)]
+            entry[1] += 1
+
+        try:
+            while True:
+                # 先读取版本号再检查状态, 检查期间的通知不会丢失
+                version = entry[0]
+                rst = predicate()
+                if rst is not False:
+                    return rst
+
+                rest_time = end_ts - time.time()
+                if rest_time <= 0:
+                    return rst
+                if check_interval:
+                    rest_time = min(rest_time, check_interval)
+
+                with self._lock:
+                    if entry[0] == version:
+                        entry[2].wait(rest_time)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    self._waits.pop(key, None)
 
 
 class AaasTaskInfoTool:
     MIN_CHECK_INTERVAL = 0.5
+    # 使用阶段变化通知时, 重新检查task_info的间隔
+    NOTIFY_CHECK_INTERVAL = 5.0
 
-    def __init__(self, task_info_map) -> None:
+    def __init__(self, task_info_map, notifier:TaskStageNotifier=None, task_ns:str=None) -> None:
         self.task_info_map = task_info_map
+        self.notifier = notifier
+        self.task_ns = task_ns
         self._last_query_stage = None
-    
+
     def check_stage_passed(self, task_id, stage_name):
         """查看任务的阶段是否已经过去
 
         Args:
             task_id (str): 任务ID
-            stage_name (str): 阶段名, 支持: start, end
+            stage_name (str|tuple): 阶段名, 支持: start, end; tuple表示其中任一阶段
 
         Returns:
             bool: True表示阶段已执行, False表示阶段未执行
@@ -25,14 +90,16 @@ class AaasTaskInfoTool:
 
         stage_list = (task_info or {}).get("stage") or []
         self._last_query_stage = stage_list
+        if isinstance(stage_name, (tuple, list)):
+            return any(name in stage_list for name in stage_name)
         return stage_name in stage_list
 
     def wait_stage(self, task_id, stage_name, wait_time:int=30, wait_end_ts:int=None, check_interval:float=1.0):
-        """等待任务的阶段执行
+        """等待任务的阶段执行; 有阶段变化通知(notifier)时等待通知, 否则按check_interval轮询
 
         Args:
             task_id (str): 任务ID
-            stage_name (str): 阶段名, 支持: start, end
+            stage_name (str|tuple): 阶段名, 支持: start, end; tuple表示其中任一阶段
             wait_time (int, optional): 等待时长. Defaults to 30.
             wait_end_ts (int, optional): 等待过期时间, 非空则wait_time参数无效. Defaults to None.
             check_interval (float, optional): 查看task_info的间隔. Defaults to 1.0.
@@ -42,8 +109,17 @@ class AaasTaskInfoTool:
         """
         if not wait_end_ts:
             wait_end_ts = time.time() + wait_time
+
+        if self.notifier is not None:
+            return self.notifier.wait_for(
+                self.task_ns, task_id,
+                lambda: self.check_stage_passed(task_id, stage_name=stage_name),
+                timeout = wait_end_ts - time.time(),
+                check_interval = self.NOTIFY_CHECK_INTERVAL
+            )
+
         check_interval = max(check_interval, self.MIN_CHECK_INTERVAL)
-        
+
         while True:
             stage_passed = self.check_stage_passed(task_id, stage_name=stage_name)
             if stage_passed is None:
@@ -52,7 +128,7 @@ class AaasTaskInfoTool:
 
             if stage_passed:
                 return True
-            sleep_time = min(check_interval, time.time()-wait_end_ts)
+            sleep_time = min(check_interval, wait_end_ts-time.time())
             if sleep_time <= 0:
                 return False
             else:
@@ -12,6 +12,7 @@ from smart.auto.exec.tree_exec import TreeTaskExecutor
 from smart.auto.exec.tree_pod import TreePod
 from smart.auto.meta import TaskMeta, TreeTaskMeta, TreeMeta, TreeRunMode
 from smart.auto.ctx.runner_context import WithAutoRunner
+from smart.utils.startup_profile import StartupProfile
 
 from smart.auto.__logger import logger
 
@@ -173,19 +174,11 @@ class AutoRunner:
                 if next_task_key:
                     yield task_key, tree_task, next_task_key, __get_task(next_task_key)
         
+        # 设置运行模式; 需在创建数据管道前设置, 数据管道类型依赖运行模式
         use_worker = False
         use_worker_mp = False
         for tree_task in tree.tree_tasks:
             tree_task:TreeTaskMeta
-            for prev_task_key, prev_task_meta, next_task_key, next_task_meta in __iter_dependance(tree_task):
-                if (prev_task_key, next_task_key) not in task_depends:
-                    # 设置任务依赖关系
-                    logger.debug('Task Dependance: %s -> %s', prev_task_key, next_task_key)
-                    prev_task_meta.task_meta.task_obj.next(
-                        next_task_meta.task_meta.task_obj
-                    )
-                    task_depends.add((prev_task_key, next_task_key))
-            # 设置运行模式
             exec_opts = tree_task.exec_opts or {}
             if exec_opts.get('worker_num'):
                 use_worker = True
@@ -202,13 +195,25 @@ class AutoRunner:
         else:
             self.context.run_mode = TreeRunMode.default
 
+        for tree_task in tree.tree_tasks:
+            tree_task:TreeTaskMeta
+            for prev_task_key, prev_task_meta, next_task_key, next_task_meta in __iter_dependance(tree_task):
+                if (prev_task_key, next_task_key) not in task_depends:
+                    # 设置任务依赖关系
+                    logger.debug('Task Dependance: %s -> %s', prev_task_key, next_task_key)
+                    prev_task_meta.task_meta.task_obj.next(
+                        next_task_meta.task_meta.task_obj
+                    )
+                    task_depends.add((prev_task_key, next_task_key))
+
     def start_task(self, task_exp):
-        task_key, run_opts = parse_task_exp(task_exp)
-        task_meta = self.task_meta_parser.parse_task_meta(task_key)
+        with StartupProfile.phase('executor_init'):
+            task_key, run_opts = parse_task_exp(task_exp)
+            task_meta = self.task_meta_parser.parse_task_meta(task_key)
 
-        self.__init_task_executor(task_meta, 
-            joins=run_opts.get('join'),
-            run_opts=run_opts)
+            self.__init_task_executor(task_meta, 
+                joins=run_opts.get('join'),
+                run_opts=run_opts)
         
         context = self.context
         context.run_mode = TreeRunMode.default
@@ -222,6 +227,7 @@ class AutoRunner:
 
         # Execute hook after_task
         task_executor.run_hook('after_task', context=context)
+        task_executor.task_obj.pip_out.close()
     
     def is_tree_done(self, tree: TreeMeta):
         for tree_task_meta in tree.tree_tasks:
@@ -232,8 +238,9 @@ class AutoRunner:
         return 
 
     def start_tree(self, tree_name):
-        tree = self.__get_tree(tree_name)
-        self.__init_tree(tree)
+        with StartupProfile.phase('executor_init'):
+            tree = self.__get_tree(tree_name)
+            self.__init_tree(tree)
 
         context = self.context
 
@@ -50,11 +50,21 @@ class BasePip():
         """
         yield from []
 
+    def flush(self, **kwargs):
+        """发送管道缓冲的数据
+        """
+        pass
+
     def clean(self, **kwargs):
         """清空管道数据
         """
         pass
 
+    def close(self, **kwargs):
+        """释放管道资源
+        """
+        pass
+
 
 class BaseTask():
     """任务基类
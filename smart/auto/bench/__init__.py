@@ -0,0 +1,2 @@
+from .scenario import BenchScenario
+from .run import bench_run, bench_compare, run_scenario
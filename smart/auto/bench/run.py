@@ -0,0 +1,274 @@
+import os, sys, json, math, time, platform
+import multiprocessing as mp
+from array import array
+
+from smart.utils.log import auto_load_logging_config, set_default_logging_config
+from smart.auto.parser.auto_yml import AutoYmlParser
+from smart.auto.Runner import AutoRunner
+from smart.auto.exec.task_pod import TaskPod
+from smart.auto.bench.scenario import BenchScenario
+from smart.auto.bench.tasks import BENCH_STATE
+
+from smart.auto.__logger import logger
+
+
+def _peak_rss_mb(children=False):
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节, Linux 为KB
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _percentile(sorted_vals, ratio):
+    if not sorted_vals:
+        return None
+    idx = min(max(int(math.ceil(ratio * len(sorted_vals))) - 1, 0), len(sorted_vals) - 1)
+    return round(sorted_vals[idx], 6)
+
+
+def _summary(scenario:BenchScenario, sink_state:dict, elapsed:float) -> dict:
+    latencies = array('d')
+    count = 0
+    ts_first = ts_last = None
+    for worker_rst in (sink_state or {}).values():
+        for rst in worker_rst.values():
+            count += rst['count']
+            latencies.frombytes(rst['latencies'])
+            if rst['ts_first'] is not None:
+                ts_first = rst['ts_first'] if ts_first is None else min(ts_first, rst['ts_first'])
+            if rst['ts_last'] is not None:
+                ts_last = rst['ts_last'] if ts_last is None else max(ts_last, rst['ts_last'])
+
+    latencies = sorted(latencies)
+    # 吞吐量按第一条数据创建到最后一条数据被接收的时间计算, 不含任务树启动和结束的耗时
+    during = (ts_last - ts_first) if ts_first is not None and ts_last is not None else None
+    expect_count = scenario.size * (scenario.fan_out if scenario.shape == 'fanout' else 1)
+    return {
+        'items': scenario.size,
+        'received': count,
+        'complete': count == expect_count,
+        'elapsed': round(elapsed, 6),
+        'items_per_sec': round(scenario.size / during, 1) if during else None,
+        'latency_p50': _percentile(latencies, 0.5),
+        'latency_p99': _percentile(latencies, 0.99),
+        'latency_max': round(latencies[-1], 6) if latencies else None,
+    }
+
+
+def run_scenario(scenario:BenchScenario, metrics=False) -> dict:
+    """在当前进程运行一个基准测试场景
+
+    Arguments:
+        scenario {BenchScenario} -- 测试场景
+
+    Keyword Arguments:
+        metrics {bool} -- 是否同时记录任务运行指标(TaskPod.Opt_Metrics) (default: {False})
+
+    Returns:
+        dict -- 测试结果
+    """
+    if metrics:
+        TaskPod.Opt_Metrics = True
+    parser = AutoYmlParser(scenario.build_run_obj())
+    parser.parse_all_syntax()
+    runner = AutoRunner(parser.auto_obj)
+    try:
+        ts_begin = time.time()
+        pod = runner.start_tree(BenchScenario.TREE_NAME)
+        elapsed = time.time() - ts_begin
+        rst = _summary(scenario, runner.context.state(BENCH_STATE).to_dict(), elapsed)
+        if metrics:
+            rst['metrics'] = pod.metrics_summary(by_worker=False)
+        return rst
+    finally:
+        runner.context.close()
+
+
+def _run_scenario_process(scenario:BenchScenario, metrics, rst_queue):
+    try:
+        rst = run_scenario(scenario, metrics=metrics)
+    except BaseException as e:
+        logger.exception(e)
+        rst = {'error': repr(e)}
+    rst['peak_rss_mb'] = _peak_rss_mb()
+    # 已结束的子进程(工作进程, SyncManager)中 RSS 最大的进程
+    rst['peak_rss_children_mb'] = _peak_rss_mb(children=True)
+    rst_queue.put(rst)
+
+
+def run_scenario_isolated(scenario:BenchScenario, metrics=False, timeout:float=600) -> dict:
+    """在独立进程中运行一个基准测试场景, 使各场景的峰值内存互不影响
+    """
+    rst_queue = mp.Queue()
+    process = mp.Process(target=_run_scenario_process, args=(scenario, metrics, rst_queue), name='AutoBench')
+    process.start()
+    try:
+        rst = rst_queue.get(timeout=timeout)
+    except Exception:
+        rst = {'error': 'timeout after {} seconds'.format(timeout)}
+        process.terminate()
+    process.join()
+    return rst
+
+
+def bench_meta() -> dict:
+    from smart import auto
+    return {
+        'version': auto.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': mp.cpu_count(),
+        'start_method': mp.get_start_method(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def bench_run(scenarios=None, size:int=10000, payload_size:int=100, stages:int=2, fan_out:int=4, joins:int=2,
+            work_us:float=0, max_queue_size:int=1000, repeat:int=1, metrics:bool=False, isolate:bool=True,
+            timeout:float=600, out:str=None, baseline:str=None, tree_opts:dict=None, mp_mode:str=None):
+    """smart.auto 基准测试
+
+    python -m smart.auto.bench.run run [scenarios] [options]
+
+    上述命令可用 smart_auto_bench 替代
+
+    Keyword Arguments:
+        scenarios {str|list} -- 场景名称或 fnmatch 模式, 逗号分隔; 格式 <linear|fanout|join>.<thread|process|pool>.<bounded|unbounded>; 缺省全部 (default: {None})
+        size {int} -- 数据条数 (default: {10000})
+        payload_size {int} -- 每条数据的文本字节数 (default: {100})
+        stages {int} -- linear 结构的中间任务数 (default: {2})
+        fan_out {int} -- fanout 结构的下游任务数 (default: {4})
+        joins {int} -- join 结构串联的 map 函数数 (default: {2})
+        work_us {float} -- map 函数每条数据模拟的计算耗时(微秒) (default: {0})
+        max_queue_size {int} -- bounded 场景的最大队列长度 (default: {1000})
+        repeat {int} -- 每个场景运行次数, 结果取吞吐量的中位数 (default: {1})
+        metrics {bool} -- 是否记录任务运行指标 (default: {False})
+        isolate {bool} -- 是否在独立进程运行每个场景; False 时峰值内存为累计值 (default: {True})
+        timeout {float} -- 每个场景的超时时间(秒) (default: {600})
+        out {str} -- 结果JSON文件路径 (default: {None})
+        baseline {str} -- 基准结果JSON文件, 设置时打印对比结果 (default: {None})
+        tree_opts {dict} -- 每个任务的额外运行选项, 如 --tree_opts='{pip_type: shm}' (default: {None})
+        mp_mode {str} -- 多进程模式: spawn, fork, forkserver (default: {None})
+
+    Returns:
+        dict -- {meta, results}
+    """
+    if mp_mode:
+        mp.set_start_method(mp_mode, True)
+
+    names = BenchScenario.match_names(scenarios)
+    if not names:
+        raise ValueError('no bench scenario matched: {}'.format(scenarios))
+
+    results = []
+    for name in names:
+        scenario = BenchScenario.from_name(name, size=size, payload_size=payload_size, stages=stages,
+            fan_out=fan_out, joins=joins, work_us=work_us, max_queue_size=max_queue_size, tree_opts=tree_opts)
+        runs = []
+        for _ in range(max(int(repeat), 1)):
+            if isolate:
+                rst = run_scenario_isolated(scenario, metrics=metrics, timeout=timeout)
+            else:
+                rst = run_scenario(scenario, metrics=metrics)
+                rst['peak_rss_mb'] = _peak_rss_mb()
+            runs.append(rst)
+            logger.info('# bench %s: %s', name, json.dumps({k: v for k, v in rst.items() if k != 'metrics'}))
+
+        ok_runs = sorted([r for r in runs if r.get('items_per_sec')], key=lambda r: r['items_per_sec'])
+        rst = ok_runs[len(ok_runs) // 2] if ok_runs else runs[-1]
+        if len(runs) > 1:
+            rst['items_per_sec_runs'] = [r.get('items_per_sec') for r in runs]
+        results.append({
+            'name': name,
+            'params': scenario.to_dict(),
+            **rst,
+        })
+
+    report = {
+        'meta': bench_meta(),
+        'results': results,
+    }
+
+    if out:
+        out_dir = os.path.dirname(out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(out, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info('bench results saved to %s', out)
+
+    if baseline:
+        bench_compare(baseline, report)
+
+    return report
+
+
+def _load_report(report):
+    if isinstance(report, dict):
+        return report
+    with open(report, 'r') as f:
+        return json.load(f)
+
+
+def bench_compare(baseline, current, threshold:float=0.1):
+    """对比两次基准测试结果
+
+    Arguments:
+        baseline {str|dict} -- 基准结果(JSON文件路径或 bench_run 返回值)
+        current {str|dict} -- 当前结果
+
+    Keyword Arguments:
+        threshold {float} -- 吞吐量下降或延迟/内存上升超过该比例时标记为 regression (default: {0.1})
+
+    Returns:
+        list -- 每个场景的对比结果; ratio 为 当前/基准
+    """
+    base_results = {r['name']: r for r in _load_report(baseline).get('results', [])}
+    rows = []
+    for rst in _load_report(current).get('results', []):
+        base = base_results.get(rst['name'])
+        if not base:
+            continue
+        row = {'name': rst['name'], 'regression': []}
+        # 吞吐量越大越好, 其它指标越小越好
+        for key, higher_better in (('items_per_sec', True), ('latency_p50', False), ('latency_p99', False), ('peak_rss_mb', False)):
+            cur_val, base_val = rst.get(key), base.get(key)
+            if not cur_val or not base_val:
+                continue
+            ratio = round(cur_val / base_val, 3)
+            row[key] = {'base': base_val, 'current': cur_val, 'ratio': ratio}
+            if (higher_better and ratio < 1 - threshold) or (not higher_better and ratio > 1 + threshold):
+                row['regression'].append(key)
+        rows.append(row)
+        logger.info('# bench compare %s: %s', rst['name'], json.dumps(row))
+    return rows
+
+
+def bench_list():
+    """默认场景列表
+    """
+    return BenchScenario.all_names()
+
+
+def main():
+    auto_load_logging_config() or set_default_logging_config()
+
+    import fire
+    fire.Fire({
+        'run': bench_run,
+        'compare': bench_compare,
+        'list': bench_list,
+    })
+
+
+def cmd_ep():
+    if sys.path[0] != '':
+        sys.path.insert(0, '')
+    main()
+
+
+if __name__ == "__main__":
+    main()
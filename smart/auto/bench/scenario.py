@@ -0,0 +1,176 @@
+import fnmatch
+
+from smart.utils.list import list_safe_iter
+
+
+class BenchScenario:
+    """基准测试场景, 生成 auto_yml 格式的运行对象(run_obj)
+
+    场景名称格式: <shape>.<worker_mode>.<bounded|unbounded>, 例如 linear.process.bounded
+    """
+    SHAPES = ('linear', 'fanout', 'join')
+    WORKER_MODES = ('thread', 'process')
+    QUEUE_MODES = ('unbounded', 'bounded')
+    TREE_NAME = 'bench'
+
+    def __init__(self, shape:str, worker_mode:str='process', bounded:bool=False, size:int=10000, payload_size:int=100,
+                stages:int=2, fan_out:int=4, joins:int=2, work_us:float=0, max_queue_size:int=1000, tree_opts:dict=None):
+        """构造函数
+
+        Arguments:
+            shape {str} -- 任务树结构: linear(source -> map x stages -> sink), fanout(source -> sink x fan_out), join(source~map x joins~send -> sink)
+
+        Keyword Arguments:
+            worker_mode {str} -- 工作进程模式: thread, process, pool (default: {'process'})
+            bounded {bool} -- 数据管道是否限制队列长度 (default: {False})
+            size {int} -- 数据条数 (default: {10000})
+            payload_size {int} -- 每条数据的文本字节数 (default: {100})
+            stages {int} -- linear 结构的中间任务数 (default: {2})
+            fan_out {int} -- fanout 结构的下游任务数 (default: {4})
+            joins {int} -- join 结构在同一任务单元串联的 map 函数数量 (default: {2})
+            work_us {float} -- map 函数每条数据模拟的计算耗时(微秒) (default: {0})
+            max_queue_size {int} -- bounded 时数据管道的最大队列长度 (default: {1000})
+            tree_opts {dict} -- 每个任务的额外运行选项, 如 pip_type, pip_batch_size (default: {None})
+        """
+        if shape not in self.SHAPES:
+            raise ValueError('unknown bench shape {}, expect one of {}'.format(shape, self.SHAPES))
+        self.shape = shape
+        self.worker_mode = worker_mode
+        self.bounded = bounded
+        self.size = size
+        self.payload_size = payload_size
+        self.stages = max(int(stages), 0)
+        self.fan_out = max(int(fan_out), 1)
+        self.joins = max(int(joins), 0)
+        self.work_us = work_us
+        self.max_queue_size = max_queue_size
+        self.tree_opts = tree_opts or {}
+
+    @property
+    def name(self):
+        return '.'.join((self.shape, self.worker_mode, 'bounded' if self.bounded else 'unbounded'))
+
+    @classmethod
+    def all_names(cls):
+        return [
+            '.'.join((shape, worker_mode, queue_mode))
+            for shape in cls.SHAPES
+            for worker_mode in cls.WORKER_MODES
+            for queue_mode in cls.QUEUE_MODES
+        ]
+
+    @classmethod
+    def match_names(cls, patterns=None):
+        """按名称模式(fnmatch)筛选场景, 例如 linear.*, *.thread.*
+
+        Keyword Arguments:
+            patterns {str|list} -- 名称模式, 字符串时用逗号分隔; None 表示全部场景 (default: {None})
+
+        Returns:
+            list -- 场景名称
+        """
+        if isinstance(patterns, str):
+            patterns = patterns.split(',')
+        patterns = [p.strip() for p in list_safe_iter(patterns) if p and p.strip()]
+        names = cls.all_names()
+        if not patterns:
+            return names
+
+        matched = []
+        for pattern in patterns:
+            # 支持省略后缀, 例如 linear 等同于 linear.*
+            found = fnmatch.filter(names, pattern) or fnmatch.filter(names, pattern + '.*')
+            if not found:
+                # worker_mode 不在默认列表时(如 pool), 按名称直接构造
+                parts = pattern.split('.')
+                if len(parts) == 3 and parts[0] in cls.SHAPES and parts[2] in cls.QUEUE_MODES:
+                    found = [pattern]
+            for name in found:
+                if name not in matched:
+                    matched.append(name)
+        return matched
+
+    @classmethod
+    def from_name(cls, name:str, **kwargs) -> 'BenchScenario':
+        shape, worker_mode, queue_mode = name.split('.')
+        return cls(shape, worker_mode=worker_mode, bounded=(queue_mode == 'bounded'), **kwargs)
+
+    def _exec_opts(self, **kwargs):
+        opts = {
+            'worker_num': 1,
+            'worker_mode': self.worker_mode,
+            **self.tree_opts,
+            **kwargs,
+        }
+        if self.bounded:
+            opts['max_queue_size'] = self.max_queue_size
+        return opts
+
+    def build_tree(self) -> dict:
+        """任务树节点, key 为任务表达式
+        """
+        source = 'bench.source(bench_cfg.source)'
+        map_exp = 'bench.map$%d(bench_cfg.map)~send'
+        sink = 'bench.sink$%d'
+        tree = {}
+
+        if self.shape == 'linear':
+            keys = [source + '~send']
+            keys += [map_exp % (i + 1) for i in range(self.stages)]
+            keys.append(sink % 1)
+            for prev_key, next_key in zip(keys[:-1], keys[1:]):
+                tree[prev_key] = self._exec_opts(next=[next_key])
+            tree[keys[-1]] = self._exec_opts()
+        elif self.shape == 'fanout':
+            sinks = [sink % (i + 1) for i in range(self.fan_out)]
+            tree[source + '~send'] = self._exec_opts(next=sinks)
+            for key in sinks:
+                tree[key] = self._exec_opts()
+        elif self.shape == 'join':
+            source_key = source + '~map(bench_cfg.map)' * self.joins + '~send'
+            tree[source_key] = self._exec_opts(next=[sink % 1])
+            tree[sink % 1] = self._exec_opts()
+
+        return tree
+
+    def build_run_obj(self) -> dict:
+        return {
+            'tasks': {
+                '__load__': ['smart.auto.bench.tasks'],
+            },
+            'configs': {
+                'bench_cfg': {
+                    'source': {
+                        'size': self.size,
+                        'payload_size': self.payload_size,
+                    },
+                    'map': {
+                        'work_us': self.work_us,
+                    },
+                },
+            },
+            'trees': {
+                self.TREE_NAME: self.build_tree(),
+            },
+        }
+
+    def to_dict(self):
+        rst = {
+            'shape': self.shape,
+            'worker_mode': self.worker_mode,
+            'bounded': self.bounded,
+            'size': self.size,
+            'payload_size': self.payload_size,
+            'work_us': self.work_us,
+        }
+        if self.shape == 'linear':
+            rst['stages'] = self.stages
+        elif self.shape == 'fanout':
+            rst['fan_out'] = self.fan_out
+        elif self.shape == 'join':
+            rst['joins'] = self.joins
+        if self.bounded:
+            rst['max_queue_size'] = self.max_queue_size
+        if self.tree_opts:
+            rst['tree_opts'] = self.tree_opts
+        return rst
@@ -0,0 +1,89 @@
+import time
+from array import array
+
+from smart.auto import AutoLoad
+from smart.auto.tree import TreeMultiTask
+
+from smart.auto.__logger import logger
+
+
+auto_load = AutoLoad()
+
+# 基准测试结果在 context 中的 state 名称
+BENCH_STATE = '__bench__'
+
+
+@auto_load.task('bench')
+class BenchTask(TreeMultiTask):
+    """基准测试任务: source 生成数据, map 转发数据, sink 统计端到端延迟
+    """
+    def source(self, size:int=10000, payload_size:int=100):
+        """生成测试数据
+
+        Keyword Arguments:
+            size {int} -- 数据条数 (default: {10000})
+            payload_size {int} -- 每条数据的文本字节数 (default: {100})
+
+        Returns:
+            dict -- {item_iter}; 数据格式: {i, ts, payload}, ts 为数据创建时间
+        """
+        payload = 'x' * payload_size
+
+        def item_iter_fn():
+            for i in range(size):
+                yield {'i': i, 'ts': time.time(), 'payload': payload}
+
+        return {
+            'item_iter': item_iter_fn()
+        }
+
+    def map(self, work_us:float=0, item_iter=None):
+        """转发数据
+
+        Keyword Arguments:
+            work_us {float} -- 每条数据模拟的计算耗时(微秒) (default: {0})
+            item_iter {generator} -- 输入数据, 缺省从数据管道接收 (default: {None})
+
+        Returns:
+            dict -- {item_iter}
+        """
+        item_iter = item_iter or self.recv_data()
+        work_sec = work_us / 1e6
+
+        def item_iter_fn():
+            for item in item_iter:
+                if work_sec:
+                    end = time.perf_counter() + work_sec
+                    while time.perf_counter() < end:
+                        pass
+                yield item
+
+        return {
+            'item_iter': item_iter_fn()
+        }
+
+    def send(self, item_iter=None):
+        for item in item_iter:
+            self.send_data(item)
+
+    def sink(self, item_iter=None):
+        """接收数据并记录每条数据的端到端延迟(当前时间 - 数据创建时间), 结果保存在 context.state(BENCH_STATE)
+        """
+        item_iter = item_iter or self.recv_data()
+        latencies = array('d')
+        ts_first = ts_last = None
+
+        for item in item_iter:
+            ts_last = time.time()
+            if ts_first is None:
+                ts_first = item['ts']
+            latencies.append(ts_last - item['ts'])
+
+        worker_idx = self.worker_state.worker_idx or 0
+        logger.debug('BenchTask.sink %s#%s received %d items', self.task_key, worker_idx, len(latencies))
+        self.context.state(BENCH_STATE).set((self.task_key, str(worker_idx)), {
+            'count': len(latencies),
+            'ts_first': ts_first,
+            'ts_last': ts_last,
+            'latencies': latencies.tobytes(),
+        })
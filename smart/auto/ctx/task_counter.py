@@ -0,0 +1,69 @@
+import threading
+import multiprocessing as mp
+
+
+class TaskCounter:
+    """任务单元计数器
+    计数值保存在预分配的共享内存数组(mp.Array)中, 各工作进程/线程直接读写, 无需 SyncManager 进程通信
+    """
+    DEFAULT_KEYS = ('task_run', 'task_error')
+
+    def __init__(self, keys=None, shared=True) -> None:
+        """构造函数
+
+        Keyword Arguments:
+            keys {list} -- 计数项, 需在启动工作进程前确定 (default: {DEFAULT_KEYS})
+            shared {bool} -- 是否跨进程共享; False时使用进程内数组 (default: {True})
+        """
+        self.keys = tuple(keys or self.DEFAULT_KEYS)
+        self._key_idx = {key: idx for idx, key in enumerate(self.keys)}
+        self.shared = shared
+        if shared:
+            self._values = mp.Array('q', len(self.keys))
+            self._lock = self._values.get_lock()
+        else:
+            self._values = [0] * len(self.keys)
+            self._lock = threading.Lock()
+
+    def _idx(self, key):
+        idx = self._key_idx.get(key)
+        if idx is None:
+            raise KeyError('TaskCounter key {} is not preallocated'.format(key))
+        return idx
+
+    def incr(self, key, incr=1) -> int:
+        """递增计数
+
+        Arguments:
+            key {str} -- 计数项
+
+        Keyword Arguments:
+            incr {int} -- 增量 (default: {1})
+
+        Returns:
+            int -- 递增后的值
+        """
+        idx = self._idx(key)
+        with self._lock:
+            self._values[idx] += incr
+            return self._values[idx]
+
+    def get(self, key, default_val=0) -> int:
+        idx = self._key_idx.get(key)
+        return default_val if idx is None else self._values[idx]
+
+    def to_dict(self):
+        with self._lock:
+            return dict(zip(self.keys, self._values[:]))
+
+    def __getstate__(self):
+        _dict = self.__dict__.copy()
+        if not self.shared:
+            # 进程内计数器的线程锁不可序列化, 反序列化后重建
+            _dict.update(_lock=None)
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._lock is None:
+            self._lock = threading.Lock()
@@ -0,0 +1,178 @@
+import threading, time
+import multiprocessing as mp
+
+
+class TaskMetrics:
+    """任务单元运行指标
+    每个 Worker 一行, 保存在预分配的共享内存数组(mp.Array)中; Worker 在本地累计指标, 定期按增量写入, 读取方汇总所有行
+    处理延迟使用 log2 分桶直方图记录: 第0桶为小于1微秒, 第i桶为 [2^(i+9), 2^(i+10)) 纳秒
+    """
+    FIELDS = ('items_in', 'items_out', 'recv_wait_ns', 'send_block_ns', 'item_time_ns', 'fn_calls', 'fn_time_ns')
+    HIST_BUCKETS = 32
+    ROW_SIZE = len(FIELDS) + HIST_BUCKETS
+
+    def __init__(self, rows:int=1, shared=True) -> None:
+        """构造函数
+
+        Keyword Arguments:
+            rows {int} -- Worker 行数, 需在启动工作进程前确定; Worker 按 worker_idx 取模写入对应行 (default: {1})
+            shared {bool} -- 是否跨进程共享; False时使用进程内数组 (default: {True})
+        """
+        self.rows = max(int(rows or 1), 1)
+        self.shared = shared
+        size = self.rows * self.ROW_SIZE
+        if shared:
+            self._values = mp.Array('q', size)
+            self._lock = self._values.get_lock()
+        else:
+            self._values = [0] * size
+            self._lock = threading.Lock()
+
+    def recorder(self, worker_idx=None) -> 'TaskMetricsRecorder':
+        return TaskMetricsRecorder(self, (worker_idx or 0) % self.rows)
+
+    def add_row(self, row:int, deltas:list):
+        offset = row * self.ROW_SIZE
+        values = self._values
+        with self._lock:
+            for i, delta in enumerate(deltas):
+                if delta:
+                    values[offset + i] += delta
+
+    def _row(self, row:int) -> list:
+        offset = row * self.ROW_SIZE
+        return list(self._values[offset:offset + self.ROW_SIZE])
+
+    @classmethod
+    def _percentile(cls, hist:list, total:int, ratio:float):
+        """直方图的分位数(秒), 取所在分桶的上界
+        """
+        if not total:
+            return None
+        rank, acc = total * ratio, 0
+        for idx, count in enumerate(hist):
+            acc += count
+            if acc >= rank:
+                return round((1 << (idx + 10)) / 1e9, 6)
+        return None
+
+    @classmethod
+    def _row_summary(cls, row:list, elapsed:float=None) -> dict:
+        num_fields = len(cls.FIELDS)
+        fields = dict(zip(cls.FIELDS, row[:num_fields]))
+        hist = row[num_fields:]
+        items_in, items_out = fields['items_in'], fields['items_out']
+        summary = {
+            'items_in': items_in,
+            'items_out': items_out,
+            'recv_wait': round(fields['recv_wait_ns'] / 1e9, 6),
+            'send_block': round(fields['send_block_ns'] / 1e9, 6),
+            'item_time': round(fields['item_time_ns'] / 1e9, 6),
+            'fn_calls': fields['fn_calls'],
+            'fn_time': round(fields['fn_time_ns'] / 1e9, 6),
+            'latency_p50': cls._percentile(hist, items_in, 0.5),
+            'latency_p99': cls._percentile(hist, items_in, 0.99),
+        }
+        if elapsed:
+            summary['in_per_sec'] = round(items_in / elapsed, 1)
+            summary['out_per_sec'] = round(items_out / elapsed, 1)
+        return summary
+
+    def summary(self, elapsed:float=None, by_worker=True) -> dict:
+        """汇总指标
+
+        Keyword Arguments:
+            elapsed {float} -- 运行时长(秒), 用于计算吞吐量 (default: {None})
+            by_worker {bool} -- 是否包含每个 Worker 的指标 (default: {True})
+
+        Returns:
+            dict -- 时间单位为秒; latency_p50/p99 为每条数据处理耗时的近似分位数
+        """
+        with self._lock:
+            rows = [self._row(row) for row in range(self.rows)]
+        total = [sum(col) for col in zip(*rows)]
+        summary = self._row_summary(total, elapsed)
+        if elapsed:
+            summary['elapsed'] = round(elapsed, 6)
+        if by_worker and self.rows > 1:
+            summary['workers'] = [self._row_summary(row, elapsed) for row in rows]
+        return summary
+
+    def __getstate__(self):
+        _dict = self.__dict__.copy()
+        if not self.shared:
+            # 进程内指标的线程锁不可序列化, 反序列化后重建
+            _dict.update(_lock=None)
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._lock is None:
+            self._lock = threading.Lock()
+
+
+class TaskMetricsRecorder:
+    """Worker 本地指标记录器, 定期将增量写入 TaskMetrics
+    """
+    FLUSH_INTERVAL_NS = 500 * 1000 * 1000
+    _IDX = {key: idx for idx, key in enumerate(TaskMetrics.FIELDS)}
+    _HIST_OFFSET = len(TaskMetrics.FIELDS)
+
+    def __init__(self, metrics:TaskMetrics, row:int) -> None:
+        self.metrics = metrics
+        self.row = row
+        self._deltas = [0] * TaskMetrics.ROW_SIZE
+        self._flush_ts = time.perf_counter_ns()
+
+    def _check_flush(self, now_ns):
+        if now_ns - self._flush_ts >= self.FLUSH_INTERVAL_NS:
+            self.flush(now_ns)
+
+    def flush(self, now_ns=None):
+        deltas, self._deltas = self._deltas, [0] * TaskMetrics.ROW_SIZE
+        self._flush_ts = now_ns or time.perf_counter_ns()
+        self.metrics.add_row(self.row, deltas)
+
+    def on_get(self, wait_ns):
+        self._deltas[2] += wait_ns
+
+    def on_item(self, item_ns, now_ns):
+        deltas = self._deltas
+        deltas[0] += 1
+        deltas[4] += item_ns
+        bucket = item_ns.bit_length() - 10
+        if bucket < 0:
+            bucket = 0
+        elif bucket >= TaskMetrics.HIST_BUCKETS:
+            bucket = TaskMetrics.HIST_BUCKETS - 1
+        deltas[self._HIST_OFFSET + bucket] += 1
+        self._check_flush(now_ns)
+
+    def on_send(self, num=1):
+        self._deltas[1] += num
+
+    def on_put(self, block_ns):
+        self._deltas[3] += block_ns
+
+    def on_call(self, call_ns):
+        self._deltas[5] += 1
+        self._deltas[6] += call_ns
+
+
+class _MetricsLocal(threading.local):
+    # 类属性作为默认值, 未设置时读取不会触发 AttributeError, 保证未启用指标时的开销可忽略
+    recorder:TaskMetricsRecorder = None
+
+
+# 管道等热点路径直接读取 metrics_local.recorder, 省去函数调用开销
+metrics_local = _MetricsLocal()
+
+
+def current_metrics() -> TaskMetricsRecorder:
+    """当前线程的指标记录器, 由 TaskPod.run_task 设置; 未设置时为 None
+    """
+    return metrics_local.recorder
+
+
+def set_current_metrics(recorder:TaskMetricsRecorder):
+    metrics_local.recorder = recorder
@@ -1,25 +1,35 @@
 from smart.auto.base import BaseContext
 from smart.auto.meta import TreeRunMode
-from smart.utils.store.store import ContextStore
-from smart.utils.store.mp_store import MpContextStore
+from smart.utils.store.store import ContextStore, ContextState
+from smart.utils.store.mp_store import LazyMpContextStore
+from smart.utils.startup_profile import StartupProfile
 
 from smart.auto.__logger import logger_trace, logger
 
 
 class TreeContext(BaseContext):
+    """任务树上下文
+
+    内置的停止标记及 response 只在主进程写入(before_task 勾子 / 任务树结束后), 保存在进程内,
+    工作进程启动时继承副本; 多进程模式下只有调用 state/list/store 等用户接口时才启动 SyncManager 进程
+    """
     def __init__(self, configs={}):
         super().__init__(configs=configs)
         self.run_mode = None
         self.run_stage = None
         self.__store = None
+        self.__flags = {}
+        self.__resp = ContextState('__resp__')
     
     @property
     def store(self):
         if self.__store is None:
-            if self.run_mode in (TreeRunMode.default, TreeRunMode.worker_mt):
-                self.__store = ContextStore()
-            else:
-                self.__store = MpContextStore()
+            with StartupProfile.phase('store_init'):
+                if self.run_mode in (TreeRunMode.default, TreeRunMode.worker_mt):
+                    self.__store = ContextStore()
+                else:
+                    # 首次使用时启动 SyncManager; 工作进程频繁读取状态, 启用本地读缓存
+                    self.__store = LazyMpContextStore(cache=True)
         
         return self.__store
     
@@ -35,13 +45,23 @@ class TreeContext(BaseContext):
             logger_trace.debug('TreeContext store closed')
     
     def response(self):
-        state = self.store.state('__resp__')
+        state = self.__resp
         
         if self.run_stage not in ('before_task', ):
             state.set_readonly()
 
         return state
     
+    def set_metrics(self, tree_name, metrics:dict):
+        """记录任务树运行指标, 可通过 response() 的 __metrics__.<tree_name> 获取
+        """
+        state = self.__resp
+        state.set_readonly(False)
+        state.set(('__metrics__', tree_name), metrics)
+
+        if self.run_stage not in ('before_task', ):
+            state.set_readonly()
+
     # def stop_task(self):
     #     if self.run_stage not in ('before_task', ):
     #         logger.warning('context.stop_task must be called in before_task hook')
@@ -67,7 +87,7 @@ class TreeContext(BaseContext):
         if self.run_stage not in ('before_task', ):
             logger.warning('context.stop_task must be called in before_task hook')
         else:
-            self.store.dict('__state__')[flag_name] = True
+            self.__flags[flag_name] = True
             logger.info('# context.stop_task %s', '__all__' if end_all else task_key)
     
     def is_stop_task(self, task_key=None, end_all=False):
@@ -89,7 +109,7 @@ class TreeContext(BaseContext):
             end_flags.append('stop_tree')
 
         for end_flag in end_flags:
-            if self.store.dict('__state__').get(end_flag, False):
+            if self.__flags.get(end_flag, False):
                 return True
                 
         return False
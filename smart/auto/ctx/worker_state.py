@@ -7,8 +7,10 @@ class WorkerState:
         task_run_count: 任务运行次数
         task_error_count: 任务出错次数
         error_count: Worker出错次数
+        counter: 任务单元所有Worker共享的计数器(TaskCounter), 由TaskPod设置
         """
         self._state = None
+        self.counter = None
         self.keys = ['worker_idx', 'task_run_count', 'task_error_count', 'error_count']
     
     @property
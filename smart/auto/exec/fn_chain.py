@@ -1,7 +1,9 @@
 import os
+from time import perf_counter_ns
 
 from smart.utils.bound import BoundFn
 from smart.utils.func import func_safe_call
+from smart.auto.ctx.task_metrics import metrics_local
 
 from smart.auto.__logger import logger
 
@@ -36,7 +38,15 @@ class FnItem(BoundFn):
         args = [*self.bind_args, *args] if args else self.bind_args
         kwargs = {**self.bind_kwargs, **kwargs} if kwargs else self.bind_kwargs
         logger.debug('FnItem %s %s start, pid=%s', self.fn_type, self._name or self.__hash__(), os.getpid())
-        self.__rst = rst = func_safe_call(self.__func__, args, kwargs)
+        metrics = metrics_local.recorder
+        if metrics is None:
+            self.__rst = rst = func_safe_call(self.__func__, args, kwargs)
+        else:
+            ts = perf_counter_ns()
+            try:
+                self.__rst = rst = func_safe_call(self.__func__, args, kwargs)
+            finally:
+                metrics.on_call(perf_counter_ns() - ts)
         self._called = True
         return rst
 
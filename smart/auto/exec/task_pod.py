@@ -1,15 +1,20 @@
-import time, functools, typing, sys
+import time, functools, typing, sys, threading
 import multiprocessing as mp
 from smart.auto.exec.worker import worker_cls_builder, BaseWorker
 
 from smart.utils.process import on_process_init
 from smart.utils.list import list_safe_get
-from smart.utils.number import safe_parse_int
+from smart.utils.number import safe_parse_int, safe_parse_float
+from smart.utils.cast import cast_bool
+from smart.utils.env import AppEnv
+from smart.utils.startup_profile import StartupProfile
 from smart.auto.constants import Constants
 from smart.auto.tree import TreeTask
 from smart.auto.meta import TaskMeta
 from smart.auto.pip.cmd import Command, CommandType, end_cmd
 from smart.auto.ctx.tree_context import TreeContext
+from smart.auto.ctx.task_counter import TaskCounter
+from smart.auto.ctx.task_metrics import TaskMetrics, set_current_metrics
 from smart.auto.exec.fn_chain import FnChain
 from smart.auto.__logger import logger
 
@@ -17,6 +22,15 @@ from smart.auto.__logger import logger
 class TaskPod:
     Opt_Worker_Start_Interval = 0.01
     Opt_Restart_Interval = 1
+    # worker_num=auto 时的扩缩容检查间隔(秒)
+    Opt_Scale_Interval = 1
+    # worker_num=auto 时, 输入管道平均每个工作进程积压超过该数据量则扩容
+    Opt_Scale_Up_Backlog = 10
+    # worker_num=auto 时, 输入管道连续多少次检查为空则缩容
+    Opt_Scale_Down_Idle = 3
+    # 是否记录任务运行指标(吞吐量, 队列等待/阻塞时间, 处理延迟), 结果见 context.response() 的 __metrics__
+    # None: 由环境变量 AUTO_METRICS 或 AUTO_METRICS_INTERVAL 决定; 每条数据约增加1微秒开销
+    Opt_Metrics = None
 
     def __init__(self, context:TreeContext, task_meta:TaskMeta, fn_chain:FnChain,
                 worker_mode:str=None, worker_num:int=None, restart=None, **kwargs) -> None:
@@ -25,14 +39,26 @@ class TaskPod:
         self.fn_chain = fn_chain
         self.worker_mode = worker_mode
         self.worker_num = worker_num
+        self._opt = kwargs
         self.worker_done_count = mp.Value('i', 0)
+        # 已启动(含预留)的工作进程数, 待退出的缩容进程数, 是否停止扩容(收到结束命令或全部工作进程结束); 均使用 worker_done_count 的锁
+        self.worker_start_count = mp.Value('i', 0, lock=False)
+        self._worker_retire_count = mp.Value('i', 0, lock=False)
+        self._scale_closed = mp.Value('b', 0, lock=False)
+        # 在启动工作进程前预分配共享计数器, 工作进程启动和重启时无需访问 SyncManager
+        # 除 thread 外的模式均在子进程中运行
+        shared = self.get_worker_mode() != 'thread' and self.enable_worker
+        self.task_counter = TaskCounter(shared=shared)
+        # 任务运行指标, 每个 Worker 一行
+        self.task_metrics = TaskMetrics(rows=self._metrics_rows(), shared=shared) if self.metrics_enabled() else None
+        self.start_ts = self.end_ts = None
         self.worker_list:typing.List[BaseWorker] = []
+        self._scale_thread:threading.Thread = None
         self._to_kill_workers:typing.List[BaseWorker] = []
         self.__started = False
         if restart in (True, 'True', 1, 'true'):
             restart = 'on-error'
         self._policy_restart = (restart or 'no').split(':')
-        self._opt = kwargs
     
     @property
     def task_class(self) -> typing.Type[TreeTask]:
@@ -50,6 +76,41 @@ class TaskPod:
     def get_worker_mode(self):
         return Constants.DEFAULT_WORKER_MODE if self.worker_mode is None else self.worker_mode
 
+    @property
+    def auto_scale(self):
+        return self.worker_num == 'auto'
+
+    @property
+    def enable_worker(self):
+        worker_num = self.worker_num
+        return self.auto_scale or (isinstance(worker_num, int) and worker_num > 0)
+
+    @classmethod
+    def metrics_enabled(cls):
+        if cls.Opt_Metrics is not None:
+            return bool(cls.Opt_Metrics)
+        return cast_bool(AppEnv.get('AUTO_METRICS')) or bool(safe_parse_float(AppEnv.get('AUTO_METRICS_INTERVAL')))
+
+    def _metrics_rows(self):
+        if self.auto_scale:
+            return self._scale_bounds()[1]
+        return self.worker_num if self.enable_worker else 1
+
+    def metrics_summary(self, by_worker=True):
+        """任务运行指标汇总, 未启用时返回 None
+        """
+        if self.task_metrics is None:
+            return None
+        elapsed = None
+        if self.start_ts is not None:
+            elapsed = (self.end_ts or time.time()) - self.start_ts
+        return self.task_metrics.summary(elapsed=elapsed, by_worker=by_worker)
+
+    def _scale_bounds(self):
+        worker_min = max(safe_parse_int(self._opt.get('worker_min')) or 1, 1)
+        worker_max = safe_parse_int(self._opt.get('worker_max')) or mp.cpu_count()
+        return worker_min, max(worker_max, worker_min)
+
     def __task_repr(self, task_meta=None):
         task_meta = task_meta or self.task_meta
         return (task_meta.task_key, task_meta.task_class_path or task_meta.task_class) if task_meta else 'unknown task'
@@ -65,14 +126,12 @@ class TaskPod:
             if clean_num:
                 logger.debug('%s clean_pip_in %d items', self.task_class, clean_num)
 
-    def _on_worker_done(self, worker_num, send_end_cmd=True, clean_pip_in=True, context:TreeContext=None):
+    def _on_worker_done(self, send_end_cmd=True, clean_pip_in=True, context:TreeContext=None):
         """任务结束回调
 
         当任务的最后一个工作进程结束时, 自动向后置任务的接收数据管道发送 end_cmd. 
         end_cmd 用于 recv_data 函数结束生成器, 无需任务函数处理. 
-
-        Arguments:
-            worker_num {int} -- 工作进程数量
+        工作进程数以已启动(含预留)的数量为准, worker_num=auto 时运行期间扩缩容的工作进程同样计入
 
         Keyword Arguments:
             send_end_cmd {bool} -- 是否向后置任务发送 end_cmd (default: {True})
@@ -82,8 +141,12 @@ class TaskPod:
 
         with done_count.get_lock():
             done_count.value += 1
+            worker_num = self.worker_start_count.value
 
             if done_count.value >= worker_num:
+                # 所有工作进程已结束, 停止扩容
+                self._scale_closed.value = 1
+
                 if worker_num > 1:
                     logger.debug('%s workers all done(%d/%d)', self.task_class, done_count.value, worker_num)
 
@@ -93,28 +156,44 @@ class TaskPod:
                 if clean_pip_in:
                     self._clean_pip_in()
 
-    def _on_queue_end(self, command, worker_num=1):
+    def _on_queue_end(self, command):
         # 接收到end命令, 需要转发给其它进程
         # print('__on_queue_end', command.args)
         # logger.debug('%s queue end (pid %d)', self.task_class, os.getpid())
+        done_count = self.worker_done_count
+
+        if command.args.get('retire'):
+            # 缩容命令, 仅结束当前工作进程
+            with done_count.get_lock():
+                self._worker_retire_count.value -= 1
+            return
+
         if command.args.get('no_forward'):
             return
 
-        for i in range(worker_num-1):
+        with done_count.get_lock():
+            # 停止扩容, 之后工作进程数量不再增加
+            self._scale_closed.value = 1
+            # 转发给其它仍在运行且不会因缩容命令退出的工作进程; 多转发的命令在任务结束时由 _clean_pip_in 清理
+            forward_num = self.worker_start_count.value - done_count.value - self._worker_retire_count.value - 1
+
+        for i in range(forward_num):
             self.task_obj.pip_in.send(Command(
                 type=CommandType.end, 
                 no_forward=True
             ))
             
     def is_done(self):
-        worker_num = self.worker_num
-        if worker_num is None: worker_num = 1
+        if not self.enable_worker:
+            return self.worker_done_count.value >= 1
 
-        return self.worker_done_count.value >= worker_num
+        return bool(self._scale_closed.value) and \
+            self.worker_done_count.value >= self.worker_start_count.value
     
     def _task_counter(self, key, incr=0):
-        counter_state = self.context.state(self.task_obj.task_key)
-        return counter_state.set_fn(('counter', key), lambda val:(val or 0)+incr)
+        if incr:
+            return self.task_counter.incr(key, incr)
+        return self.task_counter.get(key)
     
     def _err_cb(self):
         task_error_count = self._task_counter('task_error', incr=1)
@@ -142,6 +221,9 @@ class TaskPod:
         if worker_idx is not None and worker_mode == 'process':
             on_process_init()
 
+        self.task_obj.worker_state.counter = self.task_counter
+        metrics_recorder = self.task_metrics.recorder(worker_idx) if self.task_metrics else None
+        set_current_metrics(metrics_recorder)
         start_time = time.monotonic()
         try:
             while True:
@@ -169,8 +251,13 @@ class TaskPod:
                         raise e
                 break
         finally:
+            # 发送输出管道缓冲的数据, 确保在 end_cmd 之前到达下游任务
+            self.task_obj.pip_out.flush()
             if send_end_cmd:
                 self.task_obj.send_data(end_cmd)
+            if metrics_recorder:
+                metrics_recorder.flush()
+                set_current_metrics(None)
             if on_task_done:
                 on_task_done()
         during = time.monotonic() - start_time
@@ -182,59 +269,141 @@ class TaskPod:
             return
         self.__started = True
 
-        worker_list = self.worker_list
         task_key = self.task_meta.task_key
         context = self.context
         context.run_stage = 'task'
+        self.start_ts = time.time()
         
         if context.is_stop_task(task_key=task_key, end_all=True):
             logger.info('TreeTaskExecutor.end(by context.stop_task)')
-            self.worker_done_count.value = worker_num or 1
+            self.worker_done_count.value = self.worker_start_count.value = 1
+            self._scale_closed.value = 1
             if clean_pip_in:
                 self._clean_pip_in()
             return
 
         worker_mode, worker_num = self.get_worker_mode(), self.worker_num
-        enable_worker = isinstance(worker_num, int) and worker_num > 0
 
-        if not enable_worker:
+        if not self.enable_worker:
             self.run_task(send_end_cmd=send_end_cmd, remote_debug=remote_debug)
-            self.worker_done_count.value = worker_num or 1
+            self.end_ts = time.time()
+            self.worker_done_count.value = self.worker_start_count.value = 1
+            self._scale_closed.value = 1
 
             if clean_pip_in:
                 self._clean_pip_in()
             return
 
+        if self.auto_scale:
+            worker_num, worker_max = self._scale_bounds()
+            logger.debug('%s auto scale workers: min=%d, max=%d', self.__task_repr(), worker_num, worker_max)
+
+        # 预留工作进程数, 避免先启动的工作进程结束时误判为全部结束
+        self.worker_start_count.value = worker_num
+        self.task_obj.pip_in.on_end = self._on_queue_end
+        self._on_worker_done_cb = functools.partial(
+            self._on_worker_done, 
+            send_end_cmd=send_end_cmd, 
+            clean_pip_in=clean_pip_in,
+            context=context )
+
         for worker_idx in range(worker_num):
-            remote_debug = remote_debug if worker_idx == 0 else False
-            _worker_name = task_key
-            if worker_idx:
-                _worker_name += '#'+str(worker_idx)
+            if worker_idx and worker_mode != 'pool':
                 time.sleep(self.Opt_Worker_Start_Interval)
-            
-            self.task_obj.options['worker_idx'] = worker_idx
-            self.task_obj.pip_in.on_end = functools.partial(self._on_queue_end, worker_num=worker_num)
-
-            _on_worker_done = functools.partial(
-                self._on_worker_done, 
-                worker_num=worker_num, 
-                send_end_cmd=send_end_cmd, 
-                clean_pip_in=clean_pip_in,
-                context=context )
-
-            WorkerCls = worker_cls_builder(worker_mode)
-            worker = WorkerCls(target=self.run_task, args=(
-                False, _on_worker_done, worker_idx, remote_debug
-            ), name=_worker_name)
+            self._start_worker(worker_idx, remote_debug=(remote_debug if worker_idx == 0 else False))
+
+        if self.auto_scale:
+            self._scale_thread = threading.Thread(
+                target=self._scale_loop, args=(worker_max, ),
+                name='TaskPod-scale', daemon=True)
+            self._scale_thread.start()
+
+    def _start_worker(self, worker_idx, remote_debug=False):
+        _worker_name = self.task_meta.task_key
+        if worker_idx:
+            _worker_name += '#'+str(worker_idx)
+
+        self.task_obj.options['worker_idx'] = worker_idx
+
+        WorkerCls = worker_cls_builder(self.get_worker_mode())
+        worker = WorkerCls(target=self.run_task, args=(
+            False, self._on_worker_done_cb, worker_idx, remote_debug
+        ), name=_worker_name)
+        with StartupProfile.phase('worker_spawn'):
             worker.start()
 
-            logger.debug('# %s %s-%s started, id=%s', WorkerCls.__name__, self.__task_repr(), worker_idx, worker.ident)
-            worker_list.append(worker)
+        logger.debug('# %s %s-%s started, id=%s', WorkerCls.__name__, self.__task_repr(), worker_idx, worker.ident)
+        self.worker_list.append(worker)
+
+    @staticmethod
+    def _pip_backlog(pip):
+        try:
+            return pip.qsize() or 0
+        except (NotImplementedError, AttributeError):
+            # macOS 等平台的 mp.Queue 不支持 qsize
+            return None
+
+    def _scale_loop(self, worker_max):
+        """worker_num=auto 时根据输入管道积压数据量扩缩容
+        输入管道平均每个工作进程积压超过 Opt_Scale_Up_Backlog 且下游积压少于输入管道时扩容; 输入管道连续 Opt_Scale_Down_Idle 次为空时缩容
+        """
+        worker_min, _ = self._scale_bounds()
+        done_count, pip_in = self.worker_done_count, self.task_obj.pip_in
+        idle_times = 0
+
+        while not self._scale_closed.value:
+            time.sleep(self.Opt_Scale_Interval)
+
+            in_backlog = self._pip_backlog(pip_in)
+            if in_backlog is None:
+                logger.warning('%s auto scale disabled, pip_in qsize is not supported', self.__task_repr())
+                return
+            out_backlog = max([self._pip_backlog(pip) or 0 for pip in self.task_obj.pip_out.pips] or [0])
+
+            with done_count.get_lock():
+                if self._scale_closed.value:
+                    return
+                live_num = self.worker_start_count.value - done_count.value - self._worker_retire_count.value
+                idle_times = idle_times + 1 if in_backlog == 0 else 0
+
+                action = None
+                if live_num < worker_max and in_backlog > live_num * self.Opt_Scale_Up_Backlog and out_backlog < in_backlog:
+                    action = 'up'
+                    worker_idx = self.worker_start_count.value
+                    self.worker_start_count.value += 1
+                elif live_num > worker_min and idle_times >= self.Opt_Scale_Down_Idle:
+                    action = 'down'
+                    idle_times = 0
+                    self._worker_retire_count.value += 1
+
+            if action == 'up':
+                logger.debug('%s scale up workers to %d, backlog=%d', self.__task_repr(), live_num + 1, in_backlog)
+                self._start_worker(worker_idx)
+            elif action == 'down':
+                logger.debug('%s scale down workers to %d', self.__task_repr(), live_num - 1)
+                pip_in.send(Command(type=CommandType.end, no_forward=True, retire=True))
+
+    def __getstate__(self):
+        """spawn 模式或工作进程池会使用 pickle 序列化本实例, 已启动的工作进程对象需排除
+        """
+        _dict = self.__dict__.copy()
+        _dict.update(worker_list=[], _to_kill_workers=[], _scale_thread=None)
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
 
     def join(self):
         worker_list = self.worker_list
         task_meta = self.task_meta
-        for worker in worker_list:
+        worker_idx = 0
+        # worker_num=auto 时等待期间可能扩容, 按索引遍历
+        while worker_idx < len(worker_list) or (self._scale_thread and self._scale_thread.is_alive()):
+            if worker_idx >= len(worker_list):
+                self._scale_thread.join(self.Opt_Scale_Interval)
+                continue
+            worker = worker_list[worker_idx]
+            worker_idx += 1
             if worker.is_alive():
                 # logger.debug('await worker %s', task_meta.task_key)
                 for i in range(1, sys.maxsize):
@@ -249,4 +418,6 @@ class TaskPod:
                         break
                 logger.debug('end await worker %s, id=%s, exitcode=%s', task_meta.task_key, worker.ident, worker.exitcode)
             else:
-                logger.debug('skip await worker %s, id=%s, exitcode=%s', task_meta.task_key, worker.ident, worker.exitcode)
\ No newline at end of file
+                logger.debug('skip await worker %s, id=%s, exitcode=%s', task_meta.task_key, worker.ident, worker.exitcode)
+        if self.end_ts is None:
+            self.end_ts = time.time()
\ No newline at end of file
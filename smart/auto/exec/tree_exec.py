@@ -1,13 +1,14 @@
 import inspect, re
 import multiprocessing as mp
+from queue import Queue, SimpleQueue
 from smart.auto.exec.task_pod import TaskPod
 
 from smart.utils.loader import dyn_import, get_import_path
-from smart.utils.number import safe_parse_int
+from smart.utils.number import safe_parse_int, safe_parse_float
 
 from smart.auto.constants import Constants
-from smart.auto.pip import QueuePip
-from smart.auto.meta import TaskMeta, EnumTaskType, TreeTaskRunOpts
+from smart.auto.pip import QueuePip, BatchQueuePip
+from smart.auto.meta import TaskMeta, EnumTaskType, TreeTaskRunOpts, TreeRunMode
 from smart.auto.tree import TreeTask, TreeLambdaTask, TreeFuncTask, TreeModuleTask
 from smart.auto.exec.fn_chain import FnChain, FnItem
 from smart.auto.ctx.tree_context import TreeContext
@@ -23,8 +24,12 @@ class TreeTaskExecutor:
         self.func_meta = task_meta.task_method_meta if task_meta else None
         self.context = context
         self.__all_task_obj = {}
-        self.task_obj:TreeTask = self._new_task_obj(task_class, task_init_args, task_init_kwargs)
         self._run_opts = run_opts
+        self.task_obj:TreeTask = self._new_task_obj(task_class, task_init_args, task_init_kwargs)
+
+        serialize_once = self.__get_run_opt(TreeTaskRunOpts.pip_serialize_once)
+        if serialize_once is not None:
+            self.task_obj.pip_out.serialize_once = serialize_once not in (False, 'False', 'false', 0, '0')
 
         self.fn_chain = FnChain()
         self.fn_chain.new_block().add_item(
@@ -76,6 +81,11 @@ class TreeTaskExecutor:
         
     def pip_fn(self):
         max_queue_size = safe_parse_int(self.__get_run_opt(TreeTaskRunOpts.max_queue_size), 0)
+        batch_size = safe_parse_int(self.__get_run_opt(TreeTaskRunOpts.pip_batch_size), 0)
+
+        if batch_size > 1 and max_queue_size > 0:
+            # 管道中的数据单元为批次
+            max_queue_size = max(max_queue_size // batch_size, 1)
 
         queue_opts = {}
         if max_queue_size > 0:
@@ -88,7 +98,37 @@ class TreeTaskExecutor:
 
             queue_opts['maxsize'] = max_queue_size
 
-        return QueuePip(queue=mp.Queue(**queue_opts))
+        queue = self._new_queue(self.__get_run_opt(TreeTaskRunOpts.pip_type), queue_opts)
+
+        if batch_size > 1:
+            return BatchQueuePip(
+                queue=queue,
+                batch_size=batch_size,
+                linger=safe_parse_float(self.__get_run_opt(TreeTaskRunOpts.pip_batch_linger))
+            )
+
+        return QueuePip(queue=queue)
+
+    def _new_queue(self, pip_type, queue_opts:dict):
+        if pip_type in (None, '', 'auto'):
+            # 任务树无工作进程时, 使用进程内队列, 避免序列化和 feeder 线程开销
+            run_mode = self.context.run_mode if self.context else None
+            pip_type = 'thread' if run_mode in (TreeRunMode.default, TreeRunMode.worker_mt) else 'queue'
+
+        if pip_type == 'thread':
+            if queue_opts.get('maxsize'):
+                return Queue(**queue_opts)
+            return SimpleQueue()
+        elif pip_type == 'shm':
+            from smart.auto.pip.ShmRingQueue import ShmRingQueue
+            return ShmRingQueue(
+                size=safe_parse_int(self.__get_run_opt(TreeTaskRunOpts.pip_shm_size)),
+                **queue_opts
+            )
+        elif pip_type != 'queue':
+            logger.warning('unknown pip_type %s of task %s, use queue', pip_type, self.task_meta.task_key)
+
+        return mp.Queue(**queue_opts)
     
     def _fn_item(self, task_meta:TaskMeta):
         if not task_meta:
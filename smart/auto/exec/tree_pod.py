@@ -1,4 +1,4 @@
-import time, sys, typing
+import time, sys, typing, json, threading
 
 from smart.auto.exec.tree_exec import TreeTaskExecutor
 from smart.auto.exec.worker import BaseWorker
@@ -8,6 +8,7 @@ from smart.auto.meta import TreeMeta, TreeTaskMeta
 
 from smart.auto.__logger import logger
 from smart.utils.env import AppEnv
+from smart.utils.number import safe_parse_float
 
 
 class TreePod:
@@ -17,6 +18,7 @@ class TreePod:
         self.context = context
         self.task_pod_list:typing.List[TaskPod] = []
         self.__started = False
+        self._metrics_stop:threading.Event = None
 
     def start(self):
         if self.__started:
@@ -37,6 +39,9 @@ class TreePod:
             logger.info('# Tree %s is stop by flag context.stop_task', tree_name)
             return
 
+        # 未启用 worker 的任务单元在 exec_fn 中同步运行, 需在此之前启动指标输出线程
+        self.__start_metrics_dump()
+
         for tree_task_meta in tree.tree_tasks:
             tree_task_meta:TreeTaskMeta
             
@@ -46,6 +51,42 @@ class TreePod:
 
             task_pod = task_executor.exec_fn(**exec_opts)
             self.task_pod_list.append(task_pod)
+
+    def metrics_summary(self, by_worker=True) -> dict:
+        """任务树中各任务单元的运行指标, key 为 task_key
+        """
+        summary = {}
+        for task_pod in list(self.task_pod_list):
+            task_summary = task_pod.metrics_summary(by_worker=by_worker)
+            if task_summary is not None:
+                summary[task_pod.task_meta.task_key] = task_summary
+        return summary
+
+    def __dump_metrics(self, file_path=None, by_worker=True):
+        summary = self.metrics_summary(by_worker=by_worker)
+        if file_path:
+            with open(file_path, 'w') as f:
+                json.dump({self.tree_name: summary}, f, indent=2)
+        return summary
+
+    def __start_metrics_dump(self):
+        """AUTO_METRICS_INTERVAL 环境变量大于0时, 定期打印运行指标; 设置 AUTO_METRICS_FILE 时同时写入JSON文件
+        """
+        interval = safe_parse_float(AppEnv.get('AUTO_METRICS_INTERVAL'))
+        if not interval or interval <= 0:
+            return
+        file_path = AppEnv.get('AUTO_METRICS_FILE')
+        self._metrics_stop = stop_event = threading.Event()
+
+        def _dump_loop():
+            while not stop_event.wait(interval):
+                try:
+                    summary = self.__dump_metrics(file_path, by_worker=False)
+                    logger.info('# Tree %s metrics: %s', self.tree_name, json.dumps(summary))
+                except Exception as e:
+                    logger.warning('Tree %s dump metrics fail: %s', self.tree_name, e)
+
+        threading.Thread(target=_dump_loop, name='TreePod-metrics', daemon=True).start()
     
     def join(self):
         # 启用远程调试功能
@@ -97,4 +138,18 @@ class TreePod:
                             all_done = False
                 if all_done:
                     break
-            logger.debug('Tree %s is done %s', tree_name, exec_opts)
\ No newline at end of file
+            # 释放数据管道资源
+            for task_pod in self.task_pod_list:
+                task_pod.task_obj.pip_out.close()
+            self.__finish_metrics()
+            logger.debug('Tree %s is done %s', tree_name, exec_opts)
+
+    def __finish_metrics(self):
+        if self._metrics_stop is not None:
+            self._metrics_stop.set()
+        try:
+            summary = self.__dump_metrics(AppEnv.get('AUTO_METRICS_FILE'))
+            if summary:
+                self.context.set_metrics(self.tree_name, summary)
+        except Exception as e:
+            logger.warning('Tree %s save metrics fail: %s', self.tree_name, e)
@@ -0,0 +1,292 @@
+import io, os, sys, gc, pickle, signal, atexit, threading, importlib
+import multiprocessing as mp
+from multiprocessing import context, resource_sharer
+from multiprocessing.reduction import ForkingPickler
+
+from . import BaseWorker
+from smart.utils import AppEnv
+from smart.utils.number import safe_parse_int
+from smart.utils.process import on_process_init
+from smart.auto.__logger import logger
+
+
+class _PoolSpawningPopen:
+    """序列化任务时模拟 spawn 上下文, 使 mp.Queue/mp.Value/mp.Lock 等对象可以发送给已启动的常驻进程
+    文件描述符通过 resource_sharer 传递, 信号量按名称重新打开
+    """
+    def DupFd(self, fd):
+        return resource_sharer.DupFd(fd)
+
+    def duplicate_for_child(self, fd):
+        return fd
+
+
+def _dumps_job(obj) -> bytes:
+    buf = io.BytesIO()
+    context.set_spawning_popen(_PoolSpawningPopen())
+    try:
+        ForkingPickler(buf, pickle.HIGHEST_PROTOCOL).dump(obj)
+    finally:
+        context.set_spawning_popen(None)
+    return buf.getvalue()
+
+
+def _join_queue_feeders(timeout=5):
+    # 任务对象回收后 mp.Queue 的 feeder 线程会发送完缓冲数据后退出, 等待其完成再报告任务结束
+    for thread in threading.enumerate():
+        if thread.name == 'QueueFeederThread' and thread is not threading.current_thread():
+            thread.join(timeout)
+
+
+def _preload_modules(modules):
+    for module in modules or []:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning('WorkerPool preload %s fail: %s', module, e)
+
+
+def _job_modules(target) -> list:
+    """任务函数(TaskPod.run_task)所属任务树节点的任务类模块"""
+    pod = getattr(target, '__self__', None)
+    all_task_obj = getattr(pod, 'all_task_obj', None)
+    if all_task_obj is None:
+        return []
+    modules = []
+    for task_obj in all_task_obj():
+        module = type(task_obj).__module__
+        if module not in modules and module not in ('__main__', '__mp_main__'):
+            modules.append(module)
+    return modules
+
+
+def _pool_process_loop(conn, preload=None):
+    on_process_init()
+    _preload_modules(preload)
+
+    while True:
+        try:
+            data = conn.recv_bytes()
+        except KeyboardInterrupt:
+            # 空闲时忽略进程组的中断信号, 由主进程关闭进程池
+            continue
+        except EOFError:
+            break
+
+        if not data:
+            break
+
+        exitcode = 0
+        try:
+            job = pickle.loads(data)
+            if isinstance(job, list):
+                # 空闲时预先导入模块, 无需应答
+                _preload_modules(job)
+                continue
+            target, args, kwargs = job
+            target(*args, **kwargs)
+        except SystemExit as e:
+            exitcode = e.code if isinstance(e.code, int) else 1
+        except BaseException as e:
+            logger.exception(e)
+            exitcode = 1
+        finally:
+            target = args = kwargs = data = job = None
+            gc.collect()
+            _join_queue_feeders()
+
+        try:
+            conn.send(exitcode)
+        except (EOFError, OSError, BrokenPipeError):
+            break
+
+
+class _PoolProcess:
+    def __init__(self, preload=None) -> None:
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(
+            target=_pool_process_loop,
+            args=(child_conn, preload),
+            name='AutoWorkerPool',
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+        # 被强制停止或异常退出的进程不再复用
+        self.tainted = False
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def preload(self, modules:list):
+        try:
+            self.conn.send_bytes(pickle.dumps(list(modules)))
+        except (EOFError, OSError, BrokenPipeError):
+            self.tainted = True
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def stop(self, timeout=1):
+        try:
+            self.conn.send_bytes(b'')
+        except (EOFError, OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+class WorkerPool:
+    """常驻工作进程池
+    进程启动后保持运行, 通过管道接收序列化的任务函数(TaskPod.run_task)并执行, 避免每次运行任务树都创建进程和重新导入任务模块.
+    已执行任务的任务类模块会加入预导入列表: 空闲进程在等待时导入, 新建进程启动时导入.
+    spawn/forkserver 模式下进程创建开销较大(数百毫秒), 使用进程池可将任务启动时间降低到毫秒级;
+    fork 模式下创建的 mp 同步对象不能发送给已启动的进程, 不支持使用进程池.
+    """
+    DEFAULT_SIZE = None
+
+    def __init__(self, size:int=None, preload:list=None) -> None:
+        """构造函数
+
+        Keyword Arguments:
+            size {int} -- 保留的空闲进程数量, 并发任务超过该数量时临时创建进程, 任务结束后多余进程退出 (default: {AUTO_WORKER_POOL_SIZE 环境变量或cpu数量})
+            preload {list} -- 进程启动时预先导入的模块 (default: {AUTO_WORKER_POOL_PRELOAD 环境变量, 逗号分隔})
+        """
+        if size is None:
+            size = safe_parse_int(AppEnv.get('AUTO_WORKER_POOL_SIZE', self.DEFAULT_SIZE)) or mp.cpu_count()
+        if preload is None:
+            preload = [m.strip() for m in (AppEnv.get('AUTO_WORKER_POOL_PRELOAD') or '').split(',') if m.strip()]
+        self.size = max(int(size), 1)
+        self.preload = list(preload)
+        self._preload_set = set(self.preload)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._owner_pid = os.getpid()
+        self._closed = False
+
+    @staticmethod
+    def is_supported():
+        return sys.platform != 'win32' and mp.get_start_method() != 'fork'
+
+    def start(self):
+        """预先启动 size 个进程
+        """
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(_PoolProcess(self.preload))
+        return self
+
+    def add_preload(self, modules:list):
+        """增加预先导入的模块, 空闲进程立即导入
+        """
+        with self._lock:
+            modules = [m for m in modules if m not in self._preload_set]
+            if not modules:
+                return
+            self._preload_set.update(modules)
+            self.preload.extend(modules)
+            for proc in self._idle:
+                proc.preload(modules)
+        logger.debug('WorkerPool preload %s', modules)
+
+    def acquire(self) -> _PoolProcess:
+        with self._lock:
+            while self._idle:
+                proc = self._idle.pop()
+                if proc.is_alive():
+                    return proc
+                proc.stop()
+        return _PoolProcess(self.preload)
+
+    def release(self, proc:_PoolProcess):
+        with self._lock:
+            if not proc.tainted and not self._closed and proc.is_alive() and len(self._idle) < self.size:
+                self._idle.append(proc)
+                return
+        proc.stop()
+
+    def close(self):
+        if self._owner_pid != os.getpid():
+            return
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for proc in idle:
+            proc.stop()
+        logger.debug('WorkerPool closed, %d processes stopped', len(idle))
+
+
+_worker_pool:WorkerPool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WorkerPool:
+    """当前进程的工作进程池(单例), 首次调用时创建并预启动进程
+    """
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None or _worker_pool._closed or _worker_pool._owner_pid != os.getpid():
+            _worker_pool = WorkerPool().start()
+            atexit.register(_worker_pool.close)
+        return _worker_pool
+
+
+class PoolWorker(BaseWorker):
+    """使用常驻工作进程池执行任务, 接口与 ProcessWorker 一致
+    """
+    def __init__(self, target, args=(), kwargs=None, name=None) -> None:
+        BaseWorker.__init__(self, target, args=args, kwargs=kwargs, name=name)
+        self._pool = None
+        self._proc:_PoolProcess = None
+        self._exitcode = None
+
+    def start(self):
+        data = _dumps_job((self._func, self._func_args, self._func_kwargs))
+        self._pool = get_worker_pool()
+        self._proc = self._pool.acquire()
+        self._pool.add_preload(_job_modules(self._func))
+        self._proc.conn.send_bytes(data)
+
+    def __check_done(self, timeout=0):
+        proc = self._proc
+        if proc is None or self._exitcode is not None:
+            return True
+        try:
+            if not proc.conn.poll(timeout):
+                if proc.is_alive():
+                    return False
+                # 进程异常退出
+                proc.tainted = True
+                self._exitcode = proc.process.exitcode
+            else:
+                self._exitcode = proc.conn.recv()
+        except (EOFError, OSError):
+            proc.tainted = True
+            self._exitcode = proc.process.exitcode if proc.process.exitcode is not None else 1
+        self._pool.release(proc)
+        return True
+
+    def join(self, timeout=None):
+        self.__check_done(timeout)
+
+    def is_alive(self):
+        return not self.__check_done()
+
+    @property
+    def ident(self):
+        return self._proc.pid if self._proc else None
+
+    @property
+    def exitcode(self):
+        return self._exitcode
+
+    def safeStop(self):
+        pass
+
+    def forceStop(self):
+        if self.is_alive():
+            self._proc.tainted = True
+            os.kill(self._proc.pid, signal.SIGINT)
@@ -1,4 +1,8 @@
 from typing import Type
+import multiprocessing as mp
+
+
+_warned_pool_unsupported = False
 
 class BaseWorker:
     def __init__(self, target, args=(), kwargs=None, name=None) -> None:
@@ -44,6 +48,18 @@ def worker_cls_builder(mode=None) -> Type[BaseWorker]:
     if mode == 'thread':
         from .ThreadWorker import ThreadWorker
         return ThreadWorker
+    elif mode == 'pool':
+        from .PoolWorker import PoolWorker, WorkerPool
+        if WorkerPool.is_supported():
+            return PoolWorker
+        global _warned_pool_unsupported
+        if not _warned_pool_unsupported:
+            _warned_pool_unsupported = True
+            from smart.auto.__logger import logger
+            logger.warning("worker_mode 'pool' is not supported with start method %s, use 'process' instead; "
+                "set multiprocessing start method to spawn or forkserver to enable the worker pool", mp.get_start_method())
+        from .ProcessWorker import ProcessWorker
+        return ProcessWorker
     else:
         from .ProcessWorker import ProcessWorker
         return ProcessWorker
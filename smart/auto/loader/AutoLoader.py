@@ -1,10 +1,13 @@
-import os, inspect
+import os, sys, inspect
+from importlib.util import find_spec
 
-from smart.utils import tuple_fixed_len, dyn_import
+from smart.utils import tuple_fixed_len, dyn_import, AppEnv
 from smart.utils.loader import search_by_dotted_pattern
+from smart.utils.startup_profile import StartupProfile
 
 from smart.auto.loader.meta import TaskMethodsGroupMeta
 from smart.auto.loader.manage import AutoLoadManage
+from smart.auto.loader.manifest import AutoLoadManifest
 
 from smart.auto.__logger import logger_loader as logger
 
@@ -16,10 +19,54 @@ def module_dir(module):
         return module.__path__._path[0]
 
 
+def find_module_dir(module_name):
+    """查找包目录, 顶层包可不导入直接获取目录"""
+    try:
+        spec = find_spec(module_name)
+    except (ImportError, ValueError):
+        spec = None
+
+    locations = spec.submodule_search_locations if spec else None
+
+    if locations:
+        return list(locations)[0]
+
+    module = dyn_import(module_name)
+
+    if not inspect.ismodule(module): 
+        return None
+
+    return module_dir(module)
+
+
 class AutoLoader(object):
+    # 是否使用任务清单延迟导入任务模块, None: 由环境变量 AUTO_LOADER_LAZY 决定, 缺省启用
+    Opt_Lazy = None
+    # 任务清单目录, None: 由环境变量 AUTO_LOADER_MANIFEST_DIR 决定, 缺省为 ~/.cache/smart_auto/loader
+    Opt_Manifest_Dir = None
+
     def __init__(self):
         self.module_pathes = {}
+        # 模块文件: {module_path: file_path}
+        self.module_files = {}
+        # 模块搜索目录
+        self.search_dirs = set()
+        # 由任务清单载入的模块: {module_path: [task_record]}
+        self.__lazy_modules = {}
+        # 已导入且需更新清单的模块: {module_path: AutoLoadManifest}
+        self.__to_update = {}
     
+    @classmethod
+    def lazy_enabled(cls) -> bool:
+        if cls.Opt_Lazy is not None:
+            return bool(cls.Opt_Lazy)
+        return str(AppEnv.get('AUTO_LOADER_LAZY', '1')).lower() not in ('0', 'false', 'no', 'off')
+
+    @classmethod
+    def manifest_dir(cls):
+        return cls.Opt_Manifest_Dir or AppEnv.get('AUTO_LOADER_MANIFEST_DIR') \
+            or os.path.join('~', '.cache', 'smart_auto', 'loader')
+
     def __format_load_opts(self, opts):
         if opts is None:
             return {}
@@ -27,31 +74,90 @@ class AutoLoader(object):
         return opts
 
     def load(self, dotted_pattern, opts=None):
+        """载入任务模块; 启用延迟导入时, 任务清单未失效的模块不导入, 由清单提供任务元数据
+
+        Arguments:
+            dotted_pattern {str} -- 模块路径, 支持通配符
+        
+        Keyword Arguments:
+            opts {dict} -- 载入配置: as_module, alias_module (default: {None})
+        """
         module_name, dotted_path = tuple_fixed_len(dotted_pattern.split('.', 1), 2)
-        module = dyn_import(module_name)
+        root_dir = find_module_dir(module_name)
 
-        if not inspect.ismodule(module): 
+        if not root_dir:
             return
 
-        root_dir = module_dir(module)
+        self.search_dirs.add(root_dir)
+        manifest = AutoLoadManifest.get_manifest(root_dir, self.manifest_dir()) if self.lazy_enabled() else None
 
         for found_path in search_by_dotted_pattern(root_dir=root_dir, pattern=dotted_path, ignore_name_prefixes = ['__']):
             found_module_path = module_name + '.' + found_path
+            self.module_pathes[found_module_path] = self.__format_load_opts(opts)
+            self.module_files[found_module_path] = os.path.join(root_dir, *found_path.split('.')) + '.py'
+
+            if manifest is not None and found_module_path not in sys.modules:
+                task_records = manifest.get(found_module_path)
+
+                if task_records is not None:
+                    logger.debug('AutoLoader lazy load module %s', found_module_path)
+                    self.__lazy_modules[found_module_path] = task_records
+                    continue
 
             logger.debug('AutoLoader load module %s', found_module_path)
 
             dyn_import(found_module_path)
-            self.module_pathes[found_module_path] = self.__format_load_opts(opts)
+
+            if manifest is not None:
+                self.__to_update[found_module_path] = manifest
     
+    def __update_manifest(self, task_group_list):
+        # 将导入模块的任务元数据写入清单
+        module_records = {module_path: [] for module_path in self.__to_update}
+
+        for task_methods in task_group_list:
+            mod_path = task_methods.task_meta.mod_path
+            if mod_path in module_records:
+                module_records[mod_path].append(AutoLoadManifest.to_record(task_methods))
+
+        manifests = {}
+        for module_path, manifest in self.__to_update.items():
+            manifest.update(module_path, self.module_files[module_path], module_records[module_path])
+            manifests[id(manifest)] = manifest
+
+        for manifest in manifests.values():
+            manifest.save()
+
+        self.__to_update = {}
+
     def group_task_methods(self):
         """获取任务函数(按task_path分组)
         
         Yields:
             tuple -- task_methods:TaskMethodsGroupMeta, load_opts:dict{rename}
         """
-        for task_methods in AutoLoadManage.group_task_methods():
+        with StartupProfile.phase('loader'):
+            task_group_list = list(AutoLoadManage.group_task_methods())
+
+            if self.__to_update:
+                self.__update_manifest(task_group_list)
+
+        for task_methods in task_group_list:
             load_opts = self.module_pathes.get(task_methods.task_meta.mod_path)
             if load_opts is None:
                 continue
             
-            yield task_methods, load_opts
\ No newline at end of file
+            yield task_methods, load_opts
+
+        for module_path, task_records in self.__lazy_modules.items():
+            if module_path in sys.modules:
+                # 模块已被其他代码导入, 任务元数据已在AutoLoadManage中
+                continue
+
+            for task_record in task_records:
+                task_methods = AutoLoadManifest.from_record(task_record)
+                load_opts = self.module_pathes.get(task_methods.task_meta.mod_path)
+                if load_opts is None:
+                    continue
+
+                yield task_methods, load_opts
@@ -0,0 +1,168 @@
+import os, pickle, hashlib, threading
+
+from smart.auto.loader.meta import MethodMeta, TaskMeta, TaskMethodsGroupMeta, ArgMethodMeta
+
+from smart.auto.__logger import logger_loader as logger
+
+
+class AutoLoadManifest:
+    """任务清单: 记录任务模块中 AutoLoad 装饰器注册的任务元数据, 用于延迟导入任务模块
+
+    清单按搜索根目录存储, 每个模块记录模块文件及上级包__init__.py文件的mtime, 文件变化时清单失效, 需重新导入模块
+    """
+    # 清单文件格式版本
+    Version = 1
+
+    __manifests = {}
+    __lock = threading.Lock()
+
+    def __init__(self, root_dir:str, manifest_dir:str) -> None:
+        self.root_dir = root_dir
+        name = hashlib.sha1(root_dir.encode('utf8')).hexdigest()
+        self.manifest_file = os.path.join(os.path.expanduser(manifest_dir), name + '.pkl')
+        self.modules = {}
+        self.dirty = False
+        self.__load()
+
+    @classmethod
+    def get_manifest(cls, root_dir:str, manifest_dir:str) -> 'AutoLoadManifest':
+        """获取根目录的任务清单(进程内单例)"""
+        key = (root_dir, manifest_dir)
+        with cls.__lock:
+            manifest = cls.__manifests.get(key)
+            if manifest is None:
+                manifest = cls.__manifests[key] = AutoLoadManifest(root_dir, manifest_dir)
+        return manifest
+
+    @staticmethod
+    def file_stat(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def module_files(self, module_file:str) -> list:
+        """模块文件及上级包(直至根目录)的__init__.py文件"""
+        files = [module_file]
+        dir_path = os.path.dirname(module_file)
+        while True:
+            files.append(os.path.join(dir_path, '__init__.py'))
+            if len(dir_path) <= len(self.root_dir) or not dir_path.startswith(self.root_dir):
+                break
+            dir_path = os.path.dirname(dir_path)
+        return files
+
+    def get(self, module_path:str):
+        """读取模块的任务记录, 清单不存在或已失效返回None
+
+        Returns:
+            list: [task_record]
+        """
+        module_info = self.modules.get(module_path)
+        if not module_info:
+            return None
+        for file_path, file_stat in module_info['files'].items():
+            if self.file_stat(file_path) != file_stat:
+                return None
+        return module_info['tasks']
+
+    def update(self, module_path:str, module_file:str, tasks:list):
+        self.modules[module_path] = {
+            'files': {f: self.file_stat(f) for f in self.module_files(module_file)},
+            'tasks': tasks
+        }
+        self.dirty = True
+
+    def __load(self):
+        if not os.path.isfile(self.manifest_file):
+            return
+        try:
+            with open(self.manifest_file, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.warning('AutoLoadManifest load %s error: %s', self.manifest_file, e)
+            return
+        if isinstance(data, dict) and data.get('version') == self.Version and data.get('root_dir') == self.root_dir:
+            self.modules = data.get('modules') or {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_file = '{}.{}.tmp'.format(self.manifest_file, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump({'version': self.Version, 'root_dir': self.root_dir, 'modules': self.modules}, f)
+            os.replace(tmp_file, self.manifest_file)
+            self.dirty = False
+        except Exception as e:
+            logger.warning('AutoLoadManifest save %s error: %s', self.manifest_file, e)
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    @staticmethod
+    def __method_record(meta:MethodMeta) -> dict:
+        return {
+            'mod_path': meta.mod_path,
+            'cls_name': meta.cls_name,
+            'func_name': meta.func_name,
+            'func_config': meta.func_config,
+            'hook_type': meta.hook_type
+        }
+
+    @staticmethod
+    def to_record(group_meta:TaskMethodsGroupMeta) -> dict:
+        """TaskMethodsGroupMeta => task_record(可pickle的dict, 不含任务类对象)"""
+        task_meta = group_meta.task_meta
+        return {
+            'mod_path': task_meta.mod_path,
+            'cls_name': task_meta.cls_name,
+            'task_name': task_meta.task_name,
+            'task_type': task_meta.task_type,
+            'task_alias': task_meta.task_alias,
+            'package_ns': group_meta.package_ns,
+            'task_methods': [
+                AutoLoadManifest.__method_record(method_meta)
+                for method_meta in group_meta.task_methods or []
+            ],
+            'bind_objs': [
+                {
+                    'method': AutoLoadManifest.__method_record(arg_meta.method_meta),
+                    'arg_config': arg_meta.arg_config,
+                    'arg_name': arg_meta.arg_name,
+                    'arg_path': arg_meta.arg_path
+                }
+                for arg_meta in group_meta.bind_objs or []
+            ]
+        }
+
+    @staticmethod
+    def from_record(record:dict) -> TaskMethodsGroupMeta:
+        """task_record => TaskMethodsGroupMeta, task_cls为空, 任务类以路径写入auto yml, 运行时再导入"""
+        task_meta = TaskMeta(
+            mod_path = record['mod_path'],
+            cls_name = record['cls_name'],
+            task_name = record['task_name'],
+            task_type = record['task_type'],
+            task_alias = record['task_alias']
+        )
+        task_methods = [
+            MethodMeta(**method)
+            for method in record['task_methods']
+        ]
+        bind_objs = [
+            ArgMethodMeta(
+                method_meta = MethodMeta(**bind_obj['method']),
+                arg_config = bind_obj['arg_config'],
+                arg_name = bind_obj['arg_name'],
+                arg_path = bind_obj['arg_path']
+            )
+            for bind_obj in record['bind_objs']
+        ]
+        return TaskMethodsGroupMeta(
+            task_meta = task_meta,
+            task_methods = task_methods or None,
+            bind_objs = bind_objs or None,
+            package_ns = record['package_ns']
+        )
@@ -125,14 +125,42 @@ class TreeTaskRunOpts(Enum):
     # opt_key = (key_name, )
 
     # 并发执行数量; Default: None, 表示不启动独立工作进程, 即任务先后串联执行
+    # auto: 根据输入管道积压数据量在 worker_min 和 worker_max 之间自动扩缩容
     worker_num = ('worker_num', )
 
-    # 并发执行模式; Enum: process, thread; Default: process
+    # worker_num=auto 时的最少工作进程数; Default: 1
+    worker_min = ('worker_min', )
+
+    # worker_num=auto 时的最多工作进程数; Default: cpu数量
+    worker_max = ('worker_max', )
+
+    # 并发执行模式; Enum: process, thread, pool; Default: process
+    # pool: 常驻工作进程池(spawn/forkserver模式), 进程在多次运行任务树之间复用
     worker_mode = ('worker_mode', )
 
     # 数据管道最大hold数据量; default 0, 表示不限制
     max_queue_size = ('max_queue_size', )
 
+    # 数据管道类型, 可选: auto, thread, queue, shm; default: auto
+    # auto: 任务树无工作进程(worker_mode均为thread或未设置worker_num)时为thread, 否则为queue
+    # thread: 进程内队列(queue.SimpleQueue); queue: multiprocessing.Queue
+    # shm: 共享内存环形缓冲区, 无 feeder 线程和管道系统调用, 适合数据量大的多进程任务树
+    pip_type = ('pip_type', )
+
+    # pip_type=shm 时共享内存环形缓冲区的字节数; default 4MB, 单条数据序列化后不能超过该值
+    pip_shm_size = ('pip_shm_size', )
+
+    # 有多个跨进程的下游管道时, 数据是否只序列化一次; default None, 表示仅对 shm 管道(直接写入序列化数据)只序列化一次
+    # True: 所有跨进程管道都只序列化一次(mp.Queue 管道需再次序列化包装对象, 吞吐可能下降); False: 关闭
+    pip_serialize_once = ('pip_serialize_once', )
+
+    # 数据管道批量发送的数据条数; default None, 表示逐条发送
+    # 启用后 max_queue_size 按批次折算, 即管道最多hold max_queue_size/pip_batch_size 个批次
+    pip_batch_size = ('pip_batch_size', )
+
+    # 数据管道批量发送时, 数据在发送缓冲区的最长停留时间(秒); default 0.1; 0表示仅在缓冲区满或任务结束时发送
+    pip_batch_linger = ('pip_batch_linger', )
+
     # 任务单元执行结束后是否发送结束命令到下游任务; default True
     send_end_cmd = ('send_end_cmd', )
 
@@ -14,7 +14,7 @@ kwargs节点支持syntax: ref, extend
 tree节点支持: flow, sibling
 tree.task节点支持: template, if, extend
 """
-import os, inspect, re
+import os, inspect, re, pickle, hashlib, threading
 from collections import OrderedDict
 
 from smart.utils import \
@@ -28,6 +28,7 @@ from smart.utils import \
 
 from smart.utils.number import safe_parse_int
 from smart.utils.cast import cast_val
+from smart.utils.startup_profile import StartupProfile
 from smart.utils.dag import DagItemsTool
 from smart.utils.dot_path import DotPath
     
@@ -55,6 +56,8 @@ class AutoYmlParser:
         self.loader = AutoLoader()
 
         self.path_ctx = PathContext(file_path=yml_file, dot_path=yml_path)
+        # 模版与__if__语法读取的环境变量
+        self.env = AppEnv
 
         self.__imported_dict = set()
 
@@ -111,7 +114,7 @@ class AutoYmlParser:
 
         if i_files:
             for i_file in list_safe_iter(i_files):
-                i_file = template_str_eval(i_file, mapping=AppEnv, ns_mapping={
+                i_file = template_str_eval(i_file, mapping=self.env, ns_mapping={
                     'config': configs
                 }, expanduser=True)
 
@@ -138,6 +141,15 @@ class AutoYmlParser:
             self.hook_m.triger_once('before_parse')
             self.parse_load_node(auto_obj.get('tasks'), path_ctx=path_ctx)
 
+    def source_files(self) -> set:
+        """解析过程读取的文件: yml文件, __load__加载的模块文件及其搜索目录"""
+        files = set(self.__imported_dict)
+        for module_file in self.loader.module_files.values():
+            files.add(module_file)
+            files.add(os.path.dirname(module_file))
+        files.update(self.loader.search_dirs)
+        return files
+
     def import_yml_file(self, file, path_ctx:PathContext=None):
         """ 加载新的yml文件 """
         logger_trace.debug('AutoYmlParser.import_yml_file %s, ctx_dot_path=%s', 
@@ -177,7 +189,8 @@ class AutoYmlParser:
                         resolved_dotted_path, dotted_path, ctx_dotted_path)
                 continue
 
-            self.loader.load(resolved_dotted_path, opts=load_opts)
+            with StartupProfile.phase('loader'):
+                self.loader.load(resolved_dotted_path, opts=load_opts)
 
     def __loader_cast_method_meta(self, method_meta:MethodMeta):
         if not method_meta: 
@@ -374,7 +387,7 @@ class AutoYmlParser:
                 cast_fn = str
                 env_key = env_exp.strip()
 
-            opt_key = cast_fn(AppEnv.get(env_key))
+            opt_key = cast_fn(self.env.get(env_key))
 
             opts = {
                 cast_fn(k): v
@@ -411,7 +424,7 @@ class AutoYmlParser:
         for key, templ in template_dict.items():
             val = template_str_eval(
                 templ, 
-                mapping=AppEnv, 
+                mapping=self.env, 
                 ns_mapping={
                     'config': configs
                 }, 
@@ -624,7 +637,7 @@ class AutoYmlParser:
             run_obj = {}
         
         for opt_name in ('worker_num', ):
-            if opt_name in run_obj:
+            if opt_name in run_obj and run_obj.get(opt_name) != 'auto':
                 run_obj[opt_name] = safe_parse_int(run_obj.get(opt_name))
 
         if 'join' in run_obj:
@@ -761,6 +774,164 @@ class AutoYmlParser:
             bind_arg_node.update(arg_dict)
             
 
+class AutoYmlEnvRecorder:
+    """记录解析过程读取的环境变量, 作为解析缓存的校验条件"""
+    def __init__(self, env=AppEnv):
+        self.env = env
+        self.used = {}
+
+    def get(self, key, defaultVal=None):
+        val = self.used[key] = self.env.get(key)
+        return val if val is not None else defaultVal
+
+    def __contains__(self, key):
+        self.used[key] = self.env.get(key)
+        return key in self.env
+
+    def __getitem__(self, key):
+        val = self.env[key]
+        self.used[key] = self.env.get(key)
+        return val
+
+
+class AutoYmlCache:
+    """auto yml 解析结果缓存(不含bind_arg)
+
+    按yml文件路径存储, 每个条目记录解析过程读取的文件(yml, import文件, __load__加载的模块)的mtime和读取的环境变量, 
+    全部未变化时直接返回解析结果的副本; 使用hooks的yml不缓存
+    """
+    # 是否启用缓存, None: 由环境变量 AUTO_YML_CACHE 决定, 缺省启用
+    Opt_Enable = None
+    # 磁盘缓存目录(pickle文件), None: 由环境变量 AUTO_YML_CACHE_DIR 决定, 未设置时只使用内存缓存
+    Opt_Cache_Dir = None
+    # 每个yml文件最多缓存的条目数(环境变量不同时各存一个条目)
+    Opt_Max_Entries = 8
+    # 缓存文件格式版本
+    Version = 1
+
+    __entries = {}
+    __lock = threading.Lock()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        if cls.Opt_Enable is not None:
+            return bool(cls.Opt_Enable)
+        return str(AppEnv.get('AUTO_YML_CACHE', '1')).lower() not in ('0', 'false', 'no', 'off')
+
+    @classmethod
+    def cache_dir(cls):
+        return cls.Opt_Cache_Dir or AppEnv.get('AUTO_YML_CACHE_DIR')
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__entries = {}
+
+    @staticmethod
+    def __file_stat(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    def __is_fresh(cls, entry) -> bool:
+        for file_path, file_stat in entry['files'].items():
+            if cls.__file_stat(file_path) != file_stat:
+                return False
+        return True
+
+    @classmethod
+    def __is_valid(cls, entry) -> bool:
+        if not cls.__is_fresh(entry):
+            return False
+        for key, val in entry['env'].items():
+            if AppEnv.get(key) != val:
+                return False
+        return True
+
+    @classmethod
+    def __disk_file(cls, file_path):
+        cache_dir = cls.cache_dir()
+        if not cache_dir:
+            return None
+        name = hashlib.sha1(file_path.encode('utf8')).hexdigest()
+        return os.path.join(os.path.expanduser(cache_dir), name + '.pkl')
+
+    @classmethod
+    def __load_disk(cls, file_path) -> list:
+        disk_file = cls.__disk_file(file_path)
+        if not disk_file or not os.path.isfile(disk_file):
+            return []
+        try:
+            with open(disk_file, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.warning('AutoYmlCache load %s error: %s', disk_file, e)
+            return []
+        if not isinstance(data, dict) or data.get('version') != cls.Version or data.get('file') != file_path:
+            return []
+        return data.get('entries') or []
+
+    @classmethod
+    def __save_disk(cls, file_path, entries:list):
+        disk_file = cls.__disk_file(file_path)
+        if not disk_file:
+            return
+        tmp_file = '{}.{}.tmp'.format(disk_file, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(disk_file), exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump({'version': cls.Version, 'file': file_path, 'entries': entries}, f)
+            os.replace(tmp_file, disk_file)
+        except Exception as e:
+            logger.warning('AutoYmlCache save %s error: %s', disk_file, e)
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    @classmethod
+    def get(cls, file_path):
+        """读取缓存的解析结果
+
+        Returns:
+            dict: auto_obj副本, 未命中返回None
+        """
+        with cls.__lock:
+            entries = cls.__entries.get(file_path)
+        if entries is None:
+            entries = cls.__load_disk(file_path)
+            with cls.__lock:
+                cls.__entries[file_path] = entries
+        for entry in entries:
+            if cls.__is_valid(entry):
+                return pickle.loads(entry['data'])
+        return None
+
+    @classmethod
+    def put(cls, file_path, files, env:dict, auto_obj:dict):
+        try:
+            data = pickle.dumps(auto_obj, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug('AutoYmlCache can not pickle %s: %s', file_path, e)
+            return
+
+        entry = {
+            'files': {f: cls.__file_stat(f) for f in files},
+            'env': dict(env),
+            'data': data
+        }
+        with cls.__lock:
+            entries = [
+                _entry
+                for _entry in cls.__entries.get(file_path) or []
+                if _entry['env'] != entry['env'] and cls.__is_fresh(_entry)
+            ]
+            entries = [entry, *entries][:max(cls.Opt_Max_Entries, 1)]
+            cls.__entries[file_path] = entries
+        cls.__save_disk(file_path, entries)
+
+
 def create_auto_yml_parser_by_file(file, resolve_env=True) -> AutoYmlParser:
     file = env_eval_str(file) if resolve_env else file
 
@@ -778,7 +949,25 @@ def create_auto_yml_parser_by_module_path(module_path) -> AutoYmlParser:
     
     dot_path = DotPath.create(module_path, '.yml')
 
+    file_path = dot_path.file_path
+
+    if not file_path or not AutoYmlCache.enabled():
+        parser = AutoYmlParser.load_yml_path(dot_path)
+        parser.parse_all_syntax()
+        return parser
+
+    auto_obj = AutoYmlCache.get(file_path)
+
+    if auto_obj is not None:
+        logger.debug('create_auto_yml_parser_by_module_path hit cache %s', file_path)
+        return AutoYmlParser(auto_obj, yml_file=file_path, yml_path=dot_path)
+
     parser = AutoYmlParser.load_yml_path(dot_path)
+    env_recorder = parser.env = AutoYmlEnvRecorder(parser.env)
     parser.parse_all_syntax()
+    parser.env = env_recorder.env
+
+    if not parser.hook_m.hooks:
+        AutoYmlCache.put(file_path, parser.source_files(), env_recorder.used, parser.auto_obj)
 
     return parser
\ No newline at end of file
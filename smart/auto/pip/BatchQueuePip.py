@@ -0,0 +1,129 @@
+import os, time, threading
+from queue import Queue
+
+from smart.auto.pip.QueuePip import QueuePip, ItemBatch
+from smart.auto.pip.cmd import Command
+from smart.auto.ctx.task_metrics import metrics_local
+
+from ..__logger import logger
+
+
+class BatchQueuePip(QueuePip):
+    """批量队列管道
+    send 将数据按 batch_size 条或 linger 秒合并为 ItemBatch 后写入队列, 减少 mp.Queue 的序列化和管道写入次数;
+    recv 沿用 QueuePip.recv, 自动拆包
+    Command 发送前会先发送缓冲区数据, 保证命令与数据的先后顺序
+    """
+    DEFAULT_LINGER = 0.1
+
+    def __init__(self, queue:Queue=None, on_end:callable=None, batch_size:int=100, linger:float=None):
+        """构造函数
+
+        Keyword Arguments:
+            queue {Queue} -- 队列 (default: {None})
+            on_end {callable} -- 收到结束命令的回调 (default: {None})
+            batch_size {int} -- 每批次最大数据条数 (default: {100})
+            linger {float} -- 缓冲数据最长停留时间(秒), 0表示仅在缓冲满或发送命令时发送; None为 DEFAULT_LINGER (default: {None})
+        """
+        QueuePip.__init__(self, queue=queue, on_end=on_end)
+        self.batch_size = max(int(batch_size or 1), 1)
+        self.linger = self.DEFAULT_LINGER if linger is None else float(linger)
+        self.__reset_local()
+
+    def __reset_local(self):
+        # 缓冲区和线程仅属于发送方进程, fork/spawn 后需重建
+        self._owner_pid = os.getpid()
+        self._buffer = []
+        self._buffer_ts = None
+        self._cond = threading.Condition()
+        self._linger_thread = None
+
+    def __check_local(self):
+        if self._owner_pid != os.getpid():
+            self.__reset_local()
+
+    def _put_buffer(self, block=True, timeout=None):
+        """发送缓冲区数据, 调用方需持有 self._cond
+        """
+        if not self._buffer:
+            return
+        batch = ItemBatch(self._buffer)
+        self._buffer = []
+        self._buffer_ts = None
+        metrics = metrics_local.recorder
+        if metrics is None:
+            self.queue.put(batch, block=block, timeout=timeout)
+        else:
+            ts = time.perf_counter_ns()
+            self.queue.put(batch, block=block, timeout=timeout)
+            metrics.on_put(time.perf_counter_ns() - ts)
+
+    def _linger_loop(self):
+        cond = self._cond
+        with cond:
+            while True:
+                if not self._buffer:
+                    cond.wait()
+                    continue
+                rest_time = self._buffer_ts + self.linger - time.monotonic()
+                if rest_time > 0:
+                    cond.wait(rest_time)
+                else:
+                    try:
+                        self._put_buffer()
+                    except Exception as e:
+                        logger.warning('BatchQueuePip linger flush error: %s', e)
+
+    def __start_linger_thread(self):
+        if self.linger <= 0 or self._linger_thread is not None:
+            return
+        self._linger_thread = threading.Thread(
+            target=self._linger_loop,
+            name='BatchQueuePip-linger',
+            daemon=True)
+        self._linger_thread.start()
+
+    def send(self, data, block=True, timeout=None, **kwargs):
+        self.__check_local()
+
+        with self._cond:
+            if isinstance(data, Command):
+                self._put_buffer(block=block, timeout=timeout)
+                self.queue.put(data, block=block, timeout=timeout)
+                return
+
+            self._buffer.append(data)
+
+            if len(self._buffer) >= self.batch_size:
+                self._put_buffer(block=block, timeout=timeout)
+            elif self._buffer_ts is None:
+                self._buffer_ts = time.monotonic()
+                self.__start_linger_thread()
+                self._cond.notify()
+
+    def flush(self, block=True, timeout=None, **kwargs):
+        self.__check_local()
+
+        with self._cond:
+            self._put_buffer(block=block, timeout=timeout)
+
+    def qsize(self):
+        """队列中的数据条数(近似值), 按每批次 batch_size 条估算
+        """
+        return QueuePip.qsize(self) * self.batch_size
+
+    def __getstate__(self):
+        """spawn 模式的多进程会使用 pickle 序列化本实例, 缓冲区与线程对象需排除
+        """
+        _dict = self.__dict__.copy()
+        _dict.update(
+            _owner_pid=None,
+            _buffer=[],
+            _buffer_ts=None,
+            _cond=None,
+            _linger_thread=None,
+        )
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
@@ -1,5 +1,10 @@
+import pickle
+
 from ..base import BasePip
-from .QueuePip import QueuePip
+from .QueuePip import QueuePip, PickledItem
+from .cmd import Command
+from ..ctx.task_metrics import metrics_local
+from smart.utils.startup_profile import StartupProfile
 
 from ..__logger import logger
 
@@ -8,26 +13,76 @@ class Broadcast(BasePip):
     """1对多的广播管道
     """
     DEBUG_MODE = False
+    # 多个跨进程管道时, 数据只序列化一次; None 表示仅对可直接写入序列化数据的管道(如 ShmRingPip)启用,
+    # mp.Queue 管道需额外包装 PickledItem 并在接收方再次反序列化, 开启后吞吐反而下降
+    SERIALIZE_ONCE = None
     default_pip_fn = lambda *args:QueuePip()
 
-    def __init__(self, pip_fn:callable=None):
+    def __init__(self, pip_fn:callable=None, serialize_once:bool=None):
         """构造函数
 
         Keyword Arguments:
             pip_fn {callable} -- 缺省值None将自动替换为lambda:QueuePip() (default: {None})
+            serialize_once {bool} -- 是否对多个跨进程管道只序列化一次数据, None表示使用 SERIALIZE_ONCE;
+                SERIALIZE_ONCE 也为None时, 仅对支持写入序列化数据(put_frame)的管道只序列化一次 (default: {None})
         """
         self.pip_fn = pip_fn if pip_fn else self.default_pip_fn
         self.pips = []
+        self.serialize_once = self.SERIALIZE_ONCE if serialize_once is None else serialize_once
+        self._num_cross_pip = 0
+        self._num_frame_pip = 0
         self.pip_debug = self.create_pip() if self.DEBUG_MODE else None
 
     def create_pip(self):
         new_pip = self.pip_fn()
         self.pips.append(new_pip)
+        if getattr(new_pip, 'cross_process', False):
+            self._num_cross_pip += 1
+            if self._is_frame_pip(new_pip):
+                self._num_frame_pip += 1
         return new_pip
 
+    @staticmethod
+    def _is_frame_pip(pip):
+        return getattr(getattr(pip, 'queue', None), 'put_frame', None) is not None
+
+    def _pickle_item(self, data):
+        try:
+            return PickledItem.dumps(data)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.debug('Broadcast serialize once fail: %s', e)
+            return None
+
     def send(self, data, *args, **kwargs):
+        is_cmd = isinstance(data, Command)
+        if not is_cmd:
+            metrics = metrics_local.recorder
+            if metrics is not None:
+                metrics.on_send()
+            if StartupProfile.wait_first_item:
+                StartupProfile.mark_first_item()
+
+        pickled_item = None
+        if self.serialize_once is None:
+            # 仅对可直接写入序列化数据的管道只序列化一次
+            if self._num_frame_pip > 1 and not is_cmd:
+                pickled_item = self._pickle_item(data)
+            is_pickled_pip = self._is_frame_pip
+        else:
+            if self.serialize_once and self._num_cross_pip > 1 and not is_cmd:
+                pickled_item = self._pickle_item(data)
+            is_pickled_pip = lambda pip: getattr(pip, 'cross_process', False)
+
+        if pickled_item is None:
+            for pip in self.pips:
+                pip.send(data, *args, **kwargs)
+        else:
+            for pip in self.pips:
+                pip.send(pickled_item if is_pickled_pip(pip) else data, *args, **kwargs)
+
+    def flush(self, *args, **kwargs):
         for pip in self.pips:
-            pip.send(data, *args, **kwargs)
+            pip.flush(*args, **kwargs)
 
     def recv(self, *args, **kwargs):
         if self.DEBUG_MODE and self.pip_debug:
@@ -37,7 +92,17 @@ class Broadcast(BasePip):
             return
         logger.warning('Broadcast always recv no data')
         yield from []
-    
-    # def close(self):
-    #     for pip in self.pips:
-    #         pip.close()
\ No newline at end of file
+
+    def close(self, *args, **kwargs):
+        for pip in self.pips:
+            pip.close(*args, **kwargs)
+    def __getstate__(self):
+        """spawn 模式或工作进程池会使用 pickle 序列化本实例
+        pip_fn 绑定了任务执行器(含任务函数的返回值, 可能是生成器), 下游管道均在主进程创建, 子进程无需 pip_fn
+        """
+        _dict = self.__dict__.copy()
+        _dict.update(pip_fn=None)
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
@@ -1,12 +1,40 @@
-from queue import Queue, Empty
+from queue import Queue, SimpleQueue, Empty
+from time import perf_counter_ns
 import multiprocessing as mp
+import pickle
 
 from smart.auto.base import BasePip
 from smart.auto.pip.cmd import Command, CommandType
+from smart.auto.ctx.task_metrics import metrics_local
 
 from ..__logger import logger
 
 
+class ItemBatch(list):
+    """批量数据包, 由 BatchQueuePip 发送; QueuePip.recv 自动拆包
+    """
+    pass
+
+
+class PickledItem:
+    """已序列化的数据, 由 Broadcast 一次序列化后发送给多个跨进程管道; QueuePip.recv 自动反序列化
+    """
+    __slots__ = ('data', )
+
+    def __init__(self, data:bytes):
+        self.data = data
+
+    @staticmethod
+    def dumps(obj):
+        return PickledItem(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+    def loads(self):
+        return pickle.loads(self.data)
+
+    def __reduce__(self):
+        return (PickledItem, (self.data, ))
+
+
 class QueuePip(BasePip):
     """队列管道
     """
@@ -15,8 +43,29 @@ class QueuePip(BasePip):
         self.on_end = on_end
         self.is_ended = False
 
+    @property
+    def cross_process(self):
+        """管道数据是否跨进程传输(即发送时需要序列化)
+        """
+        return not isinstance(self.queue, (Queue, SimpleQueue))
+
     def send(self, data, block=True, timeout=None, **kwargs):
-        self.queue.put(data, block=block, timeout=timeout)
+        metrics = metrics_local.recorder
+        if metrics is not None:
+            ts = perf_counter_ns()
+
+        put_frame = None
+        if isinstance(data, PickledItem):
+            put_frame = getattr(self.queue, 'put_frame', None)
+        if put_frame:
+            # 队列直接写入已序列化的数据, 接收方反序列化得到原始数据
+            put_frame(data.data, block=block, timeout=timeout)
+        else:
+            self.queue.put(data, block=block, timeout=timeout)
+
+        if metrics is not None:
+            # 记录写入队列的阻塞时间(队列满或序列化)
+            metrics.on_put(perf_counter_ns() - ts)
 
     def recv(self, block=True, timeout=None, raise_empty=False, on_cmd:callable=None, 
                 block_fn:callable=None, timeout_fn:callable=None, 
@@ -45,13 +94,21 @@ class QueuePip(BasePip):
                 yield from []
                 return
 
+            # 任务运行指标: 队列等待时间, 每条数据的处理耗时(yield 到下一次接收的时间)
+            metrics = metrics_local.recorder
+
             while not self.is_ended:
                 _block = block if block_fn is None else block_fn()
                 _timeout = timeout if timeout_fn is None else timeout_fn()
 
                 try:
                     # logger.debug('QueuePip.recv get %s, %s', _block, _timeout)
-                    data = _queue.get(block=_block, timeout=_timeout)
+                    if metrics is None:
+                        data = _queue.get(block=_block, timeout=_timeout)
+                    else:
+                        ts = perf_counter_ns()
+                        data = _queue.get(block=_block, timeout=_timeout)
+                        metrics.on_get(perf_counter_ns() - ts)
                 except Empty as e:
                     timeout_item = None
                     if on_timeout:
@@ -69,7 +126,9 @@ class QueuePip(BasePip):
 
                     if data.type == CommandType.end:
 
-                        self.is_ended = True
+                        # 缩容命令只结束当前接收方; 线程模式下多个工作线程共享管道对象, 不能标记管道结束
+                        if not data.args.get('retire'):
+                            self.is_ended = True
                         if self.on_end:
                             self.on_end(data)
 
@@ -78,6 +137,18 @@ class QueuePip(BasePip):
 
                         if on_cmd:
                             on_cmd(**data.args)
+                elif metrics is not None:
+                    for item in (data if isinstance(data, ItemBatch) else (data, )):
+                        item = item.loads() if isinstance(item, PickledItem) else item
+                        ts = perf_counter_ns()
+                        yield item
+                        now = perf_counter_ns()
+                        metrics.on_item(now - ts, now)
+                elif isinstance(data, ItemBatch):
+                    for item in data:
+                        yield item.loads() if isinstance(item, PickledItem) else item
+                elif isinstance(data, PickledItem):
+                    yield data.loads()
                 else:
                     yield data
             # logger.debug('QueuePip.recv end')
@@ -103,6 +174,11 @@ class QueuePip(BasePip):
 
                 while True:
                     item = _queue.get(block=True, timeout=.1)
+                    if isinstance(item, ItemBatch):
+                        for sub_item in item:
+                            yield sub_item
+                            clean_counter += 1
+                        continue
                     yield item
                     clean_counter += 1
             except Empty:
@@ -116,4 +192,15 @@ class QueuePip(BasePip):
 
             return clean_counter
         else:
-            return _item_iter
\ No newline at end of file
+            return _item_iter
+
+    def qsize(self):
+        """队列中的数据条数(近似值)
+        """
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def close(self, **kwargs):
+        # 共享内存等队列需显式释放; mp.Queue 由 gc 回收
+        _release = getattr(self.queue, 'release', None)
+        if _release:
+            _release()
@@ -0,0 +1,175 @@
+import os, pickle, struct, time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from queue import Empty, Full
+
+from smart.auto.pip.QueuePip import QueuePip
+
+from ..__logger import logger
+
+
+class ShmRingQueue:
+    """基于共享内存环形缓冲区的多进程队列, 接口与 mp.Queue 的 put/get/qsize 一致
+
+    数据帧结构: frame_len(uint32) + pickle_data; 帧可跨越缓冲区末尾回绕
+    共享内存结构: head(uint64) + tail(uint64) + count(uint64) + space_waiters(uint64) + ring_data
+    与 mp.Queue 相比, 发送方在当前线程直接序列化并写入共享内存, 无 feeder 线程和管道系统调用
+    """
+    DEFAULT_SIZE = 4 * 1024 * 1024
+    _HEADER = struct.Struct('QQQQ')
+    _FRAME_LEN = struct.Struct('I')
+
+    def __init__(self, size:int=None, maxsize:int=0):
+        """构造函数
+
+        Keyword Arguments:
+            size {int} -- 环形缓冲区字节数 (default: {DEFAULT_SIZE})
+            maxsize {int} -- 最大数据条数, 0表示仅受缓冲区字节数限制 (default: {0})
+        """
+        self._size = int(size or self.DEFAULT_SIZE)
+        self._maxsize = int(maxsize or 0)
+        self._shm = shared_memory.SharedMemory(create=True, size=self._HEADER.size + self._size)
+        self._HEADER.pack_into(self._shm.buf, 0, 0, 0, 0, 0)
+        self._owner_pid = os.getpid()
+        self._lock = mp.Lock()
+        # 可读帧数量
+        self._items = mp.Semaphore(0)
+        # 读取后唤醒等待缓冲区空间的发送方
+        self._space = mp.Semaphore(0)
+
+    @property
+    def name(self):
+        return self._shm.name if self._shm else None
+
+    def _read_header(self):
+        return self._HEADER.unpack_from(self._shm.buf, 0)
+
+    def _write_header(self, head, tail, count, waiters):
+        self._HEADER.pack_into(self._shm.buf, 0, head, tail, count, waiters)
+
+    def _write_bytes(self, pos, data):
+        buf, size, offset = self._shm.buf, self._size, self._HEADER.size
+        start = pos % size
+        first_len = min(len(data), size - start)
+        buf[offset+start:offset+start+first_len] = data[:first_len]
+        if first_len < len(data):
+            buf[offset:offset+len(data)-first_len] = data[first_len:]
+
+    def _read_bytes(self, pos, length):
+        buf, size, offset = self._shm.buf, self._size, self._HEADER.size
+        start = pos % size
+        first_len = min(length, size - start)
+        data = bytes(buf[offset+start:offset+start+first_len])
+        if first_len < length:
+            data += bytes(buf[offset:offset+length-first_len])
+        return data
+
+    def put(self, obj, block=True, timeout=None):
+        self.put_frame(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL), block=block, timeout=timeout)
+
+    def put_frame(self, data:bytes, block=True, timeout=None):
+        """写入已序列化的数据, get 返回 pickle.loads(data)
+        """
+        frame = self._FRAME_LEN.pack(len(data)) + data
+        frame_len = len(frame)
+
+        if frame_len > self._size:
+            raise ValueError('ShmRingQueue frame size {} exceeds buffer size {}'.format(frame_len, self._size))
+
+        deadline = time.monotonic() + timeout if (block and timeout is not None) else None
+
+        while True:
+            with self._lock:
+                head, tail, count, waiters = self._read_header()
+                has_space = self._size - (tail - head) >= frame_len and \
+                    not (self._maxsize and count >= self._maxsize)
+
+                if has_space:
+                    self._write_bytes(tail, frame)
+                    self._write_header(head, tail + frame_len, count + 1, waiters)
+                    self._items.release()
+                    return
+                if not block:
+                    raise Full()
+                self._write_header(head, tail, count, waiters + 1)
+
+            rest_time = None if deadline is None else max(deadline - time.monotonic(), 0)
+            self._space.acquire(timeout=rest_time)
+
+            with self._lock:
+                head, tail, count, waiters = self._read_header()
+                self._write_header(head, tail, count, waiters - 1)
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise Full()
+
+    def put_nowait(self, obj):
+        return self.put(obj, block=False)
+
+    def get(self, block=True, timeout=None):
+        if not self._items.acquire(block, timeout):
+            raise Empty()
+
+        with self._lock:
+            head, tail, count, waiters = self._read_header()
+            data_len, = self._FRAME_LEN.unpack(self._read_bytes(head, self._FRAME_LEN.size))
+            data = self._read_bytes(head + self._FRAME_LEN.size, data_len)
+            self._write_header(head + self._FRAME_LEN.size + data_len, tail, count - 1, waiters)
+            if waiters > 0:
+                self._space.release()
+
+        return pickle.loads(data)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return self._read_header()[2]
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        head, tail, count, waiters = self._read_header()
+        return bool(self._maxsize and count >= self._maxsize)
+
+    def release(self):
+        """关闭共享内存映射; 创建方进程同时删除共享内存
+        """
+        shm, self._shm = self._shm, None
+        if shm is None:
+            return
+        shm.close()
+        if self._owner_pid == os.getpid():
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            logger.debug('ShmRingQueue %s unlinked', shm.name)
+
+    def __getstate__(self):
+        """spawn 模式的多进程会使用 pickle 序列化本实例, SharedMemory 按名称重新映射
+        """
+        _dict = self.__dict__.copy()
+        _dict.update(
+            _shm=None,
+            _shm_name=self.name
+        )
+        return _dict
+
+    def __setstate__(self, state):
+        shm_name = state.pop('_shm_name', None)
+        self.__dict__.update(state)
+        if shm_name:
+            try:
+                self._shm = shared_memory.SharedMemory(name=shm_name, track=False)
+            except TypeError:
+                # python < 3.13 不支持 track 参数
+                self._shm = shared_memory.SharedMemory(name=shm_name)
+
+
+class ShmRingPip(QueuePip):
+    """共享内存环形缓冲区管道, recv/Command 语义与 QueuePip 一致
+    """
+    def __init__(self, size:int=None, maxsize:int=0, on_end:callable=None):
+        QueuePip.__init__(self, queue=ShmRingQueue(size=size, maxsize=maxsize), on_end=on_end)
@@ -1,3 +1,4 @@
-from .QueuePip import QueuePip
+from .QueuePip import QueuePip, ItemBatch, PickledItem
+from .BatchQueuePip import BatchQueuePip
 from .Broadcast import Broadcast
 from .cmd import Command, CommandType, end_cmd, app_cmd
\ No newline at end of file
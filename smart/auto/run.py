@@ -4,6 +4,7 @@ from smart.utils import AppEnv, dict_deep_merge
 from smart.utils.log import auto_load_logging_config, set_default_logging_config
 from smart.utils.yaml import yaml_dumps
 from smart.utils.signal import set_default_sig_handler
+from smart.utils.startup_profile import StartupProfile
 
 from smart.auto.parser.auto_yml import create_auto_yml_parser_by_module_path
 from smart.auto.Runner import AutoRunner
@@ -19,7 +20,7 @@ OPTIONS = {
 
 
 def auto_run(module, name = None, debug_log=None, only_parse=False, rst_format='json',
-            lazy_load=True, extra=None, bind_arg=None, delay=0, mp_mode=None, **kwargs):
+            lazy_load=True, extra=None, bind_arg=None, delay=0, mp_mode=None, profile_startup=None, **kwargs):
     """自动化框架
 
     python -m smart.auto.run <module name> <tree or task> [options] --env.<env_name>=<env_value>
@@ -39,8 +40,13 @@ def auto_run(module, name = None, debug_log=None, only_parse=False, rst_format='
         lazy_load: 懒加载任务类文件
         delay: float, 延迟执行(second)
         mp_mode: 多进程模式, 可选: spawn, fork; windows仅支持spawn
+        profile_startup: bool|str, 记录启动各阶段耗时(imports, parse, loader, store_init, executor_init, worker_spawn, first_item),
+            结果见返回数据的 __startup__; 字符串表示同时启用cProfile并输出到该文件(.prof后缀为二进制stats, 其他为文本)
         env.xxx: 环境变量
     """
+    if profile_startup:
+        StartupProfile.start('smart_auto', cprofile_out=profile_startup if isinstance(profile_startup, str) else None)
+
     if set_default_sig_handler():
         logger.debug('set sig_interrupt_handler as default signal handler')
     
@@ -58,9 +64,10 @@ def auto_run(module, name = None, debug_log=None, only_parse=False, rst_format='
         envs = cmd_args.set_env_from_args(kwargs)
         bind_arg = cmd_args.resolve_bind_arg(bind_arg, kwargs)
 
-        parser = create_auto_yml_parser_by_module_path(module.strip())
-        logger.debug('auto_run yml file: %s', parser.path_ctx.file_path)
-        parser.bind_arg(bind_arg)
+        with StartupProfile.phase('parse'):
+            parser = create_auto_yml_parser_by_module_path(module.strip())
+            logger.debug('auto_run yml file: %s', parser.path_ctx.file_path)
+            parser.bind_arg(bind_arg)
 
         run_obj = parser.auto_obj
 
@@ -88,19 +95,28 @@ def auto_run(module, name = None, debug_log=None, only_parse=False, rst_format='
             logger.debug('auto_run %s %s delay %d second', module, name, delay)
             time.sleep(delay)
             
-        runner = AutoRunner(run_obj, debug_log=debug_log, lazy_load=lazy_load)
+        with StartupProfile.phase('executor_init'):
+            runner = AutoRunner(run_obj, debug_log=debug_log, lazy_load=lazy_load)
+
         if isinstance(name, (tuple, list)):
             for sub_name in name:
                 runner.start(sub_name)
         else:
             runner.start(name)
 
-        return runner.context.response().to_dict()
+        resp = runner.context.response().to_dict()
+
+        if profile_startup:
+            resp['__startup__'] = StartupProfile.stop()
+
+        return resp
     except KeyboardInterrupt:
 
         logger.info('auto_run end(KeyboardInterrupt)')
     finally:
 
+        StartupProfile.stop()
+
         AppEnv.clean()
 
         if runner:
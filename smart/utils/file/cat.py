@@ -262,7 +262,7 @@ class FileCat:
         yield from fp_readline(self.fp, num_line)
 
     def tail(self, num_line:int=0, num_byte:int=None, follow=False, follow_line_mode:bool=False, follow_num_byte:int=None, 
-            follow_max_time:float=None, follow_expire_at:float=None, follow_is_end_fn:callable=None):
+            follow_max_time:float=None, follow_expire_at:float=None, follow_is_end_fn:callable=None, follow_wait_fn:callable=None):
         """从文件末尾取数据
 
         Args:
@@ -274,6 +274,7 @@ class FileCat:
             follow_max_time (float, optional): 多少秒之后停止取新数据. Defaults to None.
             follow_expire_at (float, optional): 时间戳在follow_expire_at之后停止取新数据. Defaults to None.
             follow_is_end_fn (callable, optional): 文件无新数据时执行回调函数, 函数返回True表示停止取数. Defaults to None.
+            follow_wait_fn (callable, optional): 等待新数据的函数 fn(timeout), 如 FileWatchHandle.wait; 缺省每隔follow_interval秒读取. Defaults to None.
 
         Yields:
             bytes: 读取的文件数据, 包含换行符
@@ -325,12 +326,16 @@ class FileCat:
                         if data:
                             yield data
                 ts_curr = time.time()
-                if ts_curr >= follow_expire_at:
+                if follow_expire_at and ts_curr >= follow_expire_at:
                     break
                 if follow_is_end_fn and follow_is_end_fn():
                     break
-                # 间隔follow_interval秒，等待新数据
-                time.sleep(follow_interval)
+                if follow_wait_fn:
+                    # 等待文件变化通知, 最长等到follow_expire_at
+                    follow_wait_fn(follow_expire_at - ts_curr if follow_expire_at else None)
+                else:
+                    # 间隔follow_interval秒，等待新数据
+                    time.sleep(follow_interval)
 
     def _more_byte(self, num_byte):
         fp = self.fp
@@ -0,0 +1,241 @@
+import os, time, struct, select, threading, ctypes, ctypes.util
+
+from smart.utils.__logger import logger_utils as logger
+
+
+# inotify 事件
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+
+_IN_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+_IN_EVENT = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """加载 libc 的 inotify 函数, 不支持的平台返回None"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fns = (libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch)
+    except (OSError, AttributeError):
+        return None
+    fns[1].argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    fns[2].argtypes = (ctypes.c_int, ctypes.c_int)
+    return fns
+
+
+class FileWatch:
+    """单个文件的监听状态, 由该文件的所有订阅者共享; 文件每次变化 version 加1"""
+    def __init__(self, file_path:str, cond:threading.Condition):
+        self.file_path = file_path
+        self.cond = cond
+        self.version = 0
+        self.refs = 0
+        self.wd = None
+        self.stat = None
+
+
+class FileWatchHandle:
+    """文件监听的订阅者, 由 FileWatcher.watch 返回, 用完后需 close (或使用 with 语句)
+    """
+    def __init__(self, watcher:'FileWatcher', watch:FileWatch):
+        self._watcher = watcher
+        self._watch = watch
+        self._seen = watch.version
+        self._closed = False
+
+    @property
+    def file_path(self) -> str:
+        return self._watch.file_path
+
+    def wait(self, timeout:float=None) -> bool:
+        """等待文件变化; 上次等待之后已发生的变化会立即返回
+
+        Args:
+            timeout (float, optional): 最长等待时长(秒), None表示一直等待. Defaults to None.
+
+        Returns:
+            bool: True表示文件有变化, False表示超时
+        """
+        watch = self._watch
+        with watch.cond:
+            if watch.version == self._seen:
+                watch.cond.wait_for(lambda: watch.version != self._seen, timeout)
+            changed = watch.version != self._seen
+            self._seen = watch.version
+        return changed
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._watcher._release(self._watch)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FileWatcher:
+    """文件变化监听(进程内单例), 同一文件的多个订阅者共享一个监听
+
+    Linux 使用 inotify (所有文件共用一个 inotify 实例及线程); 不支持 inotify 或添加监听失败的文件,
+    由轮询线程每隔 poll_interval 秒比较文件的 size/mtime.
+    """
+    DEFAULT_POLL_INTERVAL = 0.1
+
+    __default:'FileWatcher' = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, poll_interval:float=None, use_inotify:bool=True):
+        self.poll_interval = poll_interval or self.DEFAULT_POLL_INTERVAL
+        self._lock = threading.Lock()
+        self._watches = {}
+        self._wds = {}
+        self._poll_cond = threading.Condition(self._lock)
+        self._poll_thread = None
+        self._pid = os.getpid()
+        self._inotify = _load_inotify() if use_inotify else None
+        self._inotify_fd = None
+
+        if self._inotify:
+            fd = self._inotify[0](os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                logger.warning('FileWatcher inotify_init1 error: %s', os.strerror(ctypes.get_errno()))
+                self._inotify = None
+            else:
+                self._inotify_fd = fd
+                threading.Thread(target=self.__inotify_loop, name='FileWatcher-inotify', daemon=True).start()
+
+    @classmethod
+    def default(cls) -> 'FileWatcher':
+        """进程内共享的 FileWatcher, fork 的子进程重新创建"""
+        watcher = cls.__default
+        if watcher is None or watcher._pid != os.getpid():
+            with cls.__default_lock:
+                watcher = cls.__default
+                if watcher is None or watcher._pid != os.getpid():
+                    watcher = cls.__default = cls()
+        return watcher
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._inotify else 'poll'
+
+    def watch(self, file_path:str) -> FileWatchHandle:
+        """订阅文件变化
+
+        Args:
+            file_path (str): 文件路径
+
+        Returns:
+            FileWatchHandle: 订阅者
+        """
+        key = os.path.realpath(file_path)
+
+        with self._lock:
+            watch = self._watches.get(key)
+            if watch is None:
+                watch = self._watches[key] = FileWatch(key, threading.Condition(self._lock))
+                self.__add_watch(watch)
+            watch.refs += 1
+            return FileWatchHandle(self, watch)
+
+    def notify(self, file_path:str):
+        """主动唤醒文件的订阅者(如文件写入方已结束), 文件未被订阅时忽略"""
+        with self._lock:
+            watch = self._watches.get(os.path.realpath(file_path))
+            if watch is not None:
+                self.__changed(watch)
+
+    @staticmethod
+    def __changed(watch:FileWatch):
+        watch.version += 1
+        watch.cond.notify_all()
+
+    @staticmethod
+    def __file_stat(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def __add_watch(self, watch:FileWatch):
+        if self._inotify:
+            wd = self._inotify[1](self._inotify_fd, watch.file_path.encode(), _IN_WATCH_MASK)
+            if wd >= 0:
+                watch.wd = wd
+                self._wds.setdefault(wd, []).append(watch)
+                return
+            logger.debug('FileWatcher inotify_add_watch %s error: %s', watch.file_path, os.strerror(ctypes.get_errno()))
+
+        watch.stat = self.__file_stat(watch.file_path)
+        if self._poll_thread is None:
+            self._poll_thread = threading.Thread(target=self.__poll_loop, name='FileWatcher-poll', daemon=True)
+            self._poll_thread.start()
+        self._poll_cond.notify_all()
+
+    def _release(self, watch:FileWatch):
+        with self._lock:
+            watch.refs -= 1
+            if watch.refs > 0:
+                return
+            self._watches.pop(watch.file_path, None)
+
+            if watch.wd is not None:
+                watches = self._wds.get(watch.wd) or []
+                if watch in watches:
+                    watches.remove(watch)
+                if not watches:
+                    self._wds.pop(watch.wd, None)
+                    self._inotify[2](self._inotify_fd, watch.wd)
+
+    def __inotify_loop(self):
+        fd = self._inotify_fd
+        while True:
+            try:
+                select.select([fd], [], [])
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                logger.warning('FileWatcher inotify read error: %s', e)
+                time.sleep(self.poll_interval)
+                continue
+
+            with self._lock:
+                offset = 0
+                while offset + _IN_EVENT.size <= len(data):
+                    wd, mask, _, name_len = _IN_EVENT.unpack_from(data, offset)
+                    offset += _IN_EVENT.size + name_len
+
+                    watches = self._wds.get(wd)
+                    if not watches:
+                        continue
+                    for watch in watches:
+                        self.__changed(watch)
+                    if mask & IN_IGNORED:
+                        # 文件被删除/移动后监听失效
+                        for watch in self._wds.pop(wd):
+                            watch.wd = None
+
+    def __poll_loop(self):
+        while True:
+            with self._lock:
+                while not any(w.wd is None for w in self._watches.values()):
+                    self._poll_cond.wait()
+                watches = [w for w in self._watches.values() if w.wd is None]
+
+            for watch in watches:
+                stat = self.__file_stat(watch.file_path)
+                if stat != watch.stat:
+                    with self._lock:
+                        watch.stat = stat
+                        self.__changed(watch)
+
+            time.sleep(self.poll_interval)
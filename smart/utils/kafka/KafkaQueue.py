@@ -1,22 +1,70 @@
 import time
-from collections import Counter
+from collections import Counter, deque
 
 try:
-    from confluent_kafka import Producer, Consumer
+    from confluent_kafka import Producer, Consumer, TopicPartition
     from confluent_kafka.admin import AdminClient, NewTopic
 except:
     from smart.utils.lang.UnSupport import UnSupport
-    Producer = Consumer = AdminClient = NewTopic = UnSupport(
+    Producer = Consumer = TopicPartition = AdminClient = NewTopic = UnSupport(
         'confluent_kafka', 
         tip='Your should run cmd `pip install confluent_kafka` first'
     )
 
 from smart.utils.serialize import TypeObjSerializer
 from smart.utils.list import list_safe_iter
+from smart.utils.batch.BatchIter import BatchItemIter
 
 from smart.utils.__logger import logger_utils as logger
 
 
+class KafkaDeliveryStats:
+    """发送数据的投递结果统计, 由 producer.poll/flush 触发的投递回调更新
+    """
+    # 最多保留的错误信息数
+    Max_Errors = 10
+
+    def __init__(self, raise_error:bool=False, log_report:bool=False) -> None:
+        """
+        Args:
+            raise_error (bool, optional): 投递失败时是否抛出异常(在poll/flush中抛出). Defaults to False.
+            log_report (bool, optional): 是否记录投递成功的日志. Defaults to False.
+        """
+        self.raise_error = raise_error
+        self.log_report = log_report
+        self.produced = 0
+        self.delivered = 0
+        self.failed = 0
+        self.errors = []
+
+    @property
+    def in_flight(self) -> int:
+        """已发送但未收到投递结果的消息数"""
+        return self.produced - self.delivered - self.failed
+
+    def on_delivery(self, err, msg):
+        if err is not None:
+            self.failed += 1
+            if self.raise_error:
+                raise Exception(err)
+            if len(self.errors) < self.Max_Errors:
+                self.errors.append(str(err))
+                logger.warning('KafkaQueue delivery failed to %s [%s]: %s', msg.topic(), msg.partition(), err)
+        else:
+            self.delivered += 1
+            if self.log_report:
+                logger.debug('Message delivered to %s [%s]', msg.topic(), msg.partition())
+
+    def to_dict(self) -> dict:
+        return {
+            'produced': self.produced,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'in_flight': self.in_flight,
+            'errors': list(self.errors)
+        }
+
+
 class KafkaQueue:
     # 配置文档参见: https://github.com/edenhill/librdkafka/blob/master/CONFIGURATION.md
     # 缺省消费者组
@@ -54,8 +102,14 @@ class KafkaQueue:
         self.__consumer_auto_commit = None
         self.__key_counter = Counter()
         self._log_delivery_report = False
-        self._uncommit_msg_list = []
+        # poll接收的未确认消息
+        self._uncommit_msg_list = deque()
+        # recv_batches接收的未确认偏移量: {(topic, partition): max_offset}
+        self._uncommit_offsets = {}
+        self._uncommit_count = 0
         self._subscribed_topics = set()
+        # 多条数据帧中未读取的数据: (type, item)
+        self._recv_pending = deque()
 
     def __get_servers_str(self):
         _servers = self._bootstrap_servers
@@ -299,7 +353,8 @@ class KafkaQueue:
             producer.flush()
 
     def send_all(self, item_iter, topic=None, partition:int=None, send_end_cmd=True, 
-            item_topic_key='_send_topic', item_msg_key=None, flush_step:int=1, auto_msg_key=False):
+            item_topic_key='_send_topic', item_msg_key=None, flush_step:int=1, auto_msg_key=False,
+            batch_size:int=None, frame_items:bool=False, max_in_flight:int=None, flush_interval:float=None) -> dict:
         """发送所有数据
 
         Args:
@@ -311,48 +366,110 @@ class KafkaQueue:
             item_msg_key (_type_, optional): item的键, 用于指定msg的key. Defaults to None.
             flush_step (int, optional): 多少条数据执行一次flush. Defaults to 1.
             auto_msg_key (bool, optional): 是否自动生成msg的key, 会用于做分区路由. Defaults to False.
+            batch_size (int, optional): 每批读取并序列化(TypeObjSerializer.encode_many)的数据条数; 
+                数据凑满一批后才发送, 缺省None表示与flush_step一致. Defaults to None.
+            frame_items (bool, optional): 是否将一批中相同topic和key的数据合并为一条多条数据帧消息; 
+                接收方需使用本版本的recv_one/recv_all. Defaults to False.
+            max_in_flight (int, optional): >0时启用投递驱动模式: 忽略flush_step, 依赖producer内部批量发送, 
+                只轮询投递结果, 未确认的消息数达到max_in_flight时等待; 投递失败只计数不抛出异常. Defaults to None.
+            flush_interval (float, optional): 投递驱动模式下定时flush的间隔(秒), 缺省None表示只在结束时flush. Defaults to None.
+
+        Returns:
+            dict: 投递结果统计 {produced, delivered, failed, in_flight, errors}
         """
         producer = self.get_producer()
+        stats = KafkaDeliveryStats(raise_error=not max_in_flight, log_report=self._log_delivery_report)
+        flush_ts = time.time()
         b_flush = False
-        for i, item in enumerate(item_iter):
-            _topic, _msg_key, producer_kwargs = topic, None, {}
-            if isinstance(item, bytes):
-                byte_data = item
-            else:
-                _topic = item.pop(item_topic_key, topic) if item_topic_key else topic
-                byte_data = TypeObjSerializer.encode(item)
-                _msg_key = item.pop(item_msg_key, None) if item_msg_key else None
-            assert _topic
-            if partition is not None:
-                producer_kwargs['partition'] = partition
-            if _msg_key:
-                producer_kwargs['key'] = _msg_key
-            elif auto_msg_key:
-                producer_kwargs['key'] = self.__msg_key(topic)
-            producer.poll(0)
-            producer.produce(
-                _topic, 
-                byte_data,
-                on_delivery=self._delivery_report,
-                **producer_kwargs
-            )
-            if flush_step <= 1 or (i+1) % flush_step == 0:
-                producer.flush()
-                b_flush = False
-            else:
-                b_flush = True
+        producer_kwargs = {}
+        batch_size = max(batch_size or flush_step or 1, 1)
+        i = -1
+        for batch in BatchItemIter(item_iter, batch_size).iter_fn():
+            msg_list, obj_idx_list = [], []
+            for item in batch:
+                _topic, _msg_key = topic, None
+                if not isinstance(item, bytes):
+                    _topic = item.pop(item_topic_key, topic) if item_topic_key else topic
+                    _msg_key = item.get(item_msg_key) if item_msg_key else None
+                    obj_idx_list.append(len(msg_list))
+                assert _topic
+                msg_list.append([_topic, _msg_key, item])
+
+            if frame_items and obj_idx_list:
+                msg_list = self.__frame_msg_list(msg_list)
+            elif obj_idx_list:
+                data_list = TypeObjSerializer.encode_many([msg_list[idx][2] for idx in obj_idx_list])
+                for idx, byte_data in zip(obj_idx_list, data_list):
+                    msg_list[idx][2] = byte_data
+
+            for _topic, _msg_key, byte_data in msg_list:
+                i += 1
+                producer_kwargs = {}
+                if partition is not None:
+                    producer_kwargs['partition'] = partition
+                if _msg_key:
+                    producer_kwargs['key'] = _msg_key
+                elif auto_msg_key:
+                    producer_kwargs['key'] = self.__msg_key(topic)
+                self.__produce(producer, stats, _topic, byte_data, max_in_flight, **producer_kwargs)
+                if max_in_flight:
+                    if flush_interval and time.time() - flush_ts >= flush_interval:
+                        producer.flush()
+                        flush_ts = time.time()
+                        b_flush = False
+                    else:
+                        b_flush = True
+                elif flush_step <= 1 or (i+1) % flush_step == 0:
+                    producer.flush()
+                    b_flush = False
+                else:
+                    b_flush = True
         if send_end_cmd and topic:
             byte_data = TypeObjSerializer.encode({'type':'end'}, 'cmd')
-            producer.poll(0)
-            producer.produce(
-                topic, 
-                byte_data,
-                on_delivery=self._delivery_report,
-                **producer_kwargs
-            )
+            self.__produce(producer, stats, topic, byte_data, max_in_flight, **producer_kwargs)
             b_flush = True
         if b_flush:
             producer.flush()
+        if stats.failed:
+            logger.warning('KafkaQueue.send_all %s', stats.to_dict())
+        return stats.to_dict()
+
+    @staticmethod
+    def __produce(producer, stats:KafkaDeliveryStats, topic, byte_data, max_in_flight:int=None, **producer_kwargs):
+        producer.poll(0)
+        while True:
+            try:
+                producer.produce(
+                    topic, 
+                    byte_data,
+                    on_delivery=stats.on_delivery,
+                    **producer_kwargs
+                )
+                break
+            except BufferError:
+                # producer本地队列已满, 等待投递结果后重试
+                producer.poll(0.1)
+        stats.produced += 1
+        while max_in_flight and stats.in_flight >= max_in_flight:
+            producer.poll(0.1)
+
+    @staticmethod
+    def __frame_msg_list(msg_list:list) -> list:
+        # 相同(topic, key)的数据合并为一个多条数据帧, 按每组第一条数据的位置发送; bytes数据单独发送
+        groups, frame_list = {}, []
+        for _topic, _msg_key, item in msg_list:
+            if isinstance(item, bytes):
+                frame_list.append([_topic, _msg_key, item])
+                continue
+            group = groups.get((_topic, _msg_key))
+            if group is None:
+                group = groups[(_topic, _msg_key)] = []
+                frame_list.append([_topic, _msg_key, group])
+            group.append(item)
+        for msg in frame_list:
+            if isinstance(msg[2], list):
+                msg[2] = TypeObjSerializer.encode_many(msg[2], frame=True)
+        return frame_list
 
     def __consumer_poll(self, consumer, timeout, pool_interval):
         if timeout == 0:
@@ -386,6 +503,8 @@ class KafkaQueue:
         Returns:
             tuple: (type, item); type是None表示数据, cmd表示命令
         """
+        if self._recv_pending:
+            return self._recv_pending.popleft()
         consumer = self.get_consumer()
         self.subscribe(topic_name_or_list)
         pool_interval = max(self.Min_Pool_Interval, pool_interval)
@@ -398,10 +517,11 @@ class KafkaQueue:
                 raise Exception("KafkaQueue.recv_one error: "+str(err))
             msg_content = msg.value()
             try:
-                type, item = TypeObjSerializer.decode(msg_content)
-                if with_msg_key and isinstance(item, dict):
-                    item[with_msg_key] = msg.key()
-                return type, item
+                type_item_list = self.__decode_msg(msg, with_msg_key)
+                if not type_item_list:
+                    continue
+                self._recv_pending.extend(type_item_list[1:])
+                return type_item_list[0]
             except Exception as e:
                 if skip_err_item:
                     logger.warning("KafkaQueue.recv decode error, msg=%s, err=%s", msg_content, e)
@@ -411,7 +531,7 @@ class KafkaQueue:
                     raise e
     
     def recv_all(self, topic_name_or_list, timeout:float=None, pool_interval:float=10, 
-                is_daemon:bool=False, with_msg_key:str=None, skip_err_item:bool=False):
+                is_daemon:bool=False, with_msg_key:str=None, skip_err_item:bool=False, batch_size:int=1):
         """接收所有数据(直至超时或接收到结束命令)
 
         Args:
@@ -421,6 +541,7 @@ class KafkaQueue:
             is_daemon (bool, optional): 是否守护进程, True则忽略end命令, 只响应exit命令. Defaults to False.
             with_msg_key (str, optional): 将msg的key放入到指定item键. Defaults to None.
             skip_err_item (bool, optional): 跳过decode错误的item. Defaults to False.
+            batch_size (int, optional): >1时使用recv_batches批量接收, 每批数据全部处理后才记录其偏移量(见recv_batches). Defaults to 1.
 
         Raises:
             Exception: 接收数据出错
@@ -428,11 +549,31 @@ class KafkaQueue:
         Yields:
             dict: item数据
         """
+        if batch_size > 1:
+            for batch in self.recv_batches(topic_name_or_list, batch_size=batch_size, timeout=timeout, pool_interval=pool_interval, 
+                    is_daemon=is_daemon, with_msg_key=with_msg_key, skip_err_item=skip_err_item):
+                yield from batch
+            return
+
         consumer = self.get_consumer()
         self.subscribe(topic_name_or_list)
         pool_interval = max(self.Min_Pool_Interval, pool_interval)
-        msg = None
+        end_types = ('exit',) if is_daemon else ('end', 'exit')
+        type_item_list = list(self._recv_pending)
+        self._recv_pending.clear()
         while True:
+            for type, item in type_item_list:
+                if type == 'cmd':
+                    item = item or {}
+                    cmd_type = item.get('type')
+                    if cmd_type in end_types:
+                        logger.debug('KafkaQueue.recv_all end by cmd: %s', item)
+                        return
+                    else:
+                        logger.debug('KafkaQueue.recv_all ignore cmd: %s', item)
+                    continue
+                yield item
+
             msg = self.__consumer_poll(consumer, timeout, pool_interval)
             if msg is None:
                 break
@@ -441,38 +582,173 @@ class KafkaQueue:
                 raise Exception("KafkaQueue.recv_all error: "+str(err))
             msg_content = msg.value()
             try:
-                type, item = TypeObjSerializer.decode(msg_content)
-                if with_msg_key and isinstance(item, dict):
-                    item[with_msg_key] = msg.key()
+                type_item_list = self.__decode_msg(msg, with_msg_key)
             except Exception as e:
                 if skip_err_item:
                     logger.warning("KafkaQueue.recv decode error, msg=%s, err=%s", msg_content, e)
+                    type_item_list = []
                     continue
                 else:
                     logger.error("KafkaQueue.recv decode error, msg=%s", msg_content)
                     raise e
-            if type == 'cmd':
-                item = item or {}
-                cmd_type = item.get('type')
-                end_types = ('exit',) if is_daemon else ('end', 'exit')
-                if cmd_type in end_types:
-                    logger.debug('KafkaQueue.recv_all end by cmd: %s', item)
-                    break
-                else:
-                    logger.debug('KafkaQueue.recv_all ignore cmd: %s', item)
-                continue
-            yield item
+
+    @staticmethod
+    def __decode_msg(msg, with_msg_key:str=None) -> list:
+        # 兼容多条数据帧(send_all frame_items=True)
+        type_item_list = TypeObjSerializer.decode_many([msg.value()])
+        if with_msg_key:
+            for _, item in type_item_list:
+                if isinstance(item, dict):
+                    item[with_msg_key] = msg.key()
+        return type_item_list
     
-    def commit(self):
-        if not len(self._uncommit_msg_list):
+    def __consumer_consume(self, consumer, num_messages:int, timeout, pool_interval) -> list:
+        if timeout == 0:
+            return consumer.consume(num_messages=num_messages, timeout=0)
+        end_ts = (time.time() + timeout) if timeout else None
+        while True:
+            _timeout = min(end_ts-time.time(), pool_interval) if end_ts else pool_interval
+            if _timeout <= 0:
+                break
+            msg_list = consumer.consume(num_messages=num_messages, timeout=_timeout)
+            if msg_list:
+                return msg_list
+        return []
+
+    @staticmethod
+    def __seek_back(consumer, msg_list:list):
+        # 将分区的读取位置回退到第一条未处理的消息
+        seek_offsets = {}
+        for msg in msg_list:
+            seek_offsets.setdefault((msg.topic(), msg.partition()), msg.offset())
+        for (topic, partition), offset in seek_offsets.items():
+            try:
+                consumer.seek(TopicPartition(topic, partition, offset))
+            except Exception as e:
+                logger.warning("KafkaQueue seek %s[%s] to %s error: %s", topic, partition, offset, e)
+
+    def __add_uncommit_offsets(self, msg_offsets:dict, count:int):
+        offsets = self._uncommit_offsets
+        for tp, offset in msg_offsets.items():
+            if offset > offsets.get(tp, -1):
+                offsets[tp] = offset
+        self._uncommit_count += count
+
+    def recv_batches(self, topic_name_or_list, batch_size:int=100, timeout:float=None, pool_interval:float=10, 
+                is_daemon:bool=False, with_msg_key:str=None, skip_err_item:bool=False, commit_interval:float=None):
+        """批量接收数据(直至超时或接收到结束命令), 使用 consumer.consume 每次读取多条消息
+
+        enable.auto.commit=False 时, 每批数据在下游处理完成(即下一次迭代)后记录各分区的最大偏移量, 由 commit 提交; 
+        结束命令之后或未处理的消息会回退读取位置, 再次接收时重新读取
+
+        Args:
+            topic_name_or_list (str|list): topic名称或topic名称列表
+            batch_size (int, optional): 每批最大数据条数. Defaults to 100.
+            timeout (float, optional): 接收超时时间. Defaults to None.
+            pool_interval (float, optional): 长轮询间隔. Defaults to 10.
+            is_daemon (bool, optional): 是否守护进程, True则忽略end命令, 只响应exit命令. Defaults to False.
+            with_msg_key (str, optional): 将msg的key放入到指定item键. Defaults to None.
+            skip_err_item (bool, optional): 跳过decode错误的item. Defaults to False.
+            commit_interval (float, optional): 自动异步提交偏移量的间隔(秒), 仅enable.auto.commit=False时有效; None表示由调用方执行commit. Defaults to None.
+
+        Raises:
+            Exception: 接收数据出错
+
+        Yields:
+            list: item数据列表
+        """
+        consumer = self.get_consumer()
+        self.subscribe(topic_name_or_list)
+        pool_interval = max(self.Min_Pool_Interval, pool_interval)
+        batch_size = max(int(batch_size or 1), 1)
+        end_types = ('exit',) if is_daemon else ('end', 'exit')
+        track_offsets = not self.__consumer_auto_commit
+        commit_ts = time.time()
+
+        def _extend(batch, type_item_list):
+            # 返回是否收到结束命令
+            for type, item in type_item_list:
+                if type == 'cmd':
+                    item = item or {}
+                    if item.get('type') in end_types:
+                        logger.debug('KafkaQueue.recv_batches end by cmd: %s', item)
+                        return True
+                    logger.debug('KafkaQueue.recv_batches ignore cmd: %s', item)
+                    continue
+                batch.append(item)
+            return False
+
+        batch = []
+        is_end = _extend(batch, self._recv_pending)
+        self._recv_pending.clear()
+        while True:
+            msg_list, msg_offsets, num_msg = [], {}, 0
+            if not is_end and len(batch) < batch_size:
+                msg_list = self.__consumer_consume(consumer, batch_size - len(batch), timeout, pool_interval)
+                for msg in msg_list:
+                    err = msg.error()
+                    if err:
+                        raise Exception("KafkaQueue.recv_batches error: "+str(err))
+                    try:
+                        type_item_list = self.__decode_msg(msg, with_msg_key)
+                    except Exception as e:
+                        if skip_err_item:
+                            logger.warning("KafkaQueue.recv decode error, msg=%s, err=%s", msg.value(), e)
+                            type_item_list = []
+                        else:
+                            logger.error("KafkaQueue.recv decode error, msg=%s", msg.value())
+                            raise e
+                    msg_offsets[(msg.topic(), msg.partition())] = msg.offset()
+                    num_msg += 1
+                    if _extend(batch, type_item_list):
+                        is_end = True
+                        break
+                if num_msg < len(msg_list):
+                    self.__seek_back(consumer, msg_list[num_msg:])
+
+            if batch:
+                try:
+                    yield batch
+                except GeneratorExit:
+                    self.__seek_back(consumer, msg_list[:num_msg])
+                    raise
+                batch = []
+            elif not msg_list and not is_end:
+                # 超时
+                break
+
+            if track_offsets and num_msg:
+                self.__add_uncommit_offsets(msg_offsets, num_msg)
+                if commit_interval is not None and time.time() - commit_ts >= commit_interval:
+                    self.commit(asynchronous=True)
+                    commit_ts = time.time()
+            if is_end:
+                break
+
+    def commit(self, asynchronous:bool=False) -> int:
+        """提交已接收消息的偏移量(enable.auto.commit=False时使用), 每个分区只提交最大偏移量
+
+        Args:
+            asynchronous (bool, optional): 是否异步提交; recv_batches 的定时提交使用异步提交. Defaults to False.
+
+        Returns:
+            int: 提交的消息数
+        """
+        while self._uncommit_msg_list:
+            msg = self._uncommit_msg_list.popleft()
+            self.__add_uncommit_offsets({(msg.topic(), msg.partition()): msg.offset()}, 1)
+        if not self._uncommit_offsets:
             return 0
+        offsets = [
+            TopicPartition(topic, partition, offset + 1)
+            for (topic, partition), offset in self._uncommit_offsets.items()
+        ]
+        count = self._uncommit_count
+        self._uncommit_offsets = {}
+        self._uncommit_count = 0
         consumer = self.get_consumer()
-        i = 0
-        while len(self._uncommit_msg_list):
-            msg = self._uncommit_msg_list.pop(0)
-            consumer.commit(msg)
-            i += 1
-        return i
+        consumer.commit(offsets=offsets, asynchronous=asynchronous)
+        return count
     
     def unsubscribe(self):
         consumer = self.get_consumer()
@@ -0,0 +1,201 @@
+"""纯 python 实现的 msgpack 编解码(https://github.com/msgpack/msgpack/blob/master/spec.md)
+
+支持 nil, bool, int(64位), float64, str, bin, array, map; 不支持 ext 类型.
+输出与 msgpack.packb(obj, use_bin_type=True) 一致, 在未安装 msgpack 时作为后备实现
+"""
+import struct
+
+
+_S_B = struct.Struct('>B')
+_S_H = struct.Struct('>H')
+_S_I = struct.Struct('>I')
+_S_Q = struct.Struct('>Q')
+_S_b = struct.Struct('>b')
+_S_h = struct.Struct('>h')
+_S_i = struct.Struct('>i')
+_S_q = struct.Struct('>q')
+_S_f = struct.Struct('>f')
+_S_d = struct.Struct('>d')
+
+
+def _pack_int(obj, out:list):
+    if 0 <= obj < 0x80:
+        out.append(_S_B.pack(obj))
+    elif -0x20 <= obj < 0:
+        out.append(_S_b.pack(obj))
+    elif obj > 0:
+        if obj <= 0xff:
+            out.append(b'\xcc' + _S_B.pack(obj))
+        elif obj <= 0xffff:
+            out.append(b'\xcd' + _S_H.pack(obj))
+        elif obj <= 0xffffffff:
+            out.append(b'\xce' + _S_I.pack(obj))
+        elif obj <= 0xffffffffffffffff:
+            out.append(b'\xcf' + _S_Q.pack(obj))
+        else:
+            raise OverflowError('Integer value out of range')
+    else:
+        if obj >= -0x80:
+            out.append(b'\xd0' + _S_b.pack(obj))
+        elif obj >= -0x8000:
+            out.append(b'\xd1' + _S_h.pack(obj))
+        elif obj >= -0x80000000:
+            out.append(b'\xd2' + _S_i.pack(obj))
+        elif obj >= -0x8000000000000000:
+            out.append(b'\xd3' + _S_q.pack(obj))
+        else:
+            raise OverflowError('Integer value out of range')
+
+
+def _pack_len(size, fix_prefix:int, fix_max:int, codes:tuple, out:list):
+    """codes: (8位长度类型码, 16位长度类型码, 32位长度类型码); 类型码为 None 表示不支持该长度
+    """
+    if size <= fix_max:
+        out.append(_S_B.pack(fix_prefix | size))
+    elif size <= 0xff and codes[0] is not None:
+        out.append(bytes((codes[0], size)))
+    elif size <= 0xffff:
+        out.append(bytes((codes[1], )) + _S_H.pack(size))
+    elif size <= 0xffffffff:
+        out.append(bytes((codes[2], )) + _S_I.pack(size))
+    else:
+        raise ValueError('msgpack object is too large')
+
+
+def _pack(obj, out:list, default:callable, depth:int):
+    if depth > 512:
+        raise ValueError('msgpack object is too deep')
+
+    if obj is None:
+        out.append(b'\xc0')
+    elif obj is True:
+        out.append(b'\xc3')
+    elif obj is False:
+        out.append(b'\xc2')
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out.append(b'\xcb' + _S_d.pack(obj))
+    elif isinstance(obj, str):
+        data = obj.encode('utf8')
+        _pack_len(len(data), 0xa0, 31, (0xd9, 0xda, 0xdb), out)
+        out.append(data)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        _pack_len(len(data), 0, -1, (0xc4, 0xc5, 0xc6), out)
+        out.append(data)
+    elif isinstance(obj, (list, tuple)):
+        _pack_len(len(obj), 0x90, 15, (None, 0xdc, 0xdd), out)
+        for item in obj:
+            _pack(item, out, default, depth + 1)
+    elif isinstance(obj, dict):
+        _pack_len(len(obj), 0x80, 15, (None, 0xde, 0xdf), out)
+        for key, val in obj.items():
+            _pack(key, out, default, depth + 1)
+            _pack(val, out, default, depth + 1)
+    elif default is not None:
+        _pack(default(obj), out, None, depth + 1)
+    else:
+        raise TypeError('can not serialize {!r} object'.format(type(obj).__name__))
+
+
+def packb(obj, default:callable=None) -> bytes:
+    """序列化
+
+    Arguments:
+        obj {any} -- 数据
+
+    Keyword Arguments:
+        default {callable} -- 不支持的类型的转换函数 (default: {None})
+
+    Returns:
+        bytes
+    """
+    out = []
+    _pack(obj, out, default, 0)
+    return b''.join(out)
+
+
+class _Unpacker:
+    def __init__(self, data:bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def _read(self, size):
+        pos = self.pos
+        end = pos + size
+        if end > len(self.data):
+            raise ValueError('msgpack data is truncated')
+        self.pos = end
+        return self.data[pos:end]
+
+    def _unpack_struct(self, st:struct.Struct):
+        val, = st.unpack_from(self.data, self.pos)
+        self.pos += st.size
+        return val
+
+    def _str(self, size):
+        return str(self._read(size), 'utf8')
+
+    def _array(self, size):
+        return [self.unpack() for _ in range(size)]
+
+    def _map(self, size):
+        rst = {}
+        for _ in range(size):
+            key = self.unpack()
+            rst[key] = self.unpack()
+        return rst
+
+    def unpack(self):
+        code = self._unpack_struct(_S_B)
+        if code < 0x80:
+            return code
+        elif code >= 0xe0:
+            return code - 0x100
+        elif code < 0x90:
+            return self._map(code & 0x0f)
+        elif code < 0xa0:
+            return self._array(code & 0x0f)
+        elif code < 0xc0:
+            return self._str(code & 0x1f)
+
+        if code == 0xc0:
+            return None
+        elif code == 0xc2:
+            return False
+        elif code == 0xc3:
+            return True
+        elif code in (0xc4, 0xc5, 0xc6):
+            size = self._unpack_struct((_S_B, _S_H, _S_I)[code - 0xc4])
+            return bytes(self._read(size))
+        elif code == 0xca:
+            return self._unpack_struct(_S_f)
+        elif code == 0xcb:
+            return self._unpack_struct(_S_d)
+        elif 0xcc <= code <= 0xd3:
+            return self._unpack_struct((_S_B, _S_H, _S_I, _S_Q, _S_b, _S_h, _S_i, _S_q)[code - 0xcc])
+        elif code in (0xd9, 0xda, 0xdb):
+            return self._str(self._unpack_struct((_S_B, _S_H, _S_I)[code - 0xd9]))
+        elif code in (0xdc, 0xdd):
+            return self._array(self._unpack_struct((_S_H, _S_I)[code - 0xdc]))
+        elif code in (0xde, 0xdf):
+            return self._map(self._unpack_struct((_S_H, _S_I)[code - 0xde]))
+
+        raise ValueError('msgpack type 0x{:02x} is not supported'.format(code))
+
+
+def unpackb(data:bytes):
+    """反序列化
+
+    Arguments:
+        data {bytes} -- msgpack 数据
+
+    Returns:
+        any
+    """
+    unpacker = _Unpacker(data)
+    rst = unpacker.unpack()
+    if unpacker.pos != len(unpacker.data):
+        raise ValueError('msgpack data has extra bytes')
+    return rst
@@ -1,3 +1,4 @@
+import os, sys
 import multiprocessing as mp
 
 from smart.utils.log import auto_load_logging_config, set_default_logging_config
@@ -10,6 +11,24 @@ def on_process_init():
     auto_load_logging_config() or set_default_logging_config()
 
 
+def process_rss_mb():
+    """当前进程的常驻内存(MB); Linux读取/proc, 其他平台返回峰值内存, 无法获取时返回None
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except Exception:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节, Linux 为KB
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
 class ProcessTask:
     def __init__(self, fn):
         self.fn = fn
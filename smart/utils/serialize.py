@@ -1,9 +1,138 @@
-import json, io
+import json, io, struct
 
 from .json import ObjJSONEncoder
+from .env import AppEnv
+
+
+class TypeObjCodec:
+    """type_obj 数据体编解码器, 通过 main_ver 标识数据体格式
+    """
+    main_ver:int = None
+    name:str = None
+
+    def dumps(self, obj) -> bytes:
+        raise NotImplementedError()
+
+    def loads(self, body:bytes):
+        raise NotImplementedError()
+
+
+class JsonCodec(TypeObjCodec):
+    """json 格式(main_ver=0), 兼容旧版本数据
+    """
+    main_ver = 0
+    name = 'json'
+
+    def __init__(self) -> None:
+        # 复用编码器实例, 输出与 json.dumps(obj, ensure_ascii=False, cls=ObjJSONEncoder) 一致
+        self._encode = ObjJSONEncoder(ensure_ascii=False).encode
+
+    def dumps(self, obj) -> bytes:
+        return self._encode(obj).encode('utf8')
+
+    def loads(self, body:bytes):
+        if not len(body):
+            return None
+        return json.loads(str(body, 'utf8'))
+
+
+def _msgpack_default(obj):
+    # 与 ObjJSONEncoder 一致: 对象转为 __dict__, 其它类型转为字符串
+    if hasattr(obj, '__dict__'):
+        return obj.__dict__
+    return str(obj)
+
+
+class MsgpackCodec(TypeObjCodec):
+    """msgpack 格式(main_ver=1); 已安装 msgpack 时使用其C扩展, 否则使用纯 python 实现(smart.utils.msgpack_lite), 两者数据格式一致
+
+    与 json 格式的差异: dict 的非字符串 key 保持原类型, bytes 保持为 bytes
+    """
+    main_ver = 1
+    name = 'msgpack'
+
+    def __init__(self) -> None:
+        try:
+            import msgpack
+            self.fast = True
+            self._packb = lambda obj: msgpack.packb(obj, default=_msgpack_default, use_bin_type=True)
+            self._unpackb = lambda body: msgpack.unpackb(body, raw=False, strict_map_key=False)
+        except ImportError:
+            from . import msgpack_lite
+            self.fast = False
+            self._packb = lambda obj: msgpack_lite.packb(obj, default=_msgpack_default)
+            self._unpackb = msgpack_lite.unpackb
+
+    def dumps(self, obj) -> bytes:
+        return self._packb(obj)
+
+    def loads(self, body:bytes):
+        if not len(body):
+            return None
+        return self._unpackb(body)
+
+
+_S_LEN = struct.Struct('>I')
 
 
 class TypeObjSerializer:
+    """type_obj 序列化
+
+    数据结构:
+    1. 无类型的 json 格式: body_str
+    2. 有类型的 json 格式: chr(0) + chr(type_len) + type + body_str
+    3. 其它格式: chr(1) + chr(main_ver) + chr(type_len) + type + body; type_len=0 表示无类型
+    4. 多条数据帧(encode_many): chr(2) + chr(main_ver) + chr(type_len) + type + uint32(count) + [uint32(body_len) + body] * count; 只能通过 decode_many 解码
+
+    解码时根据数据头识别格式, 生产者切换编码格式后, 已注册该格式的消费者可以同时处理新旧格式的数据;
+    缺省编码格式为 json, 可通过 set_default_codec 或环境变量 TYPE_OBJ_CODEC 设置
+    """
+    ENV_DEFAULT_CODEC = 'TYPE_OBJ_CODEC'
+
+    _codecs = {}
+    _default_codec:TypeObjCodec = None
+
+    @classmethod
+    def register_codec(cls, codec:TypeObjCodec):
+        """注册编解码器, 可通过 main_ver 或 name 获取
+        """
+        main_ver = codec.main_ver
+        if not isinstance(main_ver, int) or not 0 <= main_ver < 256:
+            raise ValueError('TypeObjCodec main_ver should be int8, got ' + repr(main_ver))
+        cls._codecs[main_ver] = codec
+        if codec.name:
+            cls._codecs[codec.name] = codec
+        return codec
+
+    @classmethod
+    def get_codec(cls, codec=None) -> TypeObjCodec:
+        """获取编解码器
+
+        Keyword Arguments:
+            codec {str|int|TypeObjCodec} -- 名称或 main_ver; None 表示缺省编码格式 (default: {None})
+
+        Returns:
+            TypeObjCodec
+        """
+        if codec is None:
+            if cls._default_codec is not None:
+                return cls._default_codec
+            codec = AppEnv.get(cls.ENV_DEFAULT_CODEC) or JsonCodec.main_ver
+        if isinstance(codec, TypeObjCodec):
+            return codec
+        if isinstance(codec, str) and codec.isdigit():
+            codec = int(codec)
+        found = cls._codecs.get(codec)
+        if found is None:
+            raise NotImplementedError('TypeObjSerializer codec ' + str(codec) + ' is not implemented')
+        return found
+
+    @classmethod
+    def set_default_codec(cls, codec=None):
+        """设置缺省编码格式; None 表示使用环境变量 TYPE_OBJ_CODEC 的值
+        """
+        cls._default_codec = None if codec is None else cls.get_codec(codec)
+
     @staticmethod
     def __cast_to_bytes(data):
         if data is None:
@@ -18,7 +147,7 @@ class TypeObjSerializer:
         return data
 
     @staticmethod
-    def encode(obj, obj_type:str=None, str_fn:callable=None)->bytes:
+    def encode(obj, obj_type:str=None, str_fn:callable=None, codec=None)->bytes:
         """序列化 (obj, type)
         
         Arguments:
@@ -26,11 +155,17 @@ class TypeObjSerializer:
         
         Keyword Arguments:
             obj_type {str} -- 数据类型 (default: {None})
-            str_fn {callable} -- 对象转字符串函数, 缺省使用 json.dumps (default: {None})
+            str_fn {callable} -- 对象转字符串函数, 缺省使用 json.dumps; 设置时使用 json 格式的数据结构 (default: {None})
+            codec {str|int|TypeObjCodec} -- 编码格式, 名称或 main_ver (default: {缺省编码格式})
         
         Returns:
             bytes -- 数据结构: chr(0) + chr(type_len) + type + obj_str
         """
+        if str_fn is None:
+            _codec = TypeObjSerializer.get_codec(codec)
+            if _codec.main_ver:
+                return TypeObjSerializer.__encode_ver(_codec, obj, obj_type)
+
         if obj is not None:
             if str_fn is None:
                 obj_data = json.dumps(obj, ensure_ascii=False, cls=ObjJSONEncoder)
@@ -60,6 +195,14 @@ class TypeObjSerializer:
 
         return data.getvalue()
 
+    @staticmethod
+    def __encode_ver(codec:TypeObjCodec, obj, obj_type:str=None) -> bytes:
+        obj_type = TypeObjSerializer.__cast_to_bytes(obj_type) or b''
+        len_type = len(obj_type)
+        assert len_type < 256
+        body = codec.dumps(obj) if obj is not None else b''
+        return b''.join((bytes([1, codec.main_ver, len_type]), obj_type, body))
+
     @staticmethod
     def decode(data:bytes, cast_fn:callable=None)->tuple:
         """反序列化type_obj
@@ -69,13 +212,13 @@ class TypeObjSerializer:
         反序列化版本处理逻辑:
         1. main_ver_len > 1, 表示非type_obj协议, body_offset = 0, 兼容纯obj序列化字符串的反序列化
         2. main_ver_len = 0, 表示 main_ver为None, 因此无sub_ver, type_len_offset = 1
-        3. main_ver_len = 1, 表示有 main_ver, 将抛出NotImplementedError异常, 为以后版本扩展预留
+        3. main_ver_len = 1, 表示有 main_ver, 使用 main_ver 对应的编解码器反序列化数据体; 未注册的 main_ver 将抛出NotImplementedError异常
         
         Arguments:
             data {bytes} -- 序列化的数据
         
         Keyword Arguments:
-            cast_fn {callable} -- 字符串转obj函数, 缺省使用 json.loads (default: {None})
+            cast_fn {callable} -- 字符串转obj函数, 缺省使用 json.loads; 仅用于 json 格式的数据 (default: {None})
         
         Returns:
             tuple -- type, obj
@@ -87,7 +230,9 @@ class TypeObjSerializer:
         
         main_ver_len = data[0]
 
-        if main_ver_len > 1:
+        if main_ver_len == 2:
+            raise ValueError('TypeObjSerializer multi item frame should be decoded by decode_many')
+        elif main_ver_len > 1:
             # 兼容纯 json_encode 序列化的数据
             main_ver = None
             type_len_offset = body_offset = 0
@@ -99,7 +244,13 @@ class TypeObjSerializer:
             type_len_offset = 1
         
         if main_ver and main_ver > 0:
-            raise NotImplementedError('TypeObjSerializer ver'+str(main_ver)+' is not implemented')
+            codec = TypeObjSerializer._codecs.get(main_ver)
+            if codec is None:
+                raise NotImplementedError('TypeObjSerializer ver'+str(main_ver)+' is not implemented')
+            type_len = data[type_len_offset]
+            body_offset = type_len_offset + 1 + type_len
+            type = data[type_len_offset + 1:body_offset].decode('utf8') if type_len else None
+            return type, codec.loads(memoryview(data)[body_offset:])
 
         if type_len_offset > 0:
             type_len = data[type_len_offset]
@@ -121,4 +272,103 @@ class TypeObjSerializer:
         
         return type, obj
 
-        
\ No newline at end of file
+    @staticmethod
+    def encode_many(obj_list, obj_type:str=None, str_fn:callable=None, codec=None, frame:bool=False):
+        """批量序列化同一类型的数据, 类型前缀只计算一次
+
+        Arguments:
+            obj_list {list} -- 数据列表
+
+        Keyword Arguments:
+            obj_type {str} -- 数据类型 (default: {None})
+            str_fn {callable} -- 对象转字符串函数; 设置时使用 json 格式的数据结构 (default: {None})
+            codec {str|int|TypeObjCodec} -- 编码格式 (default: {缺省编码格式})
+            frame {bool} -- 是否将所有数据编码为一个多条数据帧; 接收方需使用 decode_many 解码 (default: {False})
+
+        Returns:
+            list|bytes -- 每条数据的序列化结果, 与 encode 一致; frame=True 时返回一个多条数据帧
+        """
+        if str_fn is None:
+            _codec = TypeObjSerializer.get_codec(codec)
+            dumps = _codec.dumps
+            main_ver = _codec.main_ver
+        else:
+            dumps = lambda obj: TypeObjSerializer.__cast_to_bytes(str_fn(obj))
+            main_ver = 0
+
+        obj_type = TypeObjSerializer.__cast_to_bytes(obj_type)
+        len_type = len(obj_type) if obj_type else 0
+        assert len_type < 256
+
+        bodies = [dumps(obj) if obj is not None else b'' for obj in obj_list]
+
+        if frame:
+            parts = [bytes([2, main_ver, len_type]), obj_type or b'', _S_LEN.pack(len(bodies))]
+            for body in bodies:
+                parts.append(_S_LEN.pack(len(body)))
+                parts.append(body)
+            return b''.join(parts)
+
+        if main_ver:
+            prefix = bytes([1, main_ver, len_type]) + (obj_type or b'')
+        elif obj_type is not None:
+            prefix = bytes([0, len_type]) + obj_type
+        else:
+            prefix = None
+
+        if prefix is None:
+            return bodies
+        return [prefix + body for body in bodies]
+
+    @staticmethod
+    def decode_many(data_list, cast_fn:callable=None)->list:
+        """批量反序列化, 支持 encode 的结果和 encode_many 生成的多条数据帧
+
+        Arguments:
+            data_list {list} -- 序列化的数据列表
+
+        Keyword Arguments:
+            cast_fn {callable} -- 字符串转obj函数; 仅用于 json 格式的数据 (default: {None})
+
+        Returns:
+            list -- [(type, obj)]; 多条数据帧展开为多个元素
+        """
+        rst = []
+        for data in data_list:
+            if data and isinstance(data, (bytes, bytearray)) and data[0] == 2:
+                rst.extend(TypeObjSerializer.__decode_frame(data, cast_fn))
+            else:
+                rst.append(TypeObjSerializer.decode(data, cast_fn))
+        return rst
+
+    @staticmethod
+    def __decode_frame(data:bytes, cast_fn:callable=None) -> list:
+        main_ver, type_len = data[1], data[2]
+        if main_ver == 0 and cast_fn:
+            loads = lambda body: cast_fn(str(body, 'utf8'))
+        else:
+            codec = TypeObjSerializer._codecs.get(main_ver)
+            if codec is None:
+                raise NotImplementedError('TypeObjSerializer ver'+str(main_ver)+' is not implemented')
+            loads = codec.loads
+
+        offset = 3 + type_len
+        type = data[3:offset].decode('utf8') if type_len else None
+        count, = _S_LEN.unpack_from(data, offset)
+        offset += _S_LEN.size
+
+        view = memoryview(data)
+        rst = []
+        for _ in range(count):
+            body_len, = _S_LEN.unpack_from(data, offset)
+            offset += _S_LEN.size
+            end = offset + body_len
+            if end > len(data):
+                raise ValueError('TypeObjSerializer multi item frame is truncated')
+            rst.append((type, loads(view[offset:end])))
+            offset = end
+        return rst
+
+
+TypeObjSerializer.register_codec(JsonCodec())
+TypeObjSerializer.register_codec(MsgpackCodec())
@@ -0,0 +1,133 @@
+"""启动耗时分析
+
+记录命令行入口(smart_auto / smart_aaas)从进程启动到第一条数据的各阶段耗时, 可选 cProfile 输出;
+未启用时各记录函数为空操作
+"""
+import os, io, time, threading, contextlib, cProfile, pstats
+import multiprocessing as mp
+
+from .__logger import logger_utils as logger
+
+
+def process_start_ts():
+    """当前进程的启动时间戳, 仅支持Linux(/proc), 其他平台返回None
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except Exception:
+        return None
+
+
+class StartupProfile:
+    """启动阶段耗时记录(进程内单例)
+
+    phases: 阶段累计耗时(秒), 同名阶段多次执行时累加; 嵌套阶段(如parse中的loader)单独列出
+    marks: 事件距进程启动的时间(秒), 只记录第一次; first_item 可在fork模式的工作进程中记录, spawn模式的工作进程不记录
+    """
+    current:'StartupProfile' = None
+    # 是否等待记录第一条数据(Broadcast.send中检查)
+    wait_first_item = False
+
+    def __init__(self, name:str, cprofile_out:str=None) -> None:
+        self.name = name
+        self.start_ts = process_start_ts() or time.time()
+        self.phases = {}
+        self.marks = {}
+        self.cprofile_out = cprofile_out
+        # fork模式的工作进程共享第一条数据的发送时间
+        self._first_item_ts = mp.RawValue('d', 0.0)
+        self._profiler = cProfile.Profile() if cprofile_out else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, name:str, cprofile_out:str=None) -> 'StartupProfile':
+        """开始记录, 进程启动至今的耗时记为 imports 阶段
+
+        Args:
+            name (str): 入口名称
+            cprofile_out (str, optional): cProfile输出文件, .prof后缀输出二进制stats, 其他输出文本. Defaults to None.
+        """
+        profile = cls(name, cprofile_out=cprofile_out)
+        profile.phases['imports'] = round(time.time() - profile.start_ts, 6)
+        cls.current = profile
+        cls.wait_first_item = True
+        if profile._profiler:
+            profile._profiler.enable()
+        return profile
+
+    @classmethod
+    @contextlib.contextmanager
+    def phase(cls, name:str):
+        profile = cls.current
+        if profile is None:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            with profile._lock:
+                profile.phases[name] = round(profile.phases.get(name, 0) + time.time() - start, 6)
+
+    @classmethod
+    def mark(cls, name:str):
+        profile = cls.current
+        if profile is not None and name not in profile.marks:
+            profile.marks[name] = round(time.time() - profile.start_ts, 6)
+
+    @classmethod
+    def mark_first_item(cls):
+        cls.wait_first_item = False
+        profile = cls.current
+        if profile is not None and not profile._first_item_ts.value:
+            profile._first_item_ts.value = time.time()
+
+    @classmethod
+    def stop(cls) -> dict:
+        """结束记录, 输出cProfile结果
+
+        Returns:
+            dict: 启动耗时报告, 未启用时返回None
+        """
+        profile = cls.current
+        if profile is None:
+            return None
+        cls.current = None
+        cls.wait_first_item = False
+
+        if profile._profiler:
+            profile._profiler.disable()
+            profile.__dump_cprofile()
+
+        rst = profile.report()
+        logger.info('startup profile %s: %s', profile.name, rst)
+        return rst
+
+    def report(self) -> dict:
+        marks = dict(self.marks)
+        if self._first_item_ts.value:
+            marks['first_item'] = round(self._first_item_ts.value - self.start_ts, 6)
+        return {
+            'name': self.name,
+            'total': round(time.time() - self.start_ts, 6),
+            'phases': dict(self.phases),
+            'marks': marks,
+            'cprofile_out': self.cprofile_out
+        }
+
+    def __dump_cprofile(self):
+        out = self.cprofile_out
+        try:
+            if out.endswith('.prof'):
+                self._profiler.dump_stats(out)
+            else:
+                stream = io.StringIO()
+                pstats.Stats(self._profiler, stream=stream).sort_stats('cumulative').print_stats(50)
+                with open(out, 'w', encoding='utf8') as f:
+                    f.write(stream.getvalue())
+        except Exception as e:
+            logger.warning('startup profile dump %s error: %s', out, e)
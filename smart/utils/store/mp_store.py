@@ -1,4 +1,4 @@
-import functools
+import functools, os, copy, zlib, pickle, threading
 import multiprocessing as mp
 from multiprocessing.managers import SyncManager, DictProxy
 from threading import Lock
@@ -21,18 +21,218 @@ class MpState(ContextState):
         if isinstance(obj, DictProxy):
             obj[key] = val
 
+    @property
+    def state_proxy(self):
+        return self.__state
+
+    @property
+    def state_lock(self):
+        return self.__lock
+
+
+class MpStoreVersion:
+    """store 数据版本号, 保存在共享内存中; 写入方递增版本号, 读取方比较版本号判断本地缓存是否失效
+    按 key 分片, 降低无关数据写入导致的缓存失效
+    """
+    DEFAULT_SLOTS = 64
+
+    def __init__(self, slots:int=None):
+        self._versions = mp.Array('Q', slots or self.DEFAULT_SLOTS)
+
+    def slot(self, key) -> int:
+        # str.__hash__ 在不同进程的随机种子不同, 使用 crc32
+        return zlib.crc32(repr(key).encode('utf8')) % len(self._versions)
+
+    def get(self, slot:int) -> int:
+        return self._versions.get_obj()[slot]
+
+    def bump(self, slot:int):
+        with self._versions.get_lock():
+            self._versions.get_obj()[slot] += 1
+
+
+class _VersionCache:
+    """基于版本号的本地快照
+    """
+    def __init__(self, proxy, version:MpStoreVersion, version_key):
+        self._proxy = proxy
+        self._version = version
+        self._slot = version.slot(version_key)
+        self._cache_ver = None
+        self._cache = None
+
+    def _local(self) -> dict:
+        # 先读取版本号再读取数据, 写入方先写数据再递增版本号, 保证缓存不会错过更新
+        ver = self._version.get(self._slot)
+        if self._cache is None or self._cache_ver != ver:
+            self._cache = self._proxy.copy()
+            self._cache_ver = ver
+        return self._cache
+
+    def _bump(self):
+        self._cache = None
+        self._version.bump(self._slot)
+
+    def __getstate__(self):
+        _dict = self.__dict__.copy()
+        _dict.update(_cache=None, _cache_ver=None)
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+def _safe_cache_val(val):
+    # 防止调用方修改返回值导致本地缓存被污染
+    return copy.deepcopy(val) if isinstance(val, (dict, list, set)) else val
+
+
+class CachedMpState(MpState):
+    """带本地读缓存的 MpState; 读操作使用本地快照, 写操作递增共享版本号使其它进程的缓存失效
+    """
+    __MISSING = object()
+
+    def __init__(self, mp_state:MpState, version:MpStoreVersion, version_key):
+        MpState.__init__(self, mp_state.name, mp_state.state_proxy, lock=mp_state.state_lock)
+        self._version_cache = _VersionCache(mp_state.state_proxy, version, version_key)
+
+    def __local_state(self) -> ContextState:
+        return ContextState(self.name, state=self._version_cache._local())
+
+    def get(self, key_path, default_val=None):
+        return _safe_cache_val(self.__local_state().get(key_path, default_val))
+
+    def set(self, key_path, value):
+        rst = MpState.set(self, key_path, value)
+        self._version_cache._bump()
+        return rst
+
+    def delete(self, key_path):
+        rst = MpState.delete(self, key_path)
+        self._version_cache._bump()
+        return rst
+
+    def get_or_set(self, key_path, default_val):
+        val = self.__local_state().get(key_path, self.__MISSING)
+        if val is not self.__MISSING:
+            return _safe_cache_val(val)
+        rst = MpState.get_or_set(self, key_path, default_val)
+        self._version_cache._bump()
+        return rst
+
+    def get_or_set_fn(self, key_path, val_fn):
+        val = self.__local_state().get(key_path, self.__MISSING)
+        if val is not self.__MISSING:
+            return _safe_cache_val(val)
+        rst = MpState.get_or_set_fn(self, key_path, val_fn)
+        self._version_cache._bump()
+        return rst
+
+    def set_fn(self, key_path, val_fn):
+        rst = MpState.set_fn(self, key_path, val_fn)
+        self._version_cache._bump()
+        return rst
+
+
+class CachedDictProxy(_VersionCache):
+    """带本地读缓存的 DictProxy; 读操作使用本地快照, 写操作递增共享版本号使其它进程的缓存失效
+    """
+    def __init__(self, proxy:DictProxy, version:MpStoreVersion, version_key):
+        _VersionCache.__init__(self, proxy, version, version_key)
+
+    @property
+    def proxy(self) -> DictProxy:
+        return self._proxy
+
+    def get(self, key, default_val=None):
+        return _safe_cache_val(self._local().get(key, default_val))
+
+    def __getitem__(self, key):
+        return _safe_cache_val(self._local()[key])
+
+    def __contains__(self, key):
+        return key in self._local()
+
+    def __len__(self):
+        return len(self._local())
+
+    def __iter__(self):
+        return iter(list(self._local().keys()))
+
+    def keys(self):
+        return list(self._local().keys())
+
+    def values(self):
+        return [_safe_cache_val(v) for v in self._local().values()]
+
+    def items(self):
+        return [(k, _safe_cache_val(v)) for k, v in self._local().items()]
+
+    def copy(self):
+        return copy.deepcopy(self._local())
+
+    def __setitem__(self, key, val):
+        self._proxy[key] = val
+        self._bump()
+
+    def __delitem__(self, key):
+        del self._proxy[key]
+        self._bump()
+
+    def update(self, *args, **kwargs):
+        self._proxy.update(*args, **kwargs)
+        self._bump()
+
+    def pop(self, *args):
+        rst = self._proxy.pop(*args)
+        self._bump()
+        return rst
+
+    def setdefault(self, key, default_val=None):
+        if key in self._local():
+            return self.get(key)
+        rst = self._proxy.setdefault(key, default_val)
+        self._bump()
+        return rst
+
+    def clear(self):
+        self._proxy.clear()
+        self._bump()
+
+    def __repr__(self):
+        return 'CachedDictProxy(' + repr(self._local()) + ')'
+
 
 class MpContextStore(BaseContextStore):
-    def __init__(self):
+    def __init__(self, cache:bool=False, version:MpStoreVersion=None):
+        """多进程 store, 数据保存在 SyncManager 进程
+
+        Keyword Arguments:
+            cache {bool} -- state/dict 是否启用本地读缓存; 启用后各进程读取数据使用本地快照, 直到写入方更新共享版本号 (default: {False})
+            version {MpStoreVersion} -- cache=True时使用的共享版本号, None表示新建 (default: {None})
+        """
         BaseContextStore.__init__(self)
 
         manager = SyncManager()
 
         self._manager = manager
         manager.start()
+        self._manager_address = manager.address
         
         self.__store = manager.dict()
         self.__store_lock = manager.RLock()
+        self._version = (version or MpStoreVersion()) if cache else None
+        self.__reset_local()
+
+    def __reset_local(self):
+        # 进程内缓存 store 对象的代理句柄, 避免每次访问都向 SyncManager 请求
+        self._local_pid = os.getpid()
+        self._local_handles = {}
+
+    def __local_handles(self) -> dict:
+        if self._local_pid != os.getpid():
+            self.__reset_local()
+        return self._local_handles
     
     @property
     def store_dict(self):
@@ -41,11 +241,29 @@ class MpContextStore(BaseContextStore):
     @property
     def manager(self):
         if self._manager is None:
-            self._manager = mp.Manager()
+            if self._manager_address:
+                # 反序列化后(spawn 模式的工作进程)连接原 SyncManager 进程, 使新建的 state/dict 对所有进程可见
+                manager = SyncManager(address=self._manager_address)
+                manager.connect()
+                self._manager = manager
+            else:
+                self._manager = mp.Manager()
 
         return self._manager
     
-    def __store_get(self, key, val_fn, val_fn_args=None):
+    def __store_get(self, key, val_fn, val_fn_args=None, wrap_fn=None):
+        handles = self.__local_handles()
+        val = handles.get(key)
+
+        if val is None:
+            val = self.__store_get_remote(key, val_fn, val_fn_args)
+            if wrap_fn is not None:
+                val = wrap_fn(val, key)
+            handles[key] = val
+
+        return val
+
+    def __store_get_remote(self, key, val_fn, val_fn_args=None):
         val = self.__store.get(key)
 
         if val is None:
@@ -73,14 +291,20 @@ class MpContextStore(BaseContextStore):
             # lock = self.lock(('__state__', name))
         )
 
+    def __wrap_state(self, state:MpState, key):
+        return CachedMpState(state, self._version, key) if self._version else state
+
+    def __wrap_dict(self, _dict:DictProxy, key):
+        return CachedDictProxy(_dict, self._version, key) if self._version else _dict
+
     def state(self, name) -> MpState:
-        return self.__store_get((StoreTypes.state.key_ns, name), self.__new_state, (name,))
+        return self.__store_get((StoreTypes.state.key_ns, name), self.__new_state, (name,), wrap_fn=self.__wrap_state)
     
     def list(self, name) -> list:
         return self.__store_get((StoreTypes.list.key_ns, name), self.manager.list)
     
     def dict(self, name) -> dict:
-        return self.__store_get((StoreTypes.dict.key_ns, name), self.manager.dict)
+        return self.__store_get((StoreTypes.dict.key_ns, name), self.manager.dict, wrap_fn=self.__wrap_dict)
     
     def lock(self, name) -> Lock:
         return self.__store_get((StoreTypes.lock.key_ns, name), self.manager.RLock)
@@ -104,11 +328,154 @@ class MpContextStore(BaseContextStore):
         """spawn 模式的多进程会使用 pickle 序列化本实例, 但 SyncManager 不是 pickable 对象, 需排除
         """
         _dict = self.__dict__.copy()
-        _dict.update(_manager=None)
+        _dict.update(_manager=None, _local_pid=None, _local_handles={})
         return _dict
     
     def __setstate__(self, state):
         self.__dict__.update(state)
     
     def close(self):
-        self.manager.shutdown()
\ No newline at end of file
+        self.manager.shutdown()
+
+
+class LazyMpContextStore(BaseContextStore):
+    """延迟启动 SyncManager 的多进程 store
+
+    首次调用 state/list/dict/lock/value 等接口时才启动 SyncManager 进程(MpContextStore);
+    工作进程中首次调用且 SyncManager 尚未启动时, 通知创建本实例的进程启动 SyncManager, 再通过共享内存读取其连接信息
+    """
+    # 共享 MpContextStore 连接信息(pickle)的缓冲区大小
+    BUFFER_SIZE = 8192
+
+    def __init__(self, cache:bool=False, timeout:float=30):
+        """构造函数
+
+        Keyword Arguments:
+            cache {bool} -- 同 MpContextStore (default: {False})
+            timeout {float} -- 工作进程等待 SyncManager 启动的超时时间(秒) (default: {30})
+        """
+        BaseContextStore.__init__(self)
+
+        self.cache = cache
+        self.timeout = timeout
+        self._owner_pid = os.getpid()
+        self._store:MpContextStore = None
+        self._version = MpStoreVersion() if cache else None
+        self._requested = mp.Event()
+        self._ready = mp.Event()
+        self._buffer = mp.RawArray('c', self.BUFFER_SIZE)
+        self._buffer_len = mp.RawValue('i', 0)
+        self._closed = False
+        self.__reset_local()
+
+        threading.Thread(target=self.__serve_request, name='LazyMpContextStore', daemon=True).start()
+
+    def __reset_local(self):
+        self._local_pid = os.getpid()
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        """SyncManager 是否已启动"""
+        return self._store is not None or self._ready.is_set()
+
+    @property
+    def store(self) -> MpContextStore:
+        if self._local_pid != os.getpid():
+            self.__reset_local()
+
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    if os.getpid() == self._owner_pid:
+                        self._store = self.__start()
+                    else:
+                        self._store = self.__connect()
+
+        return self._store
+
+    def __start(self) -> MpContextStore:
+        if self._closed:
+            raise RuntimeError('LazyMpContextStore is closed')
+
+        store = MpContextStore(cache=self.cache, version=self._version)
+        logger_utils.debug('LazyMpContextStore start SyncManager %s', store._manager_address)
+
+        # MpStoreVersion 只能通过进程继承共享, 由各进程的本实例提供
+        state = store.__getstate__()
+        state['_version'] = None
+        data = pickle.dumps(state)
+
+        if len(data) > len(self._buffer):
+            logger_utils.warning('LazyMpContextStore store info is too large: %s', len(data))
+        else:
+            self._buffer[:len(data)] = data
+            self._buffer_len.value = len(data)
+
+        self._ready.set()
+        return store
+
+    def __connect(self) -> MpContextStore:
+        if not self._ready.is_set():
+            self._requested.set()
+
+            if not self._ready.wait(self.timeout):
+                raise TimeoutError('LazyMpContextStore wait SyncManager timeout')
+
+        if not self._buffer_len.value:
+            raise RuntimeError('LazyMpContextStore store info is unavailable')
+
+        store = MpContextStore.__new__(MpContextStore)
+        store.__setstate__(pickle.loads(self._buffer[:self._buffer_len.value]))
+        store._version = self._version
+        return store
+
+    def __serve_request(self):
+        # 在创建进程中等待工作进程的启动请求
+        self._requested.wait()
+
+        if self._closed or self._store is not None:
+            return
+
+        try:
+            self.store
+        except Exception as e:
+            logger_utils.error('LazyMpContextStore start SyncManager fail: %s', e)
+
+    def state(self, name) -> MpState:
+        return self.store.state(name)
+
+    def list(self, name) -> list:
+        return self.store.list(name)
+
+    def dict(self, name) -> dict:
+        return self.store.dict(name)
+
+    def lock(self, name) -> Lock:
+        return self.store.lock(name)
+
+    def _value(self, name) -> ContextValue:
+        return self.store._value(name)
+
+    def get_names(self, type:StoreTypes):
+        return self.store.get_names(type)
+
+    def __getstate__(self):
+        _dict = self.__dict__.copy()
+        _dict.update(_lock=None, _local_pid=None)
+        return _dict
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def close(self):
+        if os.getpid() != self._owner_pid:
+            return
+
+        with self._lock:
+            self._closed = True
+            # 唤醒等待请求的线程
+            self._requested.set()
+
+            if self._store is not None:
+                self._store.close()
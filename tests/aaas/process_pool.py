@@ -0,0 +1,105 @@
+# python3 -m tests.aaas.process_pool reuse_pool --max_tasks=3
+# python3 -m tests.aaas.process_pool worker_snapshot
+# python3 -m tests.aaas.process_pool worker_sigint
+# 启动复用工作进程的aaas服务: python3 -m smart.aaas.run --port=8080 --reuse_worker=1 --env.AAAS_WORKER_MAX_TASKS=50
+import os, sys, io, signal
+import multiprocessing as mp
+
+from smart.utils import AppEnv
+from smart.aaas.process_pool import ReusePool, WorkerLostError, recycle_current_worker
+from smart.aaas import auto_manage as auto_manage_mod
+from smart.aaas.auto_manage import WorkerSnapshot, AutoManage
+from smart.aaas.task_registry import TaskRegistry
+
+from tests.aaas import logger
+
+
+def _pool_fn(x):
+    if x == 'crash':
+        os._exit(3)
+    if x == 'recycle':
+        recycle_current_worker()
+    return x, os.getpid()
+
+
+def test_reuse_pool(processes:int=2, max_tasks:int=3, num_task:int=6):
+    pool = ReusePool(processes, max_tasks=max_tasks)
+
+    results = [pool.apply_async(_pool_fn, (i, )).get(10) for i in range(num_task)]
+    pids = set(pid for _, pid in results)
+    logger.info('test_reuse_pool results: %s', results)
+    # 工作进程被复用, 达到 max_tasks 后回收
+    assert len(pids) < num_task
+
+    errors = []
+    crash_rst = pool.apply_async(_pool_fn, ('crash', ), error_callback=errors.append)
+    crash_rst.wait(10)
+    assert crash_rst.ready() and not crash_rst.successful()
+    assert isinstance(errors[0], WorkerLostError)
+
+    _, pid = pool.apply_async(_pool_fn, ('recycle', )).get(10)
+    _, pid2 = pool.apply_async(_pool_fn, (0, )).get(10)
+    logger.info('test_reuse_pool recycle pid: %s, %s', pid, pid2)
+
+    pool.close()
+    pool.join()
+    assert not mp.active_children()
+
+
+def test_worker_snapshot():
+    AppEnv.set('TEST_SNAPSHOT', 1)
+    WorkerSnapshot.capture()
+
+    # 模拟任务修改进程状态
+    AppEnv.clean()
+    AppEnv.set('TEST_SNAPSHOT_TASK', 1)
+    os.environ['TEST_SNAPSHOT_ENV'] = '1'
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+
+    WorkerSnapshot.restore()
+
+    assert sys.stdout is stdout
+    assert AppEnv.get('TEST_SNAPSHOT') == 1 and AppEnv.get('TEST_SNAPSHOT_TASK') is None
+    assert 'TEST_SNAPSHOT_ENV' not in os.environ
+    logger.info('test_worker_snapshot ok')
+
+
+def test_worker_sigint():
+    auto_manage = AutoManage()
+    auto_manage.tasks = registry = TaskRegistry()
+
+    def _interrupted():
+        try:
+            auto_manage._on_worker_sigint(signal.SIGINT, None)
+        except KeyboardInterrupt:
+            return True
+        return False
+
+    try:
+        # 空闲的工作进程忽略中断信号
+        assert not _interrupted()
+
+        # 前一个任务的结束信号到达时, 工作进程已在运行下一个任务
+        registry.put('test', {'task_id': 'task-1', 'end_flag': 1})
+        registry.put('test', {'task_id': 'task-2'})
+        auto_manage_mod._worker_running_task[0] = ('test', 'task-2')
+        assert not _interrupted()
+
+        auto_manage_mod._worker_running_task[0] = ('test', 'task-1')
+        assert _interrupted()
+        logger.info('test_worker_sigint ok')
+    finally:
+        auto_manage_mod._worker_running_task[0] = None
+        registry.close()
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
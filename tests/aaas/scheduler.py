@@ -0,0 +1,107 @@
+# python3 -m tests.aaas.scheduler fair_share
+# python3 -m tests.aaas.scheduler ns_limit --max_running=1 --max_queued=3
+# python3 -m tests.aaas.scheduler dispatch_closed_pool
+# 查看调度指标: curl 'http://127.0.0.1/auto/scheduler_metrics'
+from smart.aaas.scheduler import TaskScheduler
+from smart.aaas.auto_manage import AutoManage
+from smart.aaas.process_pool import ReusePool
+from smart.aaas.task_registry import TaskRegistry
+from smart.aaas.base import AutoTaskDoneFlag
+
+from tests.aaas import logger
+
+
+def _drain(scheduler:TaskScheduler, num_step:int):
+    # 模拟运行: 每步分派至运行名额用完, 再结束最早的一个任务
+    order, running = [], []
+    for _ in range(num_step):
+        while True:
+            task_info = scheduler.next_task()
+            if task_info is None:
+                break
+            order.append(task_info['task_id'])
+            running.append(task_info)
+        if not running:
+            break
+        scheduler.on_done(running.pop(0)['task_ns'])
+    return order
+
+
+def test_fair_share(num_task:int=30):
+    scheduler = TaskScheduler(2, config={
+        'namespaces': {
+            'batch': {'weight': 1},
+            'online': {'weight': 3},
+        }
+    })
+    for i in range(num_task):
+        scheduler.submit({'task_ns': 'batch', 'task_id': 'batch-%d' % i})
+    for i in range(num_task):
+        scheduler.submit({'task_ns': 'online', 'task_id': 'online-%d' % i, 'priority': 1 if i == num_task - 1 else 0})
+
+    order = _drain(scheduler, num_task)
+    logger.info('test_fair_share order: %s', order)
+
+    # 高优先级任务最先分派
+    assert order.index('online-%d' % (num_task - 1)) < order.index('online-0')
+    # online 权重为 batch 的3倍, 两者同时排队时分得约3倍的运行名额
+    first = order[:20]
+    num_online = sum(1 for task_id in first if task_id.startswith('online'))
+    assert num_online >= 3 * (len(first) - num_online) - 2, first
+    logger.info('test_fair_share metrics: %s', scheduler.metrics())
+
+
+def test_ns_limit(max_running:int=1, max_queued:int=3):
+    scheduler = TaskScheduler(4, config={
+        'default': {'max_running': max_running, 'max_queued': max_queued}
+    })
+    accepted = [scheduler.submit({'task_ns': 'a', 'task_id': i}) for i in range(max_queued + 2)]
+    # 超出 max_queued 的任务被拒绝
+    assert accepted.count(False) == 2
+
+    tasks = [scheduler.next_task() for _ in range(3)]
+    assert sum(1 for t in tasks if t is not None) == max_running
+
+    scheduler.on_done('a')
+    assert scheduler.next_task() is not None
+
+    metrics = scheduler.metrics()
+    logger.info('test_ns_limit metrics: %s', metrics)
+    assert metrics['namespaces']['a']['rejected'] == 2
+    assert metrics['namespaces']['a']['running'] == max_running
+
+
+def test_dispatch_closed_pool(num_task:int=3):
+    # 服务退出时进程池已关闭, 结果处理线程中分派的任务按中断结束
+    auto_manage = AutoManage()
+    auto_manage.tasks = registry = TaskRegistry()
+    auto_manage.scheduler = TaskScheduler(1)
+    auto_manage.mp_pool = pool = ReusePool(1)
+    pool.close()
+    pool.join()
+
+    try:
+        for i in range(num_task):
+            task_info = {'task_ns': 'a', 'task_id': 'task-%d' % i, 'module': None, 'name': None, 'run_opts': {}}
+            registry.put('a', dict(task_info))
+            auto_manage.scheduler.submit(task_info)
+        auto_manage._dispatch_tasks()
+
+        for i in range(num_task):
+            assert registry.get('a', 'task-%d' % i)['done_flag'] == AutoTaskDoneFlag.interrupt.flag_value
+        metrics = auto_manage.scheduler.metrics()
+        logger.info('test_dispatch_closed_pool metrics: %s', metrics)
+        assert metrics['running'] == 0 and metrics['queued'] == 0
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
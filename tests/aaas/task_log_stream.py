@@ -0,0 +1,111 @@
+# python3 -m tests.aaas.task_log_stream sse_parse
+# python3 -m tests.aaas.task_log_stream log_stream --num_line=20
+# python3 -m tests.aaas.task_log_stream client_reconnect
+import os, time, threading, socketserver
+from tempfile import mkstemp
+from urllib.parse import urlsplit, parse_qs
+
+from smart.aaas.client import iter_sse_events, AaasClient
+from smart.aaas.task_log.stream import sse_event, TaskLogStream
+from smart.aaas.utils.task_info import AaasTaskInfoTool
+from smart.utils.file.watch import FileWatcher
+
+from tests.aaas import logger
+
+
+def test_sse_parse():
+    data = sse_event('log', '多行\n日志\n', 12) + TaskLogStream.PING + sse_event('end', {'done_flag': 1})
+    # 按1字节分块, 模拟数据分多次到达
+    events = list(iter_sse_events(data[i:i+1] for i in range(len(data))))
+    assert events == [('log', '多行\n日志\n', '12'), ('end', {'done_flag': 1}, None)]
+
+
+def test_log_stream(num_line:int=20):
+    fd, file_path = mkstemp()
+    writer = os.fdopen(fd, 'w', buffering=1)
+    task_info_map = {
+        'task-1': {'task_id': 'task-1', 'stage': ['start'], 'task_log': {'file_path': file_path}}
+    }
+
+    def _write_fn():
+        for i in range(num_line):
+            writer.write('line-{}\n'.format(i))
+            time.sleep(0.01)
+        # 不完整的最后一行
+        writer.write('last')
+        writer.flush()
+        task_info_map['task-1'] = dict(task_info_map['task-1'], stage=['start', 'end'], done_flag=1, done_time=time.time())
+        FileWatcher.default().notify(file_path)
+
+    threading.Thread(target=_write_fn).start()
+    log_stream = TaskLogStream('task-1', None, AaasTaskInfoTool(task_info_map), max_time=10, heartbeat=0.5)
+    events = list(iter_sse_events(log_stream.events()))
+    writer.close()
+
+    logs = [data for event, data, _ in events if event == 'log']
+    end_event, end_data, _ = events[-1]
+    logger.info('test_log_stream logs=%d, end=%s', len(logs), end_data)
+    assert logs == ['line-{}\n'.format(i) for i in range(num_line)] + ['last']
+    assert end_event == 'end' and end_data['done_flag'] == 1
+    assert end_data['log_offset'] == os.path.getsize(file_path)
+
+    # 从中间位置继续读取
+    offset = int(events[num_line // 2 - 1][2])
+    log_stream = TaskLogStream('task-1', None, AaasTaskInfoTool(task_info_map), log_offset=offset)
+    logs = [data for event, data, _ in iter_sse_events(log_stream.events()) if event == 'log']
+    os.remove(file_path)
+    assert logs[0] == 'line-{}\n'.format(num_line // 2)
+
+
+class _DropStreamHandler(socketserver.StreamRequestHandler):
+    """模拟服务端: 第1个连接发送一行后断开, 第2个连接发送一行后停止发送数据, 第3个连接发送最后一行及结束事件"""
+    def handle(self):
+        path = self.rfile.readline().decode().split()[1]
+        while self.rfile.readline().strip():
+            pass
+        conn_idx = len(self.server.offsets)
+        self.server.offsets.append(int(parse_qs(urlsplit(path).query)['log_offset'][0]))
+
+        line = 'line-{}\n'.format(conn_idx)
+        data = sse_event('log', line, 7 * (conn_idx + 1))
+        if conn_idx < 2:
+            # 声明的长度大于发送的数据, 连接断开时客户端读取异常
+            self.wfile.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nContent-Length: 100000\r\n\r\n' + data)
+            self.wfile.flush()
+            if conn_idx == 1:
+                time.sleep(self.server.stall_time)
+            return
+        data += sse_event('end', {'done_flag': 1, 'log_offset': 21})
+        self.wfile.write(b'HTTP/1.0 200 OK\r\nContent-Type: text/event-stream\r\n\r\n' + data)
+
+
+def test_client_reconnect(heartbeat:float=0.2):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _DropStreamHandler)
+    server.daemon_threads = True
+    server.offsets = []
+    server.stall_time = 3 * heartbeat + 3
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        client = AaasClient('127.0.0.1:{}'.format(server.server_address[1]), retry_interval=0.1)
+        events = list(client.task_log_stream('task-1', heartbeat=heartbeat))
+        logger.info('test_client_reconnect offsets=%s, events=%s', server.offsets, events)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # 连接断开及读取超时后, 从最后收到的位置重新连接
+    assert server.offsets == [0, 7, 14]
+    assert [data for event, data, _ in events if event == 'log'] == [b'line-0\n', b'line-1\n', b'line-2\n']
+    assert events[-1][0] == 'end' and events[-1][2] == 21
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
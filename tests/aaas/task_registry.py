@@ -0,0 +1,83 @@
+# python3 -m tests.aaas.task_registry registry --num_task=10000
+# python3 -m tests.aaas.task_registry stripe_lock --num_process=4 --num_incr=200
+import time
+import multiprocessing as mp
+
+from smart.aaas.task_registry import TaskRegistry, NsTaskDict, TaskState
+
+from tests.aaas import logger
+
+
+def _task_info(idx, done_time=None):
+    task_info = {
+        'task_id': 'task-%d' % idx,
+        'task_ns': 'test',
+        'create_time': time.time(),
+    }
+    if done_time:
+        task_info.update(done_flag=1, done_time=done_time, process={'pid': 0})
+    return task_info
+
+
+def test_registry(num_task:int=1000):
+    registry = TaskRegistry()
+    task_dict = NsTaskDict(registry, 'test')
+    expire_ts = time.time() - 100
+
+    try:
+        for i in range(num_task):
+            # 前一半任务已过期, 最后一个任务未结束
+            done_time = None if i == num_task - 1 else (expire_ts - 1 if i < num_task // 2 else time.time())
+            task_dict['task-%d' % i] = _task_info(i, done_time)
+
+        assert registry.create('test', _task_info(0))['task_id'] == 'task-0'
+        assert len(task_dict) == num_task
+        assert list(task_dict.keys())[:2] == ['task-0', 'task-1']
+        assert registry.task_ids('test', state=TaskState.queued) == ['task-%d' % (num_task - 1)]
+        assert 'test' in registry.namespaces()
+
+        start_ts = time.time()
+        clean_ids = registry.clean_expired('test', expire_ts)
+        logger.info('test_registry clean %d tasks, %.3fs', len(clean_ids), time.time() - start_ts)
+        assert len(clean_ids) == num_task // 2
+        assert task_dict.get('task-0') is None and len(task_dict) == num_task - num_task // 2
+    finally:
+        registry.close()
+
+
+def _incr_fn(registry:TaskRegistry, num_incr:int):
+    task_dict = NsTaskDict(registry, 'test')
+    for _ in range(num_incr):
+        with task_dict.lock('counter'):
+            task_info = task_dict.get('counter')
+            task_info['num'] += 1
+            task_dict['counter'] = task_info
+
+
+def test_stripe_lock(num_process:int=4, num_incr:int=200):
+    registry = TaskRegistry()
+    registry.put('test', {'task_id': 'counter', 'num': 0})
+
+    try:
+        processes = [mp.Process(target=_incr_fn, args=(registry, num_incr)) for _ in range(num_process)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+
+        num = registry.get('test', 'counter')['num']
+        logger.info('test_stripe_lock num=%d', num)
+        assert num == num_process * num_incr
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
@@ -0,0 +1,43 @@
+# python -m tests.auto.bench test_bench_smoke
+# python -m tests.auto.bench test_bench_smoke --scenarios='*.thread.*'
+import json
+from smart.auto.bench import BenchScenario, bench_run, bench_compare
+from tests.auto import logger
+
+
+def test_scenario_names():
+    assert BenchScenario.match_names('linear') == [
+        'linear.thread.unbounded', 'linear.thread.bounded', 'linear.process.unbounded', 'linear.process.bounded']
+    assert BenchScenario.match_names('*.thread.bounded,join.process.*') == [
+        'linear.thread.bounded', 'fanout.thread.bounded', 'join.thread.bounded',
+        'join.process.unbounded', 'join.process.bounded']
+    assert BenchScenario.match_names('linear.pool.unbounded') == ['linear.pool.unbounded']
+
+    tree = BenchScenario('fanout', fan_out=2, bounded=True, max_queue_size=10).build_tree()
+    assert list(tree.keys()) == ['bench.source(bench_cfg.source)~send', 'bench.sink$1', 'bench.sink$2']
+    assert tree['bench.sink$1']['max_queue_size'] == 10
+
+
+def test_bench_smoke(scenarios=None, size:int=500):
+    report = bench_run(scenarios, size=size, fan_out=2)
+    for rst in report['results']:
+        assert rst.get('complete'), rst
+        assert rst['latency_p50'] <= rst['latency_p99']
+
+    rows = bench_compare(report, report)
+    assert all(not row['regression'] for row in rows)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
@@ -0,0 +1,104 @@
+# python -m tests.auto.exec.worker.test_pool test_pool
+# python -m tests.auto.exec.worker.test_pool test_pool_kill
+# python -m tests.auto.exec.worker.test_pool test_pool_preload
+import time, sys, os, fractions
+import multiprocessing as mp
+
+from smart.auto.exec.worker.PoolWorker import *
+from tests.auto import logger
+
+# fork 模式下创建的 mp 对象不能发送给进程池, 测试数据使用 spawn 上下文创建
+_mp_ctx = mp.get_context('spawn')
+
+
+def foo(counter, n=3, sleep=0.1):
+    logger.info("Start foo pid=%s, n=%s", os.getpid(), n)
+
+    for i in range(n):
+        time.sleep(sleep)
+        with counter.get_lock():
+            counter.value += 1
+
+
+def test_pool(num_run=3, num_worker=2, n=3, sleep=0.1, joinTimeout=2):
+    counter = _mp_ctx.Value('i', 0)
+    pids = set()
+
+    for run_idx in range(num_run):
+        ts_begin = time.time()
+        workers = [PoolWorker(foo, args=(counter,), kwargs={'n': n, 'sleep': sleep}) for _ in range(num_worker)]
+        for worker in workers:
+            worker.start()
+        logger.info("run %s started in %.4fs, idents: %s", run_idx, time.time() - ts_begin, [w.ident for w in workers])
+
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(joinTimeout)
+            assert worker.exitcode == 0
+            pids.add(worker.ident)
+
+    assert counter.value == num_run * num_worker * n, counter.value
+    logger.info('test_pool end, pids: %s', pids)
+    get_worker_pool().close()
+
+
+def test_pool_kill(sleep=10):
+    counter = _mp_ctx.Value('i', 0)
+    worker = PoolWorker(foo, args=(counter,), kwargs={'n': 1, 'sleep': sleep})
+    worker.start()
+    time.sleep(1)
+    worker.forceStop()
+    worker.join(5)
+    logger.info("worker(after kill) ident: %s, is_alive: %s, exitcode: %s", worker.ident, worker.is_alive(), worker.exitcode)
+    assert not worker.is_alive() and worker.exitcode
+    get_worker_pool().close()
+
+
+class _MockPod:
+    """模拟 TaskPod, 任务类模块为 fractions"""
+    def all_task_obj(self):
+        yield fractions.Fraction(1)
+
+    def run_task(self):
+        pass
+
+
+def check_module(flag, module):
+    flag.value = int(module in sys.modules)
+
+
+def test_pool_preload(joinTimeout=5):
+    pool = get_worker_pool()
+    pool.close()
+    os.environ['AUTO_WORKER_POOL_SIZE'] = '1'
+    pool = get_worker_pool()
+    flag = _mp_ctx.Value('i', 0)
+
+    try:
+        worker = PoolWorker(_MockPod().run_task)
+        worker.start()
+        worker.join(joinTimeout)
+        assert 'fractions' in pool.preload
+
+        # 同一个常驻进程已预先导入任务类模块
+        worker2 = PoolWorker(check_module, args=(flag, 'fractions'))
+        worker2.start()
+        worker2.join(joinTimeout)
+        assert worker2.ident == worker.ident and flag.value == 1
+    finally:
+        os.environ.pop('AUTO_WORKER_POOL_SIZE', None)
+        pool.close()
+
+
+if __name__ == "__main__":
+    # fork 模式下创建的 mp 对象不能发送给进程池
+    mp.set_start_method('spawn', True)
+
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
@@ -1,4 +1,4 @@
-import pprint, json
+import pprint, json, time, sys, subprocess, tempfile
 
 from smart.utils import AppEnv
 from smart.utils.yaml import yaml_dumps
@@ -46,6 +46,67 @@ def test_if(env_val='val_case1', module=None):
     __test_parse(module)
     
 
+def test_cache(module=None, num:int=100, cache_dir:str=None):
+    module = module or DEFAULT_MODULE
+    # yml 的 __if__/__template__ 读取的环境变量, 避免受其他测试设置的值影响
+    prev_env = dict(AppEnv.all(False))
+    prev_opts = (AutoYmlCache.Opt_Enable, AutoYmlCache.Opt_Cache_Dir)
+    AppEnv.update({key: None for key in ('VOCAB_FILE_NAME', 'TEST_IF_ENV')})
+    AppEnv.set('WORK_PATH', '/home/app')
+    AppEnv.set('MODEL_DIR', 'dataset/bert/chinese_L-12_H-768_A-12')
+    AutoYmlCache.Opt_Cache_Dir = cache_dir
+
+    costs = {}
+    try:
+        for enable in (False, True):
+            AutoYmlCache.Opt_Enable = enable
+            AutoYmlCache.clear()
+            start_ts = time.time()
+            for _ in range(num):
+                auto_obj = create_auto_yml_parser_by_module_path(module).auto_obj
+            costs[enable] = (time.time() - start_ts) / num
+            if not enable:
+                no_cache_obj = auto_obj
+    finally:
+        AutoYmlCache.Opt_Enable, AutoYmlCache.Opt_Cache_Dir = prev_opts
+        AutoYmlCache.clear()
+        AppEnv.clean()
+        AppEnv.update(prev_env)
+
+    assert auto_obj == no_cache_obj
+    print('parse cost(ms): no_cache={:.3f}, cache={:.3f}'.format(costs[False]*1000, costs[True]*1000))
+
+
+_LAZY_LOAD_SCRIPT = """
+import sys, json
+from smart.auto.loader.AutoLoader import AutoLoader
+from smart.auto.parser.auto_yml import create_auto_yml_parser_by_module_path, AutoYmlCache
+from smart.utils.loader import get_import_path
+AutoYmlCache.Opt_Enable = False
+AutoLoader.Opt_Lazy, AutoLoader.Opt_Manifest_Dir = sys.argv[1] == '1', sys.argv[2]
+tasks = create_auto_yml_parser_by_module_path(sys.argv[3]).auto_obj.get('tasks') or {}
+for task in tasks.values():
+    if task.get('class') and not isinstance(task['class'], str):
+        task['class'] = get_import_path(task['class'])
+print(json.dumps({'tasks': tasks, 'modules': len(sys.modules)}, sort_keys=True, default=str))
+"""
+
+
+def test_lazy_load(module='auto_tasks.tasks'):
+
+    def _parse(lazy, manifest_dir):
+        out = subprocess.check_output([sys.executable, '-c', _LAZY_LOAD_SCRIPT, lazy, manifest_dir, module])
+        return json.loads(out.decode('utf8').strip().splitlines()[-1])
+
+    with tempfile.TemporaryDirectory() as manifest_dir:
+        eager = _parse('0', manifest_dir)
+        _parse('1', manifest_dir)
+        lazy = _parse('1', manifest_dir)
+
+    assert eager['tasks'] == lazy['tasks']
+    print('imported modules: eager={}, lazy={}'.format(eager['modules'], lazy['modules']))
+
+
 if __name__ == "__main__":
     _d, component = dict(globals()).items(), {}
     for k, v in _d:
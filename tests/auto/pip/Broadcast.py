@@ -0,0 +1,98 @@
+# python -m tests.auto.pip.Broadcast test_fanout_bench
+### Compare serialize once and per pip serialize
+# python -m tests.auto.pip.Broadcast test_fanout_bench --fan_out=8 --payload_size=10240 --serialize_once=False
+### Shared memory pipes
+# python -m tests.auto.pip.Broadcast test_fanout_bench --fan_out=8 --pip_type=shm
+import time, json
+import multiprocessing as mp
+from smart.auto.pip import Broadcast, QueuePip
+from smart.auto.pip.cmd import end_cmd
+from tests.auto import logger
+
+
+def _mock_item(i, payload_size):
+    return {
+        'i': i,
+        'ts': time.time(),
+        'tags': ['t' + str(j) for j in range(8)],
+        'text': 'x' * payload_size,
+    }
+
+
+def _recv_count(pip:QueuePip, num_item:int):
+    count = 0
+    for _ in pip.recv():
+        count += 1
+    assert count == num_item, 'recv {} items, expect {}'.format(count, num_item)
+
+
+def _pip_fn_builder(pip_type):
+    if pip_type == 'shm':
+        from smart.auto.pip.ShmRingQueue import ShmRingPip
+        return lambda: ShmRingPip()
+    return lambda: QueuePip(queue=mp.Queue())
+
+
+def _run_fanout(fan_out:int, num_item:int, payload_size:int, serialize_once:bool, pip_type:str):
+    broadcast = Broadcast(pip_fn=_pip_fn_builder(pip_type), serialize_once=serialize_once)
+    pips = [broadcast.create_pip() for _ in range(fan_out)]
+    workers = [mp.Process(target=_recv_count, args=(pip, num_item)) for pip in pips]
+    for worker in workers:
+        worker.start()
+
+    items = [_mock_item(i, payload_size) for i in range(num_item)]
+    ts_begin = time.time()
+    for item in items:
+        broadcast.send(item)
+    send_during = time.time() - ts_begin
+    broadcast.send(end_cmd)
+
+    for worker in workers:
+        worker.join()
+    during = time.time() - ts_begin
+    broadcast.close()
+
+    return {
+        'fan_out': fan_out,
+        'serialize_once': serialize_once,
+        'send_items_per_sec': round(num_item / send_during, 1),
+        'items_per_sec': round(num_item / during, 1),
+        'during': round(during, 3),
+    }
+
+
+def test_fanout_bench(fan_out:int=None, num_item:int=5000, payload_size:int=1024,
+        serialize_once:bool=None, pip_type:str='queue'):
+    """Broadcast 1->N 扇出基准测试
+
+    Args:
+        fan_out (int, optional): 下游管道数量; None 表示依次测试 1, 2, 4, 8. Defaults to None.
+        num_item (int, optional): 数据条数. Defaults to 5000.
+        payload_size (int, optional): 每条数据的文本字节数. Defaults to 1024.
+        serialize_once (bool, optional): None 表示对比开启和关闭两种模式. Defaults to None.
+        pip_type (str, optional): queue 或 shm. Defaults to 'queue'.
+    """
+    fan_out_list = [fan_out] if fan_out else [1, 2, 4, 8]
+    mode_list = [serialize_once] if serialize_once is not None else [False, True]
+
+    results = []
+    for _fan_out in fan_out_list:
+        for _serialize_once in mode_list:
+            rst = _run_fanout(_fan_out, num_item, payload_size, _serialize_once, pip_type)
+            logger.info('fanout bench: %s', rst)
+            results.append(rst)
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
@@ -3,9 +3,15 @@
 # python -m tests.auto.pip.QueuePip test_send_recv --recv_interval=0.5 --send_timeout=0.4
 ### Test recv timeout
 # python -m tests.auto.pip.QueuePip test_send_recv --send_interval=0.5 --recv_timeout=0.4 --recv_interval=0
+### Test shared memory ring buffer
+# python -m tests.auto.pip.QueuePip test_shm_send_recv --shm_size=1024 --recv_interval=0.1
+### Test batch mode
+# python -m tests.auto.pip.QueuePip test_batch_send_recv --batch_size=3 --linger=0.2
 import threading, time
 from queue import Queue, Empty
 from smart.auto.pip.QueuePip import *
+from smart.auto.pip.BatchQueuePip import BatchQueuePip
+from smart.auto.pip.ShmRingQueue import ShmRingPip
 from smart.auto.pip.cmd import end_cmd
 from tests.auto import logger
 
@@ -128,6 +134,65 @@ def test_send_recv_timeout_fn(queue_max_size=3, num_item:int=10,
     thread_recv.join()
     logger.info("test_send_recv ended")
 
+def test_shm_send_recv(queue_max_size=3, shm_size:int=1024, num_item:int=10, 
+        recv_interval:float=0.1, send_timeout:float=None):
+    pip = ShmRingPip(
+        size = shm_size,
+        maxsize = queue_max_size
+    )
+
+    thread_send = threading.Thread(
+        target = _pip_send_data,
+        args = (pip, num_item),
+        kwargs = {
+            'send_timeout': send_timeout
+        }
+    )
+    thread_recv = threading.Thread(
+        target = _pip_recv_data,
+        args = (pip,),
+        kwargs = {
+            'recv_interval': recv_interval
+        }
+    )
+    thread_send.start()
+    thread_recv.start()
+
+    thread_send.join()
+    thread_recv.join()
+    pip.close()
+    logger.info("test_shm_send_recv ended")
+
+
+def test_batch_send_recv(batch_size:int=3, linger:float=0.2, num_item:int=10, 
+        send_interval:float=0.05, recv_interval:float=0.):
+    pip = BatchQueuePip(
+        queue = Queue(),
+        batch_size = batch_size,
+        linger = linger
+    )
+
+    thread_send = threading.Thread(
+        target = _pip_send_data,
+        args = (pip, num_item),
+        kwargs = {
+            'send_interval': send_interval
+        }
+    )
+    thread_recv = threading.Thread(
+        target = _pip_recv_data,
+        args = (pip,),
+        kwargs = {
+            'recv_interval': recv_interval
+        }
+    )
+    thread_send.start()
+    thread_recv.start()
+
+    thread_send.join()
+    thread_recv.join()
+    logger.info("test_batch_send_recv ended")
+
 
 
 if __name__ == "__main__":
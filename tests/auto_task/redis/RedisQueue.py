@@ -2,9 +2,15 @@
 启动本地测试的redis服务: docker run -d --name myredis -p 6379:6379 redis redis-server --appendonly yes
 python -m tests.auto_task.redis.RedisQueue test_send_recv
 python -m tests.auto_task.redis.RedisQueue test_send_recv_all
+python -m tests.auto_task.redis.RedisQueue test_send_recv_batch --frame_items
+python -m tests.auto_task.redis.RedisQueue test_send_recv_batch --use_fakeredis --max_queue_size=200
+python -m tests.auto_task.redis.RedisQueue test_send_recv_batch --recv_batch_size=100
+python -m tests.auto_task.redis.RedisQueue test_batch_push_retry
+python -m tests.auto_task.redis.RedisQueue test_frame_push_back --recv_batch_size=2
 '''
-import time, uuid
+import time, uuid, threading
 from auto_tasks.redis.RedisQueue import RedisQueue
+from auto_tasks.redis.redis_utils import RedisBatchPush
 from tests.auto_task import logger
 
 
@@ -94,6 +100,101 @@ def test_send_recv_all(n:int=2, key='test_key', host='127.0.0.1', port:int=6379,
     assert recv_count == 0
 
 
+def test_send_recv_batch(n:int=1000, batch_size:int=100, frame_items:bool=False, linger:float=None, 
+        max_queue_size:int=None, recv_batch_size:int=1, use_fakeredis:bool=False, key='test_key_batch', 
+        host='127.0.0.1', port:int=6379, db:int=0, password=None):
+    redis_queue = RedisQueue(
+        host=host,
+        port=port,
+        db=0,
+        password=password
+    )
+    if use_fakeredis:
+        # pip install fakeredis
+        import fakeredis
+        redis_queue._redis = fakeredis.FakeRedis()
+
+    recv_idx_list = []
+    def _recv():
+        for item in redis_queue.recv_all(key, timeout=10, batch_size=recv_batch_size):
+            recv_idx_list.append(item['idx'])
+
+    # 设置 max_queue_size 时需同时接收数据
+    recv_thread = threading.Thread(target=_recv) if max_queue_size else None
+
+    ts = time.time()
+    redis_queue._redis.delete(key)
+    if recv_thread:
+        recv_thread.start()
+    redis_queue.send_all(
+        _item_iter_fn(n),
+        key=key,
+        batch_size=batch_size,
+        frame_items=frame_items,
+        linger=linger,
+        max_queue_size=max_queue_size
+    )
+    send_ts = time.time() - ts
+
+    ts = time.time()
+    if recv_thread:
+        recv_thread.join()
+    else:
+        _recv()
+    recv_ts = time.time() - ts
+
+    assert recv_idx_list == list(range(n))
+    logger.info("test_send_recv_batch send %.3fs, recv %.3fs", send_ts, recv_ts)
+
+
+def test_batch_push_retry(n:int=10, fail_times:int=2, linger:float=0.05, key='test_key_retry'):
+    # pip install fakeredis
+    import fakeredis
+    redis = fakeredis.FakeRedis()
+    rest_fail = [fail_times]
+    real_pipeline = redis.pipeline
+
+    def _pipeline(*args, **kwargs):
+        # 前 fail_times 次写入失败
+        pipe = real_pipeline(*args, **kwargs)
+        real_execute = pipe.execute
+        def _execute(*args, **kwargs):
+            if rest_fail[0] > 0:
+                rest_fail[0] -= 1
+                raise ConnectionError('mock redis error')
+            return real_execute(*args, **kwargs)
+        pipe.execute = _execute
+        return pipe
+    redis.pipeline = _pipeline
+
+    batch_push = RedisBatchPush(redis, batch_size=100, linger=linger)
+    for i in range(n):
+        batch_push.add(key, None, {'idx': i})
+    # linger线程写入失败后重试
+    time.sleep(linger * (fail_times + 2))
+    batch_push.close()
+
+    assert rest_fail[0] == 0
+    assert redis.llen(key) == n and batch_push.count == n
+
+
+def test_frame_push_back(n:int=10, batch_size:int=4, recv_batch_size:int=1, key='test_key_frame'):
+    # pip install fakeredis
+    import fakeredis
+    redis_queue = RedisQueue(host='127.0.0.1', port=6379)
+    redis_queue._redis = fakeredis.FakeRedis()
+    redis_queue.send_all(_item_iter_fn(n), key=key, batch_size=batch_size, frame_items=True)
+
+    # 只处理多条数据帧中的第一条数据后结束接收
+    item_iter = redis_queue.recv_all(key, block=False, batch_size=recv_batch_size)
+    first_item = next(item_iter)
+    item_iter.close()
+
+    recv_idx_list = [item['idx'] for item in redis_queue.recv_all(key, block=False, batch_size=recv_batch_size)]
+    assert first_item['idx'] == 0
+    assert recv_idx_list == list(range(1, n))
+
+
 if __name__ == "__main__":
     _d, component = dict(globals()).items(), {}
     for k, v in _d:
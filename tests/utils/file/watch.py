@@ -0,0 +1,59 @@
+# python3 -m tests.utils.file.watch watch --num_reader=10 --num_line=20
+# python3 -m tests.utils.file.watch watch --use_inotify=False
+import os, time, threading
+from tempfile import mkstemp
+
+from smart.utils.file.cat import FileCat
+from smart.utils.file.watch import FileWatcher
+from tests.utils import logger
+
+
+def test_watch(num_reader:int=10, num_line:int=20, use_inotify:bool=True):
+    watcher = FileWatcher(use_inotify=use_inotify)
+    fd, file_path = mkstemp()
+    writer = os.fdopen(fd, 'w', buffering=1)
+    write_end = threading.Event()
+    latency = []
+
+    def _read_fn():
+        with open(file_path, 'rb') as fp, watcher.watch(file_path) as watch:
+            cat = FileCat(fp, text_mode=False)
+            for line in cat.tail(follow=True, follow_line_mode=True, follow_max_time=10,
+                        follow_is_end_fn=write_end.is_set, follow_wait_fn=watch.wait):
+                latency.append(time.time() - float(line.split()[0]))
+
+    readers = [threading.Thread(target=_read_fn) for _ in range(num_reader)]
+    for reader in readers:
+        reader.start()
+    time.sleep(0.2)
+
+    # 同一文件的所有读取者共享一个监听
+    assert len(watcher._watches) == 1
+
+    for i in range(num_line):
+        writer.write('{} line-{}\n'.format(time.time(), i))
+        time.sleep(0.01)
+    time.sleep(0.1)
+    write_end.set()
+    watcher.notify(file_path)
+
+    for reader in readers:
+        reader.join(5)
+    writer.close()
+    os.remove(file_path)
+
+    logger.info('test_watch mode=%s, lines=%d, avg latency=%.1fms, max=%.1fms', watcher.mode, len(latency),
+        1000 * sum(latency) / max(len(latency), 1), 1000 * max(latency or [0]))
+    assert len(latency) == num_reader * num_line
+    assert not watcher._watches
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
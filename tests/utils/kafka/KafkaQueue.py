@@ -4,10 +4,12 @@
 # 发送数据: 
 #   python3 -m tests.utils.kafka.KafkaQueue send --topic=test_topic1 --num_item=2
 #   python3 -m tests.utils.kafka.KafkaQueue send_all --topic=test_topic2 --num_item=3
+#   python3 -m tests.utils.kafka.KafkaQueue send_all --topic=test_topic2 --num_item=100000 --max_in_flight=10000
 # 接收数据: 
 #   python3 -m tests.utils.kafka.KafkaQueue recv --topic=test_topic1 --auto_offset_reset=earliest --daemon=1
 #   python3 -m tests.utils.kafka.KafkaQueue recv --topic=test_topic1 --timeout=0 --auto_offset_reset=latest
 #   python3 -m tests.utils.kafka.KafkaQueue recv_all --topic=test_topic2 --group_id=test1 --auto_commit=False
+#   python3 -m tests.utils.kafka.KafkaQueue recv_batches --topic=test_topic2 --group_id=test1 --auto_commit=False --batch_size=100
 # 新消费者组: python3 -m tests.utils.kafka.KafkaQueue recv --topic=test_topic1 --auto_offset_reset=earliest --daemon=1 --group_id=test3
 # 发送退出命令: python3 -m tests.utils.kafka.KafkaQueue send_cmd --topic=test_topic1
 import time, functools, pprint
@@ -142,8 +144,39 @@ def test_recv_all(topic=Default_Test_Topic, timeout:float=None, auto_offset_rese
     logger.info("consumer_config: %s, uncommit_msg_list: %s", _consumer_config, kq._uncommit_msg_list)
 
 
+def test_recv_batches(topic=Default_Test_Topic, timeout:float=None, auto_offset_reset=None, group_id=None, 
+            daemon=False, auto_commit:bool=True, batch_size:int=100, commit_interval:float=None):
+    kq = KafkaQueue(servers=Test_Kafka_Hosts)
+    if auto_offset_reset:
+        kq.consumer_opts['auto.offset.reset'] = auto_offset_reset
+    if group_id:
+        kq.consumer_opts['group.id'] = group_id
+    kq.consumer_opts.update({
+        'on_commit': functools.partial(_consumer_cb, ('commit',)),
+    })
+    kq.update_consumer_opts(auto_commit=auto_commit)
+    if daemon:
+        timeout = None
+    batch_iter = kq.recv_batches(
+        topic, batch_size=batch_size, timeout=timeout, pool_interval=10, 
+        is_daemon=daemon, skip_err_item=True, commit_interval=commit_interval
+    )
+    num_item, start_ts = 0, time.time()
+    try:
+        for i, batch in enumerate(batch_iter):
+            num_item += len(batch)
+            logger.info("recv-batch-%d: %s items, first=%s", i, len(batch), batch[0])
+    finally:
+        kq.unsubscribe()
+        logger.debug('kq.unsubscribe')
+    logger.debug("done commit: %s", kq.commit(asynchronous=False))
+    cost = time.time() - start_ts
+    logger.info("recv %s items, %.3fs, %.1f items/s", num_item, cost, num_item / max(cost, 1e-6))
+
+
 def test_send_all(topic=Default_Test_Topic, num_item:int=2, partition:int=None, 
-            send_end_cmd:bool=True, flush_step:int=1, auto_msg_key:bool=False):
+            send_end_cmd:bool=True, flush_step:int=1, auto_msg_key:bool=False, 
+            max_in_flight:int=None, flush_interval:float=None):
     def _item_iter_fn():
         for i in range(num_item):
             item = {
@@ -155,15 +188,18 @@ def test_send_all(topic=Default_Test_Topic, num_item:int=2, partition:int=None,
     _item_iter = _item_iter_fn()
     kq = KafkaQueue(servers=Test_Kafka_Hosts)
     kq._log_delivery_report = True
-    kq.send_all(
+    start_ts = time.time()
+    send_stats = kq.send_all(
         _item_iter, 
         topic=topic, 
         partition=partition, 
         send_end_cmd=send_end_cmd,
         flush_step=flush_step,
-        auto_msg_key=auto_msg_key
+        auto_msg_key=auto_msg_key,
+        max_in_flight=max_in_flight,
+        flush_interval=flush_interval
     )
-    logger.info("test_send_all end")
+    logger.info("test_send_all end: %s, %.3fs", send_stats, time.time() - start_ts)
 
 
 def test_send_cmd(topic=Default_Test_Topic, cmd='exit'):
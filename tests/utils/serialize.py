@@ -33,6 +33,119 @@ def test_type_obj():
         print('')
 
 
+def test_codec():
+    obj_type_list = [
+        ({'a': 1, 'b': '啊', 'c': [1.5, None, True]}, None),
+        ({'x', 'y'}, 'set'),
+        ((1, 2), 'tuple'),
+        (1.2e5, 'float'),
+        (['xxx'], ''),
+        (None, 'none'),
+        (None, None),
+    ]
+
+    for obj, type in obj_type_list:
+        json_data = TypeObjSerializer.encode(obj, type, codec='json')
+        data = TypeObjSerializer.encode(obj, type, codec='msgpack')
+        d_type, d_obj = TypeObjSerializer.decode(data)
+        print((type, obj), '->', len(json_data), len(data), (d_type, d_obj))
+
+        # 与 json 格式的解码结果一致, 空类型解码为 None
+        json_type, json_obj = TypeObjSerializer.decode(json_data)
+        assert d_type == (json_type or None)
+        assert d_obj == json_obj
+
+    # 旧版本 json 数据
+    assert TypeObjSerializer.decode(b'\x00\x03cmd{"type": "end"}') == ('cmd', {'type': 'end'})
+    assert TypeObjSerializer.decode('{"a": 1}') == (None, {'a': 1})
+
+    # 缺省编码格式
+    TypeObjSerializer.set_default_codec('msgpack')
+    try:
+        data = TypeObjSerializer.encode({'a': 1}, 'cmd')
+        assert data[:2] == bytes([1, MsgpackCodec.main_ver])
+        assert TypeObjSerializer.decode(data) == ('cmd', {'a': 1})
+        # 设置 str_fn 时使用 json 格式
+        assert TypeObjSerializer.encode({'a': 1}, 'cmd', str_fn=json.dumps)[0] == 0
+    finally:
+        TypeObjSerializer.set_default_codec()
+
+    try:
+        TypeObjSerializer.decode(bytes([1, 200, 0]))
+        assert False
+    except NotImplementedError:
+        pass
+
+
+def test_codec_bench(num:int=10000, payload_size:int=1024):
+    import time
+    obj = {'id': 1, 'score': 0.5, 'tags': ['a', 'b', 'c'], 'text': 'x' * payload_size}
+    for codec in ('json', 'msgpack'):
+        ts = time.time()
+        for _ in range(num):
+            data = TypeObjSerializer.encode(obj, 'item', codec=codec)
+        encode_ts = time.time() - ts
+
+        ts = time.time()
+        for _ in range(num):
+            TypeObjSerializer.decode(data)
+        decode_ts = time.time() - ts
+
+        print(codec, 'fast:', getattr(TypeObjSerializer.get_codec(codec), 'fast', True),
+            'size:', len(data), 'encode/s:', round(num / encode_ts), 'decode/s:', round(num / decode_ts))
+
+
+def test_many():
+    objs = [{'a': 1, 'b': '啊'}, None, [1, 2], 'x', 1.5]
+    for codec in ('json', 'msgpack'):
+        for type in (None, '', 'cmd'):
+            data_list = [TypeObjSerializer.encode(obj, type, codec=codec) for obj in objs]
+            assert TypeObjSerializer.encode_many(objs, type, codec=codec) == data_list
+
+            frame = TypeObjSerializer.encode_many(objs, type, codec=codec, frame=True)
+            rst = TypeObjSerializer.decode_many([frame] + data_list)
+            assert [obj for _, obj in rst] == objs * 2
+            assert rst[0][0] == (type or None)
+
+    try:
+        TypeObjSerializer.decode(frame)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_many_bench(num:int=10000, batch_size:int=100, payload_sizes=(1024, 10240), codec=None):
+    """对比逐条和批量序列化的吞吐量
+
+    python -m tests.utils.serialize many_bench --num=10000 --batch_size=100 --codec=msgpack
+    """
+    import time
+    for payload_size in payload_sizes:
+        objs = [{'id': i, 'score': 0.5, 'tags': ['a', 'b', 'c'], 'text': 'x' * payload_size} for i in range(batch_size)]
+        rounds = max(num // batch_size, 1)
+        modes = {
+            'item': lambda: [TypeObjSerializer.encode(obj, codec=codec) for obj in objs],
+            'many': lambda: TypeObjSerializer.encode_many(objs, codec=codec),
+            'frame': lambda: [TypeObjSerializer.encode_many(objs, codec=codec, frame=True)],
+        }
+        for mode, encode_fn in modes.items():
+            ts = time.time()
+            for _ in range(rounds):
+                data_list = encode_fn()
+            encode_ts = time.time() - ts
+
+            ts = time.time()
+            for _ in range(rounds):
+                if mode == 'item':
+                    [TypeObjSerializer.decode(data) for data in data_list]
+                else:
+                    TypeObjSerializer.decode_many(data_list)
+            decode_ts = time.time() - ts
+
+            total = rounds * batch_size
+            print('payload:', payload_size, 'mode:', mode, 'encode/s:', round(total / encode_ts),
+                'decode/s:', round(total / decode_ts))
+
 
 if __name__ == "__main__":
     _d, component = dict(globals()).items(), {}
@@ -0,0 +1,41 @@
+# python3 -m tests.utils.startup_profile profile
+# python3 -m tests.utils.startup_profile profile --cprofile_out=startup.txt
+# 命令行入口: python3 -m smart.auto.run tests.auto.task mp_queue_test --profile_startup=startup.prof
+import time
+
+from smart.utils.startup_profile import StartupProfile
+from tests.utils import logger
+
+
+def test_profile(cprofile_out=None, num_phase:int=3):
+    StartupProfile.start('test', cprofile_out=cprofile_out)
+
+    for i in range(num_phase):
+        with StartupProfile.phase('phase_{}'.format(i % 2)):
+            time.sleep(0.01)
+
+    StartupProfile.mark('ready')
+    StartupProfile.mark_first_item()
+
+    rst = StartupProfile.stop()
+    logger.info('test_profile: %s', rst)
+
+    assert rst['phases']['imports'] >= 0
+    assert rst['phases']['phase_0'] >= 0.02
+    assert 'ready' in rst['marks'] and 'first_item' in rst['marks']
+    assert StartupProfile.stop() is None
+
+    # 未启用时为空操作
+    with StartupProfile.phase('noop'):
+        StartupProfile.mark_first_item()
+
+
+if __name__ == "__main__":
+    _d, component = dict(globals()).items(), {}
+    for k, v in _d:
+        if k.startswith('test_'):
+            component[k] = v
+            component[k[5:]] = v
+
+    import fire
+    fire.Fire(component)
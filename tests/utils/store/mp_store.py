@@ -164,6 +164,73 @@ def test_state_wait(delay=1.1, timeout=5):
     process.join()
     store.state('test_state_wait').set(key_path, 222)
 
+def _test_cache_state(store, flag_path, timeout):
+    state = store.state('test_cache_state')
+    flags = store.dict('test_cache_dict')
+    ts_begin = time.time()
+    while not state.get(flag_path) or not flags.get('stop'):
+        assert time.time() - ts_begin < timeout, 'cache not invalidated'
+        time.sleep(0.01)
+    state.set(('worker', 'done'), True)
+    flags['done'] = True
+    logger.info('test_cache_state worker got: %s, %s', state.get(flag_path), flags.copy())
+
+
+def test_cache_state(delay=0.5, timeout=5, num_read=10000):
+    store = MpContextStore(cache=True)
+    state = store.state('test_cache_state')
+    flags = store.dict('test_cache_dict')
+    flag_path = ('a', 'stop')
+
+    process = mp.Process(target=_test_cache_state, args=(store, flag_path, timeout))
+    process.start()
+
+    ts_begin = time.time()
+    for _ in range(num_read):
+        state.get(flag_path)
+    logger.info('test_cache_state %s cached reads: %.3fs', num_read, time.time() - ts_begin)
+
+    time.sleep(delay)
+    state.set(flag_path, True)
+    flags['stop'] = True
+    process.join()
+
+    assert process.exitcode == 0
+    assert state.get(('worker', 'done')) is True
+    assert flags.get('done') is True and 'done' in flags
+    store.close()
+
+
+def _test_lazy_store(store:LazyMpContextStore, i):
+    # 工作进程首次使用时, 由创建进程启动 SyncManager
+    store.state('test_lazy_store').set(('worker', i), i)
+    store.list('test_lazy_list').append(i)
+
+
+def test_lazy_store(process_num=2):
+    store = LazyMpContextStore(cache=True)
+
+    process_list = [
+        mp.Process(target=_test_lazy_store, args=(store, i))
+        for i in range(process_num)
+    ]
+    for process in process_list:
+        process.start()
+    for process in process_list:
+        process.join()
+        assert process.exitcode == 0
+
+    assert store.started
+    assert store.state('test_lazy_store').get('worker') == {i: i for i in range(process_num)}
+    assert sorted(store.list('test_lazy_list')) == list(range(process_num))
+    logger.info('test_lazy_store: %s', store.state('test_lazy_store').to_dict())
+
+    # 未使用时不启动 SyncManager
+    unused_store = LazyMpContextStore()
+    unused_store.close()
+    assert not unused_store.started
+    store.close()
+
 
 if __name__ == "__main__":
     mp.set_start_method('spawn', True)